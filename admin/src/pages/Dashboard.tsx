@@ -83,28 +83,50 @@ const Dashboard = () => {
     };
   }, [theme]);
 
+  // Refresh when the server pushes complaint or staff status changes
+  useEffect(() => {
+    const token = localStorage.getItem('token');
+    if (!token || typeof EventSource === 'undefined') return;
+
+    const source = new EventSource(
+      `${import.meta.env.VITE_API_BASE_URL}/api/complaints/events/?topics=admin&token=${token}`
+    );
+    let pending: ReturnType<typeof setTimeout> | undefined;
+    const scheduleRefresh = () => {
+      // Coalesce bursts (e.g. bulk filing) into one refresh
+      clearTimeout(pending);
+      pending = setTimeout(() => {
+        fetchComplaints();
+        fetchAdminStats();
+      }, 1000);
+    };
+    ['complaint.created', 'complaint.status', 'staff.status', 'resync'].forEach((type) =>
+      source.addEventListener(type, scheduleRefresh)
+    );
+
+    return () => {
+      clearTimeout(pending);
+      source.close();
+    };
+  }, []);
+
   const fetchAdminStats = async () => {
     try {
-      // Simulating API delay
-      await new Promise(resolve => setTimeout(resolve, 500));
-
-      // Fetch staff count
-      const staffResponse = await axios.get(
-        `${import.meta.env.VITE_API_BASE_URL}/api/complaints/staff/`
+      // Aggregates are served from server-side counters
+      const statsResponse = await axios.get(
+        `${import.meta.env.VITE_API_BASE_URL}/api/complaints/stats/`
       );
-
-      const totalStaff = staffResponse.data.length;
-      const activeAgents = staffResponse.data.filter((s: any) => s.status === 'active').length;
+      const stats = statsResponse.data;
 
       // Set admin-specific stats
       setAdminStats({
-        totalStaff,
-        activeAgents,
-        resolvedToday: 12,
-        resolutionRate: 87,
+        totalStaff: stats.total_staff,
+        activeAgents: stats.active_agents,
+        resolvedToday: stats.resolved_today,
+        resolutionRate: stats.resolution_rate,
         averageResolutionTime: '4.5h',
         pendingEscalations: 5,
-        totalComplaints: Math.floor(Math.random() * 1000) + 500 // Random number for demo
+        totalComplaints: stats.total_complaints
       });
     } catch (error) {
       console.error('Error fetching admin stats:', error);
@@ -270,20 +292,37 @@ const Dashboard = () => {
   };
 
   // Complaint trends chart
-  const updateComplaintTrendsChart = () => {
+  const updateComplaintTrendsChart = async () => {
     if (!chartRef.current) return;
 
-    // Generate some random data for the last 30 days
-    const dates = Array.from({ length: 30 }, (_, i) => {
-      const date = new Date();
-      date.setDate(date.getDate() - (29 - i));
-      return date.toISOString().split('T')[0];
-    });
-
-    // Random data
-    const openData = Array.from({ length: 30 }, () => Math.floor(Math.random() * 15) + 1);
-    const progressData = Array.from({ length: 30 }, () => Math.floor(Math.random() * 18) + 3);
-    const closedData = Array.from({ length: 30 }, () => Math.floor(Math.random() * 20) + 5);
+    // Daily counts for the last 30 days from the server-side rollups
+    const end = new Date();
+    end.setDate(end.getDate() + 1);
+    const start = new Date(end);
+    start.setDate(start.getDate() - 30);
+    let dates: string[] = [];
+    const seriesByStatus: Record<string, number[]> = {};
+    try {
+      const response = await axios.get(`${import.meta.env.VITE_API_BASE_URL}/api/complaints/trends/`, {
+        params: {
+          granularity: 'day',
+          by: 'status',
+          start: start.toISOString().split('T')[0],
+          end: end.toISOString().split('T')[0],
+        },
+      });
+      dates = response.data.buckets.map((bucket: string) => bucket.split('T')[0]);
+      response.data.series.forEach((series: { value: string; counts: number[] }) => {
+        seriesByStatus[series.value] = series.counts;
+      });
+    } catch (error) {
+      console.error('Error fetching complaint trends:', error);
+    }
+    if (!chartRef.current) return;
+    const countsFor = (status: string) => seriesByStatus[status] || dates.map(() => 0);
+    const openData = countsFor('Open');
+    const progressData = countsFor('In Progress');
+    const closedData = countsFor('Closed');
 
     const options = {
       chart: {
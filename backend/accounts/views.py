@@ -5,16 +5,15 @@ from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.authtoken.models import Token
+import logging
+
+logger = logging.getLogger(__name__)
 
 @api_view(['GET'])
 @authentication_classes([TokenAuthentication, SessionAuthentication])
 @permission_classes([IsAdminUser])
 def admin_profile(request):
     try:
-        # Debug logging
-        print("Request user:", request.user)
-        print("Request headers:", request.headers)
-        
         user = request.user
         if not user.is_authenticated:
             return Response(
@@ -41,7 +40,7 @@ def admin_profile(request):
         }
         return Response(data)
     except Exception as e:
-        print(f"Error in admin_profile: {str(e)}")  # Debug logging
+        logger.exception('Error in admin_profile')
         return Response(
             {'error': str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Serve it with an ASGI server (e.g. ``uvicorn backend.asgi:application``) to
+enable the /api/complaints/events/ server-sent event streams. The complaint
+list, detail and filing routes and the staff list are served by their
+async-native views here; set COMPLAINTS_ASYNC_VIEWS=false to use the sync ones.
 """
 
 import os
@@ -12,5 +17,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('COMPLAINTS_ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
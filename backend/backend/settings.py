@@ -31,6 +31,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # CORS Middleware at the top
+    'complaints.metrics.RequestMetricsMiddleware',
+    'complaints.routing.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,9 +71,91 @@ DATABASES = {
         'PASSWORD': os.getenv('MYSQL_PASSWORD', 'Lu@B9pk@3k4WP'),
         'HOST': os.getenv('MYSQL_HOST', 'localhost'),
         'PORT': os.getenv('MYSQL_PORT', '3306'),
+        # Keep connections open between requests and check them before reuse
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Local SQLite database for running the test suite without a MySQL server
+if os.getenv('DJANGO_DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', os.path.join(BASE_DIR, 'db.sqlite3')),
+        }
+    }
+
+# Read replicas for the GET views decorated with complaints.routing.replica_reads,
+# as "host[:port]" entries in MYSQL_REPLICA_HOSTS or, to try the routing locally,
+# SQLite files in SQLITE_REPLICA_PATHS (copies of the primary file). A client is
+# pinned to the primary for REPLICA_STICKY_SECONDS after each write it makes, and
+# replicas are health-checked every REPLICA_HEALTH_CHECK_INTERVAL seconds; on
+# MySQL, set REPLICA_MAX_LAG_SECONDS to also skip replicas that fall behind.
+DATABASE_REPLICAS = []
+if os.getenv('DJANGO_DB_ENGINE') == 'sqlite':
+    replica_paths = [path for path in os.getenv('SQLITE_REPLICA_PATHS', '').split(',') if path]
+    for index, path in enumerate(replica_paths, 1):
+        DATABASES[f'replica{index}'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}
+        DATABASE_REPLICAS.append(f'replica{index}')
+else:
+    replica_hosts = [host for host in os.getenv('MYSQL_REPLICA_HOSTS', '').split(',') if host]
+    for index, host in enumerate(replica_hosts, 1):
+        name, _, port = host.partition(':')
+        DATABASES[f'replica{index}'] = {
+            **DATABASES['default'],
+            'HOST': name,
+            'PORT': port or DATABASES['default']['PORT'],
+            'TEST': {'MIRROR': 'default'},
+        }
+        DATABASE_REPLICAS.append(f'replica{index}')
+DATABASE_ROUTERS = ['complaints.routing.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+REPLICA_HEALTH_CHECK_INTERVAL = int(os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', '10'))
+REPLICA_MAX_LAG_SECONDS = int(os.environ['REPLICA_MAX_LAG_SECONDS']) if os.getenv('REPLICA_MAX_LAG_SECONDS') else None
+
+# Cache for serialized complaint/staff reads. Entries are keyed by a per-table
+# change version kept in the database, so the per-process local-memory default
+# never serves stale data; point these at a shared backend (e.g.
+# django.core.cache.backends.redis.RedisCache) to share entries between workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', 'rail-madad'),
+    }
+}
+
+# Fan-out for the /api/complaints/events/ streams: 'local' reaches streams in
+# the writing process only, 'database' shares events between all workers.
+# A dotted path to another backend class may be given as well.
+COMPLAINT_EVENT_BACKEND = os.getenv('DJANGO_EVENT_BACKEND', 'local')
+
+# Serve the complaint list/detail/filing and staff list routes with their
+# async-native views. backend.asgi turns this on unless the environment says
+# otherwise; under WSGI the sync views are used.
+COMPLAINTS_ASYNC_VIEWS = os.getenv('COMPLAINTS_ASYNC_VIEWS', 'false').lower() == 'true'
+
+# Per-view request metrics, scraped from /metrics (Prometheus text format).
+# Requests slower than SLOW_REQUEST_MS and requests running one SQL statement
+# N_PLUS_ONE_THRESHOLD or more times are logged by complaints.metrics.
+# With METRICS_TOKEN set, scrapers must send "Authorization: Bearer <token>".
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() != 'false'
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', '500'))
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', '10'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'complaints': {'handlers': ['console'], 'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO')},
+        'accounts': {'handlers': ['console'], 'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO')},
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -3,9 +3,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from complaints.metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/complaints/", include("complaints.urls")),  # Include complaints app URLs
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 # Add this at the end of the file to serve media files in development
@@ -1,15 +1,53 @@
 from django.contrib import admin
-from .models import Complaint, Feedback, Staff
+from .models import ArchivedComplaint, Complaint, DuplicateCluster, Feedback, Staff
+from .search import get_backend
 
 class ComplaintAdmin(admin.ModelAdmin):
-    list_display = ('id', 'type', 'status', 'severity', 'date_of_incident')
+    list_display = ('id', 'type', 'status', 'severity', 'date_of_incident', 'cluster')
     list_filter = ('status', 'severity', 'type')
+    raw_id_fields = ('cluster', 'assigned_staff', 'user')
     search_fields = ('description', 'train_number', 'pnr_number')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of LIKE '%term%' over every row
+        if not search_term:
+            return queryset, False
+        return get_backend().filter_queryset(queryset, search_term), False
+
+class ClusterComplaintInline(admin.TabularInline):
+    model = Complaint
+    fields = ('id', 'description', 'status', 'severity')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    show_change_link = True
+
+class DuplicateClusterAdmin(admin.ModelAdmin):
+    list_display = ('id', 'train_number', 'date_of_incident', 'size', 'created_at')
+    list_filter = ('date_of_incident',)
+    search_fields = ('train_number',)
+    readonly_fields = ('first_complaint',)
+    inlines = [ClusterComplaintInline]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(size__gte=2)
+
 class FeedbackAdmin(admin.ModelAdmin):
-    list_display = ('name', 'complaint_id', 'rating', 'submitted_at')
+    list_display = ('name', 'complaint_reference', 'complaint', 'rating', 'submitted_at')
     list_filter = ('rating',)
-    search_fields = ('name', 'email', 'complaint_id')
+    search_fields = ('name', 'email', 'complaint_reference')
+    raw_id_fields = ('complaint',)
+
+class ArchivedComplaintAdmin(admin.ModelAdmin):
+    list_display = ('id', 'type', 'status', 'severity', 'date_of_incident', 'archived_at')
+    list_filter = ('severity', 'type')
+    search_fields = ('=id', 'train_number', 'pnr_number')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 class StaffAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'role', 'department', 'status')
@@ -17,5 +55,7 @@ class StaffAdmin(admin.ModelAdmin):
     search_fields = ('name', 'email', 'phone')
 
 admin.site.register(Complaint, ComplaintAdmin)
+admin.site.register(ArchivedComplaint, ArchivedComplaintAdmin)
+admin.site.register(DuplicateCluster, DuplicateClusterAdmin)
 admin.site.register(Feedback, FeedbackAdmin)
 admin.site.register(Staff, StaffAdmin)
@@ -0,0 +1,126 @@
+import contextlib
+import contextvars
+import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import counters
+from .models import ArchivedComplaint, ArchivedFeedback, Complaint, Feedback
+
+DEFAULT_AFTER_DAYS = 180
+BATCH_SIZE = 500
+
+COMPLAINT_FIELDS = [field.attname for field in Complaint._meta.concrete_fields]
+FEEDBACK_FIELDS = [field.attname for field in Feedback._meta.concrete_fields]
+
+# True while archive_batch() deletes the rows it copied (see is_archiving())
+_archiving = contextvars.ContextVar('archiving', default=False)
+
+
+@contextlib.contextmanager
+def archiving():
+    token = _archiving.set(True)
+    try:
+        yield
+    finally:
+        _archiving.reset(token)
+
+
+def is_archiving():
+    """
+    Whether the current delete moves rows to the archive. The delete
+    receivers then leave the aggregates and media references alone: the
+    archived copies keep counting and keep pointing at their files.
+    """
+    return _archiving.get()
+
+
+def cutoff(after_days):
+    return timezone.now() - datetime.timedelta(days=after_days)
+
+
+def candidates(before):
+    """Complaints closed (and left untouched) since before ``before``."""
+    return Complaint.objects.filter(status='Closed', updated_at__lt=before)
+
+
+def plan(before):
+    """(complaints, feedback rows) the next run would archive."""
+    complaints = candidates(before)
+    return complaints.count(), Feedback.objects.filter(complaint__in=complaints).count()
+
+
+def archive_batch(before, after_id=0, batch_size=BATCH_SIZE):
+    """
+    Move the next ``batch_size`` candidates with an id above ``after_id``,
+    and their feedback, to the archive tables in one transaction; returns
+    (complaint ids, feedback rows moved).
+
+    Each batch commits on its own, so an interrupted run loses nothing and
+    the next run carries on with the complaints still in the hot table.
+    Aggregates (dashboard counters, trend and feedback rollups) keep
+    counting archived rows; only the hot-table indexes drop them.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            candidates(before).filter(id__gt=after_id).order_by('id').select_for_update().values(
+                *COMPLAINT_FIELDS
+            )[:batch_size]
+        )
+        ids = [row['id'] for row in rows]
+        if not ids:
+            return ids, 0
+        ArchivedComplaint.objects.bulk_create([ArchivedComplaint(**row, archived_at=now) for row in rows])
+        feedback = Feedback.objects.filter(complaint_id__in=ids)
+        feedback_rows = list(feedback.values(*FEEDBACK_FIELDS))
+        ArchivedFeedback.objects.bulk_create([ArchivedFeedback(**row, archived_at=now) for row in feedback_rows])
+
+        with archiving():
+            feedback.delete()
+            # Search terms, bands and photo jobs go with the complaints
+            Complaint.objects.filter(id__in=ids).delete()
+
+        # Gone from the hot lists and (through the receivers) the change feed; detail lookups and exports still find them
+        counters.apply({counters.table_version_key('complaints'): 1})
+    return ids, len(feedback_rows)
+
+
+def archive(before, batch_size=BATCH_SIZE, limit=None):
+    """Archive every candidate (or the first ``limit``), yielding (complaint ids, feedback rows) per batch."""
+    after_id = 0
+    archived = 0
+    while limit is None or archived < limit:
+        size = batch_size if limit is None else min(batch_size, limit - archived)
+        ids, feedback = archive_batch(before, after_id, size)
+        if not ids:
+            return
+        archived += len(ids)
+        after_id = ids[-1]
+        yield ids, feedback
+
+
+def find_complaint(pk):
+    """Unsaved Complaint rebuilt from the archive, or None if ``pk`` was never archived."""
+    row = ArchivedComplaint.objects.filter(pk=pk).values(*COMPLAINT_FIELDS).first()
+    return Complaint(**row) if row else None
+
+
+async def afind_complaint(pk):
+    row = await ArchivedComplaint.objects.filter(pk=pk).values(*COMPLAINT_FIELDS).afirst()
+    return Complaint(**row) if row else None
+
+
+def is_archived(pk):
+    return ArchivedComplaint.objects.filter(pk=pk).exists()
+
+
+def find_feedback(complaint_id):
+    """Archived feedback of a complaint as unsaved Feedback objects, newest first."""
+    return [
+        Feedback(**row)
+        for row in ArchivedFeedback.objects.filter(complaint_id=complaint_id).order_by('-submitted_at').values(
+            *FEEDBACK_FIELDS
+        )
+    ]
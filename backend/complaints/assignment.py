@@ -0,0 +1,304 @@
+import heapq
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import changes, counters
+from .models import Complaint, ComplaintChange, Staff
+from .staff_directory import json_list
+
+# Most open complaints a staff member is given by the engine
+MAX_ACTIVE_TICKETS = 25
+# Seconds before a process reloads staff and workloads from the database
+ENGINE_TTL = 60
+MAX_RETRIES = 3
+
+logger = logging.getLogger(__name__)
+
+# Complaint type (as filed by the frontend) -> staff expertise, best match first
+EXPERTISE_BY_TYPE = {
+    'coach-maintenance': ['Technical Support', 'Technical Troubleshooting'],
+    'electrical': ['Technical Troubleshooting', 'Technical Support'],
+    'medical': ['Passenger Assistance', 'Escalation Management'],
+    'catering': ['Complaint Resolution', 'Feedback Management'],
+    'passenger-behaviour': ['Security Concerns', 'Passenger Assistance'],
+    'water': ['Passenger Assistance', 'Complaint Resolution'],
+    'punctuality': ['General Inquiries', 'Complaint Resolution'],
+    'security': ['Security Concerns', 'Escalation Management'],
+    'ticketing': ['Booking Issues', 'General Inquiries'],
+    'coach-cleanliness': ['Complaint Resolution', 'Passenger Assistance'],
+    'staff-behaviour': ['Escalation Management', 'Feedback Management'],
+    'refund': ['Refunds', 'Booking Issues'],
+    'amenities': ['Passenger Assistance', 'Complaint Resolution'],
+    'bedroll': ['Passenger Assistance', 'Complaint Resolution'],
+    'corruption': ['Escalation Management', 'Security Concerns'],
+}
+DEFAULT_EXPERTISE = ['General Inquiries', 'Complaint Resolution']
+# Pool of every active staff member, used when nobody has the expertise
+ANY = ('*', None)
+
+
+class AssignmentEngine:
+    """
+    In-memory routing of complaints to the least loaded matching staff.
+
+    Staff are kept in one heap per (expertise, language), per expertise and
+    one for everybody, ordered by (active tickets, -rating). Picking a staff
+    member looks at the tops of a handful of heaps and taking a ticket pushes
+    the member's new load, so both cost O(log n). Superseded heap entries are
+    skipped when they surface instead of being searched for.
+    """
+
+    def __init__(self, staff, capacity=MAX_ACTIVE_TICKETS):
+        self.capacity = capacity
+        self.load = {}
+        self.rating = {}
+        self.names = {}
+        self.pools = defaultdict(list)
+        self.memberships = {}
+        for staff_id, name, expertise, languages, rating, active_tickets in staff:
+            expertise = json_list(expertise)
+            languages = json_list(languages)
+            keys = [ANY]
+            keys += [(area, None) for area in expertise]
+            keys += [(area, language) for area in expertise for language in languages]
+            self.memberships[staff_id] = keys
+            self.names[staff_id] = name
+            self.rating[staff_id] = rating or 0
+            self.load[staff_id] = active_tickets
+            if active_tickets < capacity:
+                for key in keys:
+                    self.pools[key].append((active_tickets, -self.rating[staff_id], staff_id))
+        for heap in self.pools.values():
+            heapq.heapify(heap)
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def from_database(cls):
+        return cls(Staff.objects.filter(status='active').values_list(
+            'id', 'name', 'expertise', 'languages', 'rating', 'active_tickets',
+        ).iterator(chunk_size=2000))
+
+    def _top(self, key):
+        heap = self.pools.get(key)
+        while heap:
+            tickets, _, staff_id = heap[0]
+            if self.load.get(staff_id) == tickets:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def candidate_tiers(self, complaint_type, language=None):
+        expertise = EXPERTISE_BY_TYPE.get(complaint_type, DEFAULT_EXPERTISE)
+        if language:
+            yield [(area, language) for area in expertise]
+        yield [(area, None) for area in expertise]
+        yield [ANY]
+
+    def choose(self, complaint_type, language=None):
+        """Id of the staff member to take a complaint of ``complaint_type``, or None if everybody is full."""
+        for keys in self.candidate_tiers(complaint_type, language):
+            tops = [top for top in map(self._top, keys) if top is not None]
+            if tops:
+                return min(tops)[2]
+        return None
+
+    def _push(self, staff_id):
+        tickets = self.load[staff_id]
+        if tickets >= self.capacity:
+            return
+        entry = (tickets, -self.rating[staff_id], staff_id)
+        for key in self.memberships[staff_id]:
+            heap = self.pools[key]
+            heapq.heappush(heap, entry)
+            if len(heap) > 4 * len(self.load) + 64:
+                self._compact(key)
+
+    def _compact(self, key):
+        self.pools[key] = [
+            entry for entry in self.pools[key] if self.load.get(entry[2]) == entry[0]
+        ]
+        heapq.heapify(self.pools[key])
+
+    def take(self, staff_id, count=1):
+        self.load[staff_id] += count
+        self._push(staff_id)
+
+    def set_load(self, staff_id, tickets):
+        """Resync one member with the database; None drops them (no longer active)."""
+        if tickets is None:
+            self.load.pop(staff_id, None)
+            return
+        self.load[staff_id] = tickets
+        self._push(staff_id)
+
+
+_engine = None
+_engine_lock = threading.RLock()
+
+
+def get_engine():
+    global _engine
+    engine = _engine
+    if engine is None or time.monotonic() - engine.loaded_at > ENGINE_TTL:
+        # Loaded without the lock; concurrent reloads just build the same engine twice
+        engine = AssignmentEngine.from_database()
+        with _engine_lock:
+            _engine = engine
+    return engine
+
+
+def invalidate():
+    """Drop this process's engine so the next assignment reloads staff."""
+    global _engine
+    with _engine_lock:
+        _engine = None
+
+
+def plan(engine, complaints, language):
+    batches = defaultdict(list)
+    for complaint in complaints:
+        staff_id = engine.choose(complaint.type, language)
+        if staff_id is not None:
+            engine.take(staff_id)
+            batches[staff_id].append(complaint)
+    return batches
+
+
+def assign(complaints, language=None, engine=None):
+    """
+    Assign ``complaints`` to staff and return {complaint id: staff id}.
+
+    The chosen staff rows are locked and their workloads re-read before
+    ``active_tickets`` is bumped with an ``UPDATE ... SET active_tickets =
+    active_tickets + n``, so workers with stale in-memory workloads can never
+    push anyone over capacity: such members are resynced and their
+    complaints routed again. Complaints nobody can take stay unassigned.
+
+    The engine lock only guards the in-memory planning; it is never held
+    across queries.
+    """
+    complaints = [complaint for complaint in complaints if complaint.assigned_staff_id is None]
+    assigned = {}
+    engine = engine or get_engine()
+    try:
+        with transaction.atomic():
+            assign_with(engine, complaints, language, assigned)
+    except Exception:
+        # The in-memory workloads no longer match the database
+        invalidate()
+        raise
+    return assigned
+
+
+def assign_after_commit(complaints, language=None):
+    """
+    Assign newly filed ``complaints`` once the current transaction commits,
+    in a transaction of their own. A failure is logged and leaves them
+    unassigned for assign_complaints to pick up; it never undoes the filing.
+    """
+    def run():
+        try:
+            assign(complaints, language)
+        except Exception:
+            logger.exception('Auto-assignment failed for complaints %s', [complaint.id for complaint in complaints])
+    transaction.on_commit(run)
+
+
+def save_assignments(assignments, now):
+    """
+    Write ``assignments`` ((complaint, staff id, staff name) triples) and
+    return those that took. A row is only updated while it is still
+    unassigned and not Closed, so a complaint closed or assigned by hand
+    since it was loaded keeps its staff.
+
+    One parameterized UPDATE per row, whose rowcount tells whether it took;
+    bulk_update() builds a CASE expression per row, which costs more than
+    the assignment itself on large bursts.
+    """
+    if not assignments:
+        return []
+    quote = connection.ops.quote_name
+    meta = Complaint._meta
+    columns = [meta.get_field(name).column for name in ('assigned_staff', 'staff', 'updated_at')]
+    sql = 'UPDATE {} SET {} WHERE {} = %s AND {} IS NULL AND {} <> %s'.format(
+        quote(meta.db_table),
+        ', '.join(f'{quote(column)} = %s' for column in columns),
+        quote(meta.pk.column),
+        quote(meta.get_field('assigned_staff').column),
+        quote(meta.get_field('status').column),
+    )
+    updated_at = meta.get_field('updated_at').get_db_prep_value(now, connection)
+    saved = []
+    with connection.cursor() as cursor:
+        for complaint, staff_id, name in assignments:
+            cursor.execute(sql, (staff_id, name, updated_at, complaint.id, 'Closed'))
+            if cursor.rowcount:
+                saved.append((complaint, staff_id, name))
+    return saved
+
+
+def assign_with(engine, complaints, language, assigned):
+    for _ in range(MAX_RETRIES):
+        if not complaints:
+            break
+        with _engine_lock:
+            batches = plan(engine, complaints, language)
+        # Lock the chosen rows (in id order, so workers cannot deadlock) and
+        # check their real workload; other workers may have added tickets
+        current = dict(
+            Staff.objects.select_for_update().filter(id__in=sorted(batches), status='active')
+            .order_by('id').values_list('id', 'active_tickets')
+        )
+        retry = []
+        placed = []
+        with _engine_lock:
+            for staff_id, batch in batches.items():
+                tickets = current.get(staff_id)
+                if tickets is None or tickets + len(batch) > engine.capacity:
+                    engine.set_load(staff_id, tickets)
+                    retry.extend(batch)
+                else:
+                    placed.append(staff_id)
+
+        now = timezone.now()
+        saved = save_assignments([
+            (complaint, staff_id, engine.names[staff_id]) for staff_id in placed for complaint in batches[staff_id]
+        ], now)
+        taken = Counter(staff_id for _, staff_id, _ in saved)
+        by_count = defaultdict(list)
+        for staff_id, count in taken.items():
+            by_count[count].append(staff_id)
+        for count, staff_ids in sorted(by_count.items()):
+            Staff.objects.filter(id__in=staff_ids).update(active_tickets=F('active_tickets') + count)
+        with _engine_lock:
+            # Complaints closed or assigned meanwhile were counted by plan()
+            for staff_id in placed:
+                if taken[staff_id] < len(batches[staff_id]):
+                    engine.set_load(staff_id, current[staff_id] + taken[staff_id])
+        for complaint, staff_id, name in saved:
+            complaint.assigned_staff_id = staff_id
+            complaint.staff = name
+            complaint.updated_at = now
+            if hasattr(complaint, '_loaded_values'):
+                complaint._loaded_values.update(assigned_staff_id=staff_id, staff=name, updated_at=now)
+            assigned[complaint.id] = staff_id
+        complaints = retry
+
+    if assigned:
+        # Queryset updates skip the signal receivers; do their bookkeeping here
+        changes.record(list(assigned), ComplaintChange.UPSERT)
+        counters.apply({
+            counters.table_version_key('complaints'): 1,
+            counters.table_version_key('staff'): 1,
+        })
+
+
+def auto_assign_enabled():
+    return getattr(settings, 'COMPLAINT_AUTO_ASSIGN', True)
@@ -0,0 +1,106 @@
+import json
+
+from django.db import connection, transaction
+from rest_framework import serializers
+
+from . import assignment, counters, triage
+from .models import Complaint
+from .serializers import ComplaintSerializer
+from .signals import complaints_created
+
+MAX_BULK_ITEMS = 10000
+INSERT_CHUNK_SIZE = 500
+
+
+class BulkPayloadError(ValueError):
+    pass
+
+
+def parse_ndjson(body):
+    # Split the bytes: str.splitlines() would also break on U+2028 inside a JSON string
+    items = []
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            line = line.decode('utf-8')
+        except UnicodeDecodeError:
+            raise BulkPayloadError(f'Invalid UTF-8 on line {line_number}')
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            raise BulkPayloadError(f'Invalid JSON on line {line_number}')
+    return items
+
+
+def validate_items(items, user=None):
+    """
+    Validate every item with a single ComplaintSerializer instance.
+
+    Returns (results, complaints): one result dict per item in input order,
+    and unsaved Complaint objects for the valid items.
+    """
+    serializer = ComplaintSerializer()
+    results = []
+    complaints = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({'index': index, 'status': 'invalid', 'errors': {'non_field_errors': ['Expected an object']}})
+            continue
+        if user is not None:
+            item = {**item, 'user': user.id}
+        try:
+            validated = serializer.run_validation(item)
+        except serializers.ValidationError as e:
+            results.append({'index': index, 'status': 'invalid', 'errors': e.detail})
+            continue
+        results.append({'index': index, 'status': 'created'})
+        complaints.append(Complaint(**validated))
+    return results, complaints
+
+
+def bulk_insert(chunk):
+    """
+    bulk_create() ``chunk`` as one multi-row INSERT and give every complaint
+    its id.
+
+    Databases that return rows from a multi-row INSERT (SQLite, PostgreSQL,
+    MariaDB) set the ids themselves. MySQL does not, but it allocates the
+    ids of such a statement in one consecutive run, whatever
+    innodb_autoinc_lock_mode is, and LAST_INSERT_ID() is its first one.
+    """
+    Complaint.objects.bulk_create(chunk, batch_size=len(chunk))
+    if connection.features.can_return_rows_from_bulk_insert:
+        return chunk
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT LAST_INSERT_ID(), @@auto_increment_increment')
+        first_id, step = cursor.fetchone()
+    for offset, complaint in enumerate(chunk):
+        complaint.id = first_id + offset * step
+    return chunk
+
+
+def insert_complaints(complaints):
+    """Insert the complaints in chunks inside one transaction."""
+    with transaction.atomic():
+        for complaint in complaints:
+            # Set by the pre_save receiver on the save() path
+            triage.set_priority(complaint)
+            counters.set_closed_at(complaint, None)
+        for start in range(0, len(complaints), INSERT_CHUNK_SIZE):
+            chunk = bulk_insert(complaints[start:start + INSERT_CHUNK_SIZE])
+            complaints_created.send(sender=Complaint, instances=chunk)
+
+
+def ingest(items, user=None):
+    if len(items) > MAX_BULK_ITEMS:
+        raise BulkPayloadError(f'At most {MAX_BULK_ITEMS} complaints per request')
+    results, complaints = validate_items(items, user)
+    insert_complaints(complaints)
+    if assignment.auto_assign_enabled():
+        assignment.assign_after_commit(complaints)
+    created = iter(complaints)
+    for result in results:
+        if result['status'] == 'created':
+            result['id'] = next(created).id
+    return results
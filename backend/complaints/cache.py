@@ -0,0 +1,94 @@
+import hashlib
+import os
+import threading
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import counters
+
+COMPLAINTS = 'complaints'
+STAFF = 'staff'
+
+_MISSING = object()
+# Hit/miss counts of this process only; every worker keeps its own
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache():
+    return caches[getattr(settings, 'COMPLAINTS_CACHE_ALIAS', 'default')]
+
+
+def table_version(table):
+    """Change version of ``table``, bumped by the signal receivers in the same transaction as every write."""
+    key = counters.table_version_key(table)
+    return counters.get_values([key])[key]
+
+
+async def atable_version(table):
+    key = counters.table_version_key(table)
+    return (await counters.aget_values([key]))[key]
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def cached(table, key, build):
+    """
+    Return the cached result of ``build()`` for ``key``.
+
+    Cache keys embed the table's current change version, so any write to
+    the table moves readers to fresh keys and stale entries are never
+    served; they simply age out of the cache. Because the version lives in
+    the database, this holds even with a per-process local-memory cache.
+    """
+    cache = get_cache()
+    cache_key = f'{table}:v{table_version(table)}:{key}'
+    value = cache.get(cache_key, _MISSING)
+    if value is _MISSING:
+        _record('misses')
+        value = build()
+        cache.set(cache_key, value, getattr(settings, 'COMPLAINTS_CACHE_TIMEOUT', 300))
+    else:
+        _record('hits')
+    return value
+
+
+async def acached(table, key, build):
+    """cached() for async views; ``build`` is a coroutine function."""
+    cache = get_cache()
+    cache_key = f'{table}:v{await atable_version(table)}:{key}'
+    value = await cache.aget(cache_key, _MISSING)
+    if value is _MISSING:
+        _record('misses')
+        value = await build()
+        await cache.aset(cache_key, value, getattr(settings, 'COMPLAINTS_CACHE_TIMEOUT', 300))
+    else:
+        _record('hits')
+    return value
+
+
+def query_key(name, params):
+    """
+    Cache key for a list view and its query parameters. The parameters are
+    hashed so arbitrarily long filters stay within memcached's 250-byte keys.
+    """
+    query = urlencode(sorted(params.items()))
+    return name + '?' + hashlib.sha256(query.encode()).hexdigest()
+
+
+def stats():
+    """Hit/miss counts since this worker process started (not summed across workers)."""
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else 0,
+        'process': os.getpid(),
+    }
@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from . import counters
+from .models import Complaint, ComplaintChange, Counter
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+# Changes numbered per transaction of assign_sequence(); the rest wait for the next round
+SEQUENCE_BATCH = 5000
+SEQUENCE = 'changes.sequence'
+PRUNED_THROUGH = 'changes.pruned_through'
+
+
+class ExpiredToken(ValueError):
+    pass
+
+
+def record(complaint_ids, action):
+    now = timezone.now()
+    ComplaintChange.objects.bulk_create([
+        ComplaintChange(complaint_id=complaint_id, action=action, changed_at=now)
+        for complaint_id in complaint_ids
+    ])
+    # Entries are only numbered, and so only handed out, once the writing transaction has committed
+    transaction.on_commit(assign_sequence)
+
+
+def assign_sequence():
+    """
+    Number the committed changes that have no sequence number yet, in id
+    order, after the highest number handed out so far.
+
+    Numbering happens under the sequence counter's row lock, so numbers
+    become visible in the order they are handed out: a change that commits
+    after a client's token has moved on still gets a higher number than
+    the token, however long its transaction ran.
+    """
+    Counter.objects.get_or_create(key=SEQUENCE)
+    while True:
+        with transaction.atomic():
+            last = Counter.objects.select_for_update().get(key=SEQUENCE).value
+            pending = list(
+                ComplaintChange.objects.filter(sequence__isnull=True)
+                .order_by('id')
+                .values_list('id', flat=True)[:SEQUENCE_BATCH]
+            )
+            if not pending:
+                return
+            # Shifting the ids keeps their order; gaps between numbers are harmless
+            offset = last + 1 - pending[0]
+            ComplaintChange.objects.filter(id__in=pending).update(sequence=F('id') + offset)
+            Counter.objects.filter(key=SEQUENCE).update(value=pending[-1] + offset, updated_at=timezone.now())
+
+
+def changes_since(since, limit=DEFAULT_LIMIT):
+    """
+    Return (upserted complaints, deleted ids, next token, has_more) for the
+    changes after sequence number ``since``.
+
+    Several changes to one complaint collapse into its latest state. The
+    token is the last sequence number covered; passing it back resumes
+    right after it.
+    """
+    if since and since < counters.get_values([PRUNED_THROUGH])[PRUNED_THROUGH]:
+        raise ExpiredToken('Token is older than the retained deletions; resync from 0')
+
+    changes = list(
+        ComplaintChange.objects.filter(sequence__gt=since)
+        .order_by('sequence')
+        .values_list('sequence', 'complaint_id', 'action')[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if not changes:
+        return [], [], since, False
+
+    latest = {}
+    for _, complaint_id, action in changes:
+        latest[complaint_id] = action
+    upserted_ids = [complaint_id for complaint_id, action in latest.items() if action == ComplaintChange.UPSERT]
+    complaints = list(Complaint.objects.filter(id__in=upserted_ids).order_by('id'))
+    found = {complaint.id for complaint in complaints}
+    # A complaint deleted after this window is reported as deleted right away
+    deleted = sorted(complaint_id for complaint_id in latest if complaint_id not in found)
+    return complaints, deleted, changes[-1][0], has_more
+
+
+@transaction.atomic
+def compact(older_than):
+    """
+    Shrink the log while keeping the latest entry of every live complaint,
+    so syncing from 0 still yields a full snapshot.
+
+    Entries older than ``older_than`` are removed when a newer entry for
+    the same complaint exists, and old tombstones are dropped; tokens from
+    before the last dropped tombstone then raise ExpiredToken. Returns the
+    number of entries removed.
+    """
+    cutoff = timezone.now() - older_than
+    superseded = ComplaintChange.objects.filter(changed_at__lt=cutoff, sequence__isnull=False).filter(
+        Exists(ComplaintChange.objects.filter(complaint_id=OuterRef('complaint_id'), sequence__gt=OuterRef('sequence')))
+    )
+    removed, _ = ComplaintChange.objects.filter(id__in=list(superseded.values_list('id', flat=True))).delete()
+
+    tombstones = ComplaintChange.objects.filter(
+        action=ComplaintChange.DELETE, changed_at__lt=cutoff, sequence__isnull=False,
+    )
+    last_tombstone = tombstones.order_by('-sequence').values_list('sequence', flat=True).first()
+    if last_tombstone is not None:
+        removed += tombstones.delete()[0]
+        current = counters.get_values([PRUNED_THROUGH])[PRUNED_THROUGH]
+        counters.apply({PRUNED_THROUGH: max(last_tombstone - current, 0)})
+    return removed
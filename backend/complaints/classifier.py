@@ -0,0 +1,218 @@
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .search import tokenize
+
+# Complaint categories as filed by the frontend (type value -> label)
+CATEGORIES = {
+    'coach-maintenance': 'Coach - Maintenance/Facilities',
+    'electrical': 'Electrical Equipment',
+    'medical': 'Medical Assistance',
+    'catering': 'Catering / Vending Services',
+    'passenger-behaviour': 'Passengers Behaviour',
+    'water': 'Water Availability',
+    'punctuality': 'Punctuality',
+    'security': 'Security',
+    'ticketing': 'Unreserved / Reserved Ticketing',
+    'coach-cleanliness': 'Coach - Cleanliness',
+    'staff-behaviour': 'Staff Behaviour',
+    'refund': 'Refund of Tickets',
+    'amenities': 'Passenger Amenities',
+    'bedroll': 'Bed Roll',
+    'corruption': 'Corruption / Bribery',
+    'miscellaneous': 'Miscellaneous',
+}
+TYPE_BY_LABEL = {label.lower(): complaint_type for complaint_type, label in CATEGORIES.items()}
+SEVERITIES = ['Low', 'Medium', 'High']
+MAX_BATCH_SIZE = 10000
+
+
+class ModelNotTrained(RuntimeError):
+    pass
+
+
+def model_path():
+    return getattr(settings, 'COMPLAINT_CLASSIFIER_PATH', os.path.join(
+        settings.BASE_DIR.parent, 'datasets', 'processed', 'complaint_classifier.npz',
+    ))
+
+
+def normalize_type(value):
+    """Frontend type value for a category given as a type value or a label, or None."""
+    value = (value or '').strip()
+    if value in CATEGORIES:
+        return value
+    return TYPE_BY_LABEL.get(value.lower())
+
+
+def features(text):
+    """Unigrams plus adjacent-word bigrams."""
+    tokens = tokenize(text)
+    return tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+
+
+def vectorize(texts, vocabulary, idf):
+    """
+    L2-normalised TF-IDF rows in CSR form (indptr, indices, values).
+
+    Only the tokenisation is per-document Python; weighting and
+    normalisation run over the flat arrays of all documents at once.
+    """
+    indices = []
+    indptr = [0]
+    for text in texts:
+        indices.extend(index for index in map(vocabulary.get, features(text)) if index is not None)
+        indptr.append(len(indices))
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+    rows = np.repeat(np.arange(len(texts)), np.diff(indptr))
+    # Collapse repeated terms of a document into one (row, term, count) entry
+    keys, counts = np.unique(rows * len(idf) + indices, return_counts=True)
+    rows, indices = np.divmod(keys, len(idf))
+    values = counts.astype(np.float32) * idf[indices]
+    norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(texts)))
+    values /= norms[rows]
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=len(texts)))))
+    return indptr, indices, values
+
+
+def sparse_dot(indptr, indices, values, weights):
+    """(CSR matrix) @ weights, for a dense (n_features, n_classes) ``weights``."""
+    scores = np.zeros((len(indptr) - 1, weights.shape[1]), dtype=np.float32)
+    nonempty = np.diff(indptr) > 0
+    if nonempty.any():
+        # Rows are contiguous runs, so each sum runs up to the next non-empty row's start
+        scores[nonempty] = np.add.reduceat(values[:, None] * weights[indices], indptr[:-1][nonempty], axis=0)
+    return scores
+
+
+def softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+def fit_naive_bayes(matrix, labels, n_classes, n_features, alpha=0.1):
+    """Multinomial naive Bayes on TF-IDF weights: (log P(term | class), log P(class))."""
+    indptr, indices, values = matrix
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    totals = np.zeros((n_features, n_classes), dtype=np.float64)
+    np.add.at(totals, (indices, labels[rows]), values)
+    totals += alpha
+    log_prob = np.log(totals / totals.sum(axis=0, keepdims=True))
+    prior = np.log((np.bincount(labels, minlength=n_classes) + 1) / (len(labels) + n_classes))
+    return log_prob.astype(np.float32), prior.astype(np.float32)
+
+
+def train(descriptions, types, severities, min_df=2, max_features=50000):
+    """
+    Fit the category and severity models on parallel lists of descriptions
+    and labels (``severities`` entries may be None) and return the arrays
+    making up the artifact.
+    """
+    document_frequency = {}
+    for text in descriptions:
+        for term in set(features(text)):
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+    terms = sorted(
+        (term for term, df in document_frequency.items() if df >= min_df),
+        key=lambda term: (-document_frequency[term], term),
+    )[:max_features]
+    terms.sort()
+    vocabulary = {term: index for index, term in enumerate(terms)}
+    df = np.array([document_frequency[term] for term in terms], dtype=np.float32)
+    idf = (np.log((1 + len(descriptions)) / (1 + df)) + 1).astype(np.float32)
+
+    matrix = vectorize(descriptions, vocabulary, idf)
+    type_labels = sorted(set(types))
+    type_index = {label: index for index, label in enumerate(type_labels)}
+    type_log_prob, type_prior = fit_naive_bayes(
+        matrix, np.array([type_index[label] for label in types]), len(type_labels), len(terms),
+    )
+
+    rated = np.array([severity in SEVERITIES for severity in severities])
+    severity_labels = np.array([SEVERITIES.index(severity) if severity in SEVERITIES else 0 for severity in severities])
+    indptr, indices, values = matrix
+    keep = np.repeat(rated, np.diff(indptr))
+    rated_matrix = (
+        np.concatenate(([0], np.cumsum(np.diff(indptr)[rated]))), indices[keep], values[keep],
+    )
+    severity_log_prob, severity_prior = fit_naive_bayes(
+        rated_matrix, severity_labels[rated], len(SEVERITIES), len(terms),
+    )
+    return {
+        # Terms never contain newlines; one byte string stays compact on disk and in memory
+        'vocabulary': np.frombuffer('\n'.join(terms).encode(), dtype=np.uint8),
+        'idf': idf,
+        'type_labels': np.array(type_labels),
+        'type_log_prob': type_log_prob,
+        'type_prior': type_prior,
+        'severity_labels': np.array(SEVERITIES),
+        'severity_log_prob': severity_log_prob,
+        'severity_prior': severity_prior,
+    }
+
+
+class ComplaintClassifier:
+    def __init__(self, arrays):
+        terms = arrays['vocabulary'].tobytes().decode().split('\n')
+        self.vocabulary = {term: index for index, term in enumerate(terms)}
+        self.idf = arrays['idf']
+        self.type_labels = arrays['type_labels'].tolist()
+        self.type_log_prob = arrays['type_log_prob']
+        self.type_prior = arrays['type_prior']
+        self.severity_labels = arrays['severity_labels'].tolist()
+        self.severity_log_prob = arrays['severity_log_prob']
+        self.severity_prior = arrays['severity_prior']
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls({name: arrays[name] for name in arrays.files})
+
+    def predict(self, descriptions):
+        """One {type, category, confidence, severity, severity_confidence} dict per description."""
+        if not descriptions:
+            return []
+        matrix = vectorize(descriptions, self.vocabulary, self.idf)
+        type_probs = softmax(sparse_dot(*matrix, self.type_log_prob) + self.type_prior)
+        severity_probs = softmax(sparse_dot(*matrix, self.severity_log_prob) + self.severity_prior)
+        types = type_probs.argmax(axis=1)
+        severities = severity_probs.argmax(axis=1)
+        rows = np.arange(len(descriptions))
+        type_confidence = type_probs[rows, types].astype(float).round(4).tolist()
+        severity_confidence = severity_probs[rows, severities].astype(float).round(4).tolist()
+        return [
+            {
+                'type': self.type_labels[t],
+                'category': CATEGORIES.get(self.type_labels[t], self.type_labels[t]),
+                'confidence': type_confidence[i],
+                'severity': self.severity_labels[s],
+                'severity_confidence': severity_confidence[i],
+            }
+            for i, (t, s) in enumerate(zip(types.tolist(), severities.tolist()))
+        ]
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_classifier():
+    """The trained classifier, loaded on first use and kept for the life of the process."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            path = model_path()
+            if not os.path.exists(path):
+                raise ModelNotTrained(f'No classifier at {path}; run manage.py train_classifier')
+            _model = ComplaintClassifier.load(path)
+        return _model
+
+
+def classify(descriptions):
+    return get_classifier().predict(descriptions)
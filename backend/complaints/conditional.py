@@ -0,0 +1,75 @@
+import functools
+import hashlib
+
+from asgiref.sync import iscoroutinefunction
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from . import counters
+from .models import Counter
+
+
+def table_state(request, tables):
+    """
+    (versions, last modified) of ``tables``, read once per request from
+    the change-version counters the signal receivers bump on every write.
+    """
+    cached = getattr(request, '_table_state', None)
+    if cached is None or cached[0] != tables:
+        keys = [counters.table_version_key(table) for table in tables]
+        cached = request._table_state = state_of(tables, keys, state_rows(keys))
+    return cached[1], cached[2]
+
+
+async def atable_state(request, tables):
+    """table_state() through the async ORM; leaves the result on the request for table_state()."""
+    keys = [counters.table_version_key(table) for table in tables]
+    rows = [row async for row in state_rows(keys)]
+    request._table_state = state_of(tables, keys, rows)
+
+
+def state_rows(keys):
+    return Counter.objects.filter(key__in=keys).values_list('key', 'value', 'updated_at')
+
+
+def state_of(tables, keys, rows):
+    rows = {key: (value, updated_at) for key, value, updated_at in rows}
+    versions = tuple(rows.get(key, (0, None))[0] for key in keys)
+    modified = [updated_at for _, updated_at in rows.values()]
+    return tables, versions, max(modified) if modified else None
+
+
+def conditional_on(*tables):
+    """
+    Decorator adding strong ETag / Last-Modified headers derived from the
+    change versions of ``tables``, and answering If-None-Match /
+    If-Modified-Since with 304 before the view (and its serializer) runs.
+
+    The ETag also covers the request path, query string and Accept header,
+    since each of those selects a different representation, and the date,
+    for date-relative figures such as resolved_today.
+    """
+    def etag(request, *args, **kwargs):
+        versions, _ = table_state(request, tables)
+        variant = hashlib.sha1('|'.join([
+            request.get_full_path(), request.META.get('HTTP_ACCEPT', ''), timezone.localdate().isoformat(),
+        ]).encode()).hexdigest()[:16]
+        return '"{}-{}"'.format('.'.join(str(version) for version in versions), variant)
+
+    def last_modified(request, *args, **kwargs):
+        return table_state(request, tables)[1]
+
+    conditional = condition(etag_func=etag, last_modified_func=last_modified)
+
+    def decorator(view):
+        conditional_view = conditional(view)
+        if not iscoroutinefunction(view):
+            return conditional_view
+
+        @functools.wraps(view)
+        async def preloaded(request, *args, **kwargs):
+            # condition() calls etag() and last_modified() synchronously, even around async views
+            await atable_state(request, tables)
+            return await conditional_view(request, *args, **kwargs)
+        return preloaded
+    return decorator
@@ -0,0 +1,156 @@
+from collections import Counter as Deltas
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import ArchivedComplaint, Complaint, Counter, Staff
+
+COMPLAINTS_TOTAL = 'complaints.total'
+STAFF_TOTAL = 'staff.total'
+
+
+def complaint_status_key(status):
+    return f'complaints.status.{status}'
+
+
+def complaints_closed_on_key(date):
+    return f'complaints.closed_on.{date.isoformat()}'
+
+
+def staff_status_key(status):
+    return f'staff.status.{status}'
+
+
+def table_version_key(table):
+    return f'version.{table}'
+
+
+def apply(deltas):
+    """
+    Add ``deltas`` ({key: amount}) to the counter rows.
+
+    Each counter is bumped with a single ``UPDATE ... SET value = value + n``
+    so concurrent writers never lose increments. Keys are applied in sorted
+    order so two transactions always lock the rows in the same order.
+    """
+    now = timezone.now()
+    for key, delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        updated = Counter.objects.filter(key=key).update(value=F('value') + delta, updated_at=now)
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                Counter.objects.create(key=key, value=delta, updated_at=now)
+        except IntegrityError:
+            # Another transaction created the row first
+            Counter.objects.filter(key=key).update(value=F('value') + delta, updated_at=now)
+
+
+def get_values(keys):
+    values = dict.fromkeys(keys, 0)
+    values.update(Counter.objects.filter(key__in=keys).values_list('key', 'value'))
+    return values
+
+
+async def aget_values(keys):
+    values = dict.fromkeys(keys, 0)
+    values.update([row async for row in Counter.objects.filter(key__in=keys).values_list('key', 'value')])
+    return values
+
+
+def set_closed_at(complaint, old_status):
+    """Keep ``closed_at`` at the start of the complaint's current closure; None while it is not closed."""
+    if complaint.status != 'Closed':
+        complaint.closed_at = None
+    elif old_status != 'Closed' or complaint.closed_at is None:
+        complaint.closed_at = timezone.now()
+
+
+def complaint_deltas(old_status, new_status, closed_at=None):
+    """
+    Counter changes for a write that moves a complaint from ``old_status``
+    to ``new_status`` (None = absent). Every write also bumps the table's
+    change version.
+
+    A closure counts towards the day it happened for as long as it lasts:
+    reopening a complaint takes it back off the day of ``closed_at``, so
+    closing, reopening and closing again counts once.
+    """
+    deltas = Deltas()
+    deltas[table_version_key('complaints')] += 1
+    if old_status == new_status:
+        return deltas
+    if old_status is None:
+        deltas[COMPLAINTS_TOTAL] += 1
+    else:
+        deltas[complaint_status_key(old_status)] -= 1
+    if new_status is None:
+        deltas[COMPLAINTS_TOTAL] -= 1
+    else:
+        deltas[complaint_status_key(new_status)] += 1
+        if new_status == 'Closed':
+            deltas[complaints_closed_on_key(timezone.localdate())] += 1
+        elif old_status == 'Closed' and closed_at is not None:
+            deltas[complaints_closed_on_key(timezone.localdate(closed_at))] -= 1
+    return deltas
+
+
+def staff_deltas(old_status, new_status):
+    deltas = Deltas()
+    deltas[table_version_key('staff')] += 1
+    if old_status == new_status:
+        return deltas
+    if old_status is None:
+        deltas[STAFF_TOTAL] += 1
+    else:
+        deltas[staff_status_key(old_status)] -= 1
+    if new_status is None:
+        deltas[STAFF_TOTAL] -= 1
+    else:
+        deltas[staff_status_key(new_status)] += 1
+    return deltas
+
+
+def dashboard_stats():
+    today_key = complaints_closed_on_key(timezone.localdate())
+    keys = [
+        COMPLAINTS_TOTAL,
+        complaint_status_key('Open'),
+        complaint_status_key('In Progress'),
+        complaint_status_key('Closed'),
+        today_key,
+        STAFF_TOTAL,
+        staff_status_key('active'),
+    ]
+    values = get_values(keys)
+    total = values[COMPLAINTS_TOTAL]
+    closed = values[complaint_status_key('Closed')]
+    return {
+        'total_complaints': total,
+        'open': values[complaint_status_key('Open')],
+        'in_progress': values[complaint_status_key('In Progress')],
+        'closed': closed,
+        'resolved_today': values[today_key],
+        'resolution_rate': round(closed * 100 / total, 1) if total else 0,
+        'total_staff': values[STAFF_TOTAL],
+        'active_agents': values[staff_status_key('active')],
+    }
+
+
+@transaction.atomic
+def rebuild():
+    """Recount the complaint and staff totals from the tables (closed-on history and versions are kept)."""
+    Counter.objects.exclude(key__startswith='complaints.closed_on.').exclude(key__startswith='version.').delete()
+    deltas = Deltas()
+    # Archived complaints still count towards the totals
+    for model in (Complaint, ArchivedComplaint):
+        deltas[COMPLAINTS_TOTAL] += model.objects.count()
+        for row in model.objects.values('status').annotate(n=Count('id')):
+            deltas[complaint_status_key(row['status'])] += row['n']
+    deltas[STAFF_TOTAL] = Staff.objects.count()
+    for row in Staff.objects.values('status').annotate(n=Count('id')):
+        deltas[staff_status_key(row['status'])] = row['n']
+    apply(deltas)
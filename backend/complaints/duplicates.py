@@ -0,0 +1,241 @@
+import functools
+import hashlib
+import re
+import zlib
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+
+from . import changes, counters, triage
+from .models import Complaint, ComplaintChange, DuplicateCluster, MinHashBand
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+# Shingle-set Jaccard similarity from which two complaints count as duplicates.
+# With 16 bands of 4 rows a pair at 0.6 is a candidate with probability ~0.9
+DUPLICATE_THRESHOLD = 0.6
+MAX_CANDIDATES = 50
+INDEX_FIELDS = ('description', 'train_number', 'date_of_incident')
+
+_PRIME = (1 << 31) - 1
+_SPACE_RE = re.compile(r'\W+')
+
+
+def shingles(text):
+    """Character shingles of the lower-cased text with punctuation and spacing collapsed."""
+    text = _SPACE_RE.sub(' ', (text or '').lower()).strip()
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+@functools.cache
+def hash_coefficients():
+    """The (a, b) coefficients of the NUM_PERMUTATIONS hash functions, fixed so stored bands stay valid."""
+    import numpy as np
+
+    rng = np.random.default_rng(20250501)
+    return (
+        rng.integers(1, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64),
+        rng.integers(0, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64),
+    )
+
+
+def signature(shingle_set):
+    """MinHash signature: the minimum of each of NUM_PERMUTATIONS hash functions over the shingles."""
+    import numpy as np
+
+    a, b = hash_coefficients()
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode()) for shingle in shingle_set), dtype=np.uint64, count=len(shingle_set),
+    ) % _PRIME
+    # (a * x + b) mod p for every permutation and shingle at once; a, x < 2^31 keeps it in 64 bits
+    return ((a[:, None] * hashes[None, :] + b[:, None]) % _PRIME).min(axis=1)
+
+
+def band_buckets(sig):
+    """One signed 64-bit bucket id per band, covering the band number and its rows."""
+    buckets = []
+    for band in range(BANDS):
+        rows = sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(bytes([band]) + rows.tobytes(), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, 'big', signed=True))
+    return buckets
+
+
+def partition_key(complaint):
+    """Complaints are only compared with those on the same train and day."""
+    return f'{complaint.train_number or ""}|{complaint.date_of_incident}'[:40]
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def band_rows(complaint, shingle_set):
+    if not shingle_set:
+        return []
+    partition = partition_key(complaint)
+    return [
+        MinHashBand(partition=partition, bucket=bucket, complaint_id=complaint.id)
+        for bucket in band_buckets(signature(shingle_set))
+    ]
+
+
+def save_clusters(joins, new_clusters, chunk_ids):
+    """
+    Write the memberships decided in memory and return {complaint id:
+    cluster id}. ``joins`` maps a cluster id to the complaint ids joining
+    it; negative ids stand for the unsaved ``new_clusters`` (-1 the first).
+    """
+    if not joins:
+        return {}
+    if connection.features.can_return_rows_from_bulk_insert:
+        DuplicateCluster.objects.bulk_create(new_clusters)
+    else:
+        for new_cluster in new_clusters:
+            new_cluster.save()
+    cluster_ids = {}
+    joined = {}
+    for cluster_id, complaint_ids in joins.items():
+        if cluster_id < 0:
+            cluster_id = new_clusters[-cluster_id - 1].id
+        cluster_ids.update(dict.fromkeys(complaint_ids, cluster_id))
+        joined[cluster_id] = len(complaint_ids)
+    Complaint.objects.filter(id__in=cluster_ids, cluster__isnull=True).update(cluster_id=Case(
+        *(When(id=complaint_id, then=Value(cluster_id)) for complaint_id, cluster_id in cluster_ids.items()),
+    ))
+    DuplicateCluster.objects.filter(id__in=set(cluster_ids.values())).update(size=Subquery(
+        Complaint.objects.filter(cluster_id=OuterRef('pk')).values('cluster_id').annotate(
+            total=Count('id'),
+        ).values('total'),
+    ))
+    triage.refresh_clusters(joined)
+    # Queryset updates skip the signal receivers; the chunk's own complaints are logged by theirs
+    outside = [complaint_id for complaint_id in cluster_ids if complaint_id not in chunk_ids]
+    changes.record(outside, ComplaintChange.UPSERT)
+    counters.apply({counters.table_version_key('complaints'): 1})
+    return cluster_ids
+
+
+def index(complaint, cluster=True):
+    """
+    (Re)index ``complaint`` and, with ``cluster``, link it to the
+    near-duplicates already filed on the same train and day.
+    """
+    with transaction.atomic():
+        MinHashBand.objects.filter(complaint_id=complaint.id).delete()
+        index_chunk([complaint], cluster)
+    return complaint.cluster_id
+
+
+def index_new(complaints, chunk_size=500):
+    """Index and cluster freshly inserted complaints (e.g. a bulk upload), in order."""
+    for start in range(0, len(complaints), chunk_size):
+        with transaction.atomic():
+            index_chunk(complaints[start:start + chunk_size])
+
+
+def index_chunk(complaints, cluster=True):
+    """
+    Candidates come from the LSH band buckets through the (partition,
+    bucket) index, so the cost depends on the few complaints sharing a
+    bucket rather than on the size of the table. Candidates are confirmed
+    with their exact shingle similarity; complaints earlier in the chunk
+    count as candidates for later ones.
+    """
+    prepared = []
+    for complaint in complaints:
+        shingle_set = shingles(complaint.description)
+        rows = band_rows(complaint, shingle_set)
+        if rows:
+            prepared.append((complaint, shingle_set, rows))
+    if not prepared:
+        return
+
+    postings = defaultdict(set)
+    candidate_shingles = {}
+    clusters = {}
+    if cluster:
+        keys = {(row.partition, row.bucket) for _, _, rows in prepared for row in rows}
+        for partition, bucket, complaint_id in MinHashBand.objects.filter(
+            partition__in={key[0] for key in keys}, bucket__in={key[1] for key in keys},
+        ).values_list('partition', 'bucket', 'complaint_id'):
+            if (partition, bucket) in keys:
+                postings[partition, bucket].add(complaint_id)
+        existing = set().union(*postings.values())
+        for complaint_id, description, cluster_id in Complaint.objects.filter(id__in=existing).values_list(
+            'id', 'description', 'cluster_id',
+        ):
+            candidate_shingles[complaint_id] = shingles(description)
+            clusters[complaint_id] = cluster_id
+
+    # Decide memberships in memory and write them per cluster at the end
+    joins = defaultdict(set)
+    new_clusters = []
+    for complaint, shingle_set, rows in prepared:
+        if not cluster:
+            break
+        candidates = set().union(*(postings.get((row.partition, row.bucket), ()) for row in rows))
+        candidates.discard(complaint.id)
+        # In a large incident every report shares buckets; the latest ones are enough
+        candidates = sorted(candidates, reverse=True)[:MAX_CANDIDATES]
+        matches = [
+            candidate_id for candidate_id in candidates
+            if jaccard(shingle_set, candidate_shingles.get(candidate_id, set())) >= DUPLICATE_THRESHOLD
+        ]
+        clusters.setdefault(complaint.id, complaint.cluster_id)
+        if matches and not clusters[complaint.id]:
+            joined = [clusters[match] for match in matches if clusters.get(match)]
+            target = min((cluster_id for cluster_id in joined if cluster_id > 0), default=None)
+            if target is None and joined:
+                target = joined[0]
+            elif target is None:
+                new_clusters.append(DuplicateCluster(
+                    train_number=complaint.train_number,
+                    date_of_incident=complaint.date_of_incident,
+                    first_complaint_id=min(matches),
+                ))
+                target = -len(new_clusters)
+            for member in matches + [complaint.id]:
+                if not clusters.get(member):
+                    clusters[member] = target
+                    joins[target].add(member)
+        for row in rows:
+            postings[row.partition, row.bucket].add(complaint.id)
+        candidate_shingles[complaint.id] = shingle_set
+
+    cluster_ids = save_clusters(joins, new_clusters, {complaint.id for complaint in complaints})
+    for complaint in complaints:
+        if complaint.id in cluster_ids:
+            complaint.cluster_id = cluster_ids[complaint.id]
+            if hasattr(complaint, '_loaded_values'):
+                complaint._loaded_values['cluster_id'] = complaint.cluster_id
+    MinHashBand.objects.bulk_create([row for _, _, rows in prepared for row in rows], batch_size=2000)
+
+
+def leave(cluster_id):
+    """Take a deleted or archived complaint out of cluster ``cluster_id`` and re-rank the members left."""
+    DuplicateCluster.objects.filter(id=cluster_id, size__gt=0).update(size=F('size') - 1)
+    size = DuplicateCluster.objects.filter(id=cluster_id).values_list('size', flat=True).first()
+    # Clusters still past the cap after shrinking rank the same
+    if size is not None and size <= triage.weights()['max_duplicates']:
+        triage.refresh(Complaint.objects.filter(cluster_id=cluster_id))
+
+
+def rebuild(batch_size=2000):
+    """Re-create every complaint's bands without touching existing clusters; returns the number indexed."""
+    MinHashBand.objects.all().delete()
+    indexed = 0
+    rows = []
+    for complaint in Complaint.objects.only(*INDEX_FIELDS).order_by('id').iterator(chunk_size=batch_size):
+        rows.extend(band_rows(complaint, shingles(complaint.description)))
+        indexed += 1
+        if len(rows) >= batch_size * BANDS:
+            MinHashBand.objects.bulk_create(rows)
+            rows = []
+    MinHashBand.objects.bulk_create(rows)
+    return indexed
@@ -0,0 +1,260 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+ADMIN_TOPIC = 'admin'
+QUEUE_SIZE = 256
+HEARTBEAT_INTERVAL = 15
+
+logger = logging.getLogger(__name__)
+
+
+def user_topic(user_id):
+    return f'user.{user_id}'
+
+
+def train_topic(train_number):
+    return f'train.{train_number}'
+
+
+def complaint_event(instance, previous_status):
+    """Event for a created complaint (``previous_status`` None) or a status change."""
+    topics = [ADMIN_TOPIC]
+    if instance.user_id:
+        topics.append(user_topic(instance.user_id))
+    if instance.train_number:
+        topics.append(train_topic(instance.train_number))
+    return {
+        'type': 'complaint.created' if previous_status is None else 'complaint.status',
+        'topics': topics,
+        'data': {
+            'id': instance.id,
+            'status': instance.status,
+            'previous_status': previous_status,
+            'type': instance.type,
+            'severity': instance.severity,
+            'train_number': instance.train_number,
+        },
+    }
+
+
+def staff_event(instance, previous_status):
+    return {
+        'type': 'staff.status',
+        'topics': [ADMIN_TOPIC],
+        'data': {'id': instance.id, 'status': instance.status, 'previous_status': previous_status},
+    }
+
+
+class Subscription:
+    def __init__(self, topics):
+        self.topics = frozenset(topics)
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        # Set when the client stopped keeping up and missed events
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventHub:
+    """
+    Per-process fan-out of events to the open event streams.
+
+    Subscriptions are indexed by topic, so an event costs one dict lookup
+    per topic plus one queue put per interested subscriber; idle streams
+    cost nothing but their queue. The hub belongs to the event loop of the
+    ASGI server; ``publish`` may be called from any thread.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.get_running_loop()
+                get_backend().listen(self)
+        subscription = Subscription(topics)
+        for topic in subscription.topics:
+            self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        for topic in subscription.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    def deliver(self, event):
+        """Hand ``event`` to its subscribers; must run on the hub's loop."""
+        delivered = set()
+        for topic in event['topics']:
+            for subscription in self._subscribers.get(topic, ()):
+                if subscription not in delivered:
+                    delivered.add(subscription)
+                    subscription.put(event)
+
+    def publish(self, event):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self.deliver, event)
+
+    def subscriber_count(self):
+        return len({subscription for subscribers in self._subscribers.values() for subscription in subscribers})
+
+
+hub = EventHub()
+
+
+class LocalEventBackend:
+    """Events only reach streams served by the process that made the change."""
+
+    def publish(self, events):
+        for event in events:
+            hub.publish(event)
+
+    def listen(self, hub):
+        pass
+
+
+class DatabaseEventBackend:
+    """
+    Share events between worker processes through the PushEvent table.
+
+    Every process polls the table once per ``POLL_INTERVAL`` for all of its
+    streams, so the database load does not grow with the number of
+    connections. Rows older than ``RETENTION`` are pruned by the pollers.
+
+    Inserts can commit out of id order, so ids a poll skips over are
+    fetched again by the following polls for up to ``GAP_TIMEOUT`` seconds.
+    """
+
+    POLL_INTERVAL = 1
+    RETENTION = timedelta(minutes=5)
+    GAP_TIMEOUT = 30
+    # Most skipped ids remembered per jump; larger jumps are id gaps, not slow commits
+    MAX_GAP = 1000
+
+    def publish(self, events):
+        from .models import PushEvent
+
+        PushEvent.objects.bulk_create([PushEvent(payload=json.dumps(event)) for event in events], batch_size=500)
+
+    def listen(self, hub):
+        asyncio.get_running_loop().create_task(self._poll(hub))
+
+    def _latest_id(self):
+        from .models import PushEvent
+
+        return PushEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def _fetch(self, after, gaps=()):
+        from .models import PushEvent
+
+        rows = PushEvent.objects.filter(Q(id__gt=after) | Q(id__in=list(gaps)))
+        return list(rows.order_by('id').values_list('id', 'payload')[:1000])
+
+    def _prune(self):
+        from .models import PushEvent
+
+        PushEvent.objects.filter(created_at__lt=timezone.now() - self.RETENTION).delete()
+
+    def _receive(self, hub, rows, last_id, gaps):
+        """
+        Deliver fetched ``rows`` and return the new last id. ``gaps`` maps
+        each skipped id still looked for to when it was first skipped.
+        """
+        now = time.monotonic()
+        for event_id, payload in rows:
+            if event_id > last_id:
+                gaps.update(dict.fromkeys(range(max(last_id + 1, event_id - self.MAX_GAP), event_id), now))
+                last_id = event_id
+            else:
+                gaps.pop(event_id, None)
+            hub.deliver(json.loads(payload))
+        for event_id, skipped_at in list(gaps.items()):
+            if now - skipped_at > self.GAP_TIMEOUT:
+                del gaps[event_id]
+        return last_id
+
+    async def _poll(self, hub):
+        last_id = await sync_to_async(self._latest_id)()
+        gaps = {}
+        polls = 0
+        while True:
+            await asyncio.sleep(self.POLL_INTERVAL)
+            try:
+                rows = await sync_to_async(self._fetch)(last_id, gaps)
+                last_id = self._receive(hub, rows, last_id, gaps)
+                polls += 1
+                if polls % 60 == 0:
+                    await sync_to_async(self._prune)()
+            except Exception:
+                # Keep the streams alive through a database hiccup
+                logger.warning('Polling push events failed', exc_info=True)
+
+
+BACKENDS = {
+    'local': LocalEventBackend,
+    'database': DatabaseEventBackend,
+}
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        name = getattr(settings, 'COMPLAINT_EVENT_BACKEND', 'local')
+        _backend = BACKENDS[name]() if name in BACKENDS else import_string(name)()
+    return _backend
+
+
+def publish(events):
+    """Publish ``events`` once the current transaction commits, so rolled back changes are never pushed."""
+    if events:
+        transaction.on_commit(lambda: get_backend().publish(events))
+
+
+def format_sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+async def stream(topics):
+    """Server-sent events for ``topics``, with a comment line as heartbeat while idle."""
+    # Subscribe on first iteration so the finally clause always unsubscribes
+    subscription = hub.subscribe(topics)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            if subscription.overflowed:
+                # The client missed events; it should refetch and reconnect
+                yield 'event: resync\ndata: {}\n\n'
+                return
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_sse(event)
+    finally:
+        hub.unsubscribe(subscription)
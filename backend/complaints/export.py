@@ -0,0 +1,117 @@
+import csv
+import itertools
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+
+from .feedback import parse_reference
+from .models import ArchivedComplaint, ArchivedFeedback, Complaint, Feedback
+from .pagination import InvalidFilter, filter_complaints
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+CHUNK_SIZE = 1000
+
+FEEDBACK_FILTERS = ('complaint_id', 'category', 'subcategory', 'rating')
+
+
+class ExportNegotiation(DefaultContentNegotiation):
+    """?format= names the export format, not a renderer; the exports stream their own content and errors are JSON."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        renderer = JSONRenderer()
+        return renderer, renderer.media_type
+
+
+def export_view(view):
+    """Use ExportNegotiation for an @api_view function view."""
+    view.cls.content_negotiation_class = ExportNegotiation
+    return view
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def iterate_in_chunks(queryset, fields, chunk_size=CHUNK_SIZE):
+    """
+    Yield ``fields`` tuples for every row of ``queryset`` in primary key order.
+
+    Rows are read with one ``WHERE id > last_id ORDER BY id LIMIT n`` query
+    per chunk. Unlike QuerySet.iterator(), which the MySQL driver buffers in
+    full, this keeps at most one chunk in memory at a time.
+    """
+    fields = ['id'] + [field for field in fields if field != 'id']
+    last_id = None
+    while True:
+        chunk = queryset.order_by('id')
+        if last_id is not None:
+            chunk = chunk.filter(id__gt=last_id)
+        rows = list(chunk.values_list(*fields)[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def render_csv(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render_ndjson(fields, rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+def streaming_export(querysets, fields, export_format, filename):
+    """Stream the rows of each queryset in turn (hot table, then archive), each in primary key order."""
+    fields = ['id'] + [field for field in fields if field != 'id']
+    rows = itertools.chain.from_iterable(iterate_in_chunks(queryset, fields) for queryset in querysets)
+    if export_format == 'csv':
+        content = render_csv(fields, rows)
+    else:
+        content = render_ndjson(fields, rows)
+    response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+
+def complaint_fields():
+    return [field.attname for field in Complaint._meta.concrete_fields]
+
+
+def export_complaints(params, export_format):
+    querysets = [filter_complaints(model.objects.all(), params) for model in (Complaint, ArchivedComplaint)]
+    return streaming_export(querysets, complaint_fields(), export_format, 'complaints')
+
+
+def export_feedback(params, export_format):
+    lookups = {
+        field: params[field] for field in FEEDBACK_FILTERS if params.get(field) not in (None, '')
+    }
+    if 'rating' in lookups:
+        try:
+            lookups['rating'] = int(lookups['rating'])
+        except ValueError:
+            raise InvalidFilter('rating must be an integer')
+    querysets = [Feedback.objects.all(), ArchivedFeedback.objects.all()]
+    if 'complaint_id' in lookups:
+        # Matched on the resolved complaint, as the feedback endpoint does
+        lookups['complaint_id'] = parse_reference(lookups['complaint_id'])
+        if lookups['complaint_id'] is None:
+            querysets = [queryset.none() for queryset in querysets]
+    querysets = [queryset.filter(**lookups) for queryset in querysets]
+    fields = [field.attname for field in Feedback._meta.concrete_fields]
+    return streaming_export(querysets, fields, export_format, 'feedback')
@@ -0,0 +1,99 @@
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import ArchivedFeedback, Complaint, Feedback, FeedbackRollup
+
+# "42", "#42", "CMP-42": the complaint number, optionally behind a short prefix
+REFERENCE_RE = re.compile(r'^\s*(?:[A-Za-z]+[-_ ]?)?#?(\d{1,18})\s*$')
+SCOPE_FIELDS = {
+    FeedbackRollup.COMPLAINT: 'complaint_id',
+    FeedbackRollup.CATEGORY: 'category',
+    FeedbackRollup.SUBCATEGORY: 'subcategory',
+}
+
+
+def parse_reference(reference):
+    """Complaint id in a submitted reference, or None."""
+    match = REFERENCE_RE.match(reference or '')
+    return int(match.group(1)) if match else None
+
+
+def resolve_complaint(reference):
+    """Id of the complaint a reference points to, or None if it names none."""
+    pk = parse_reference(reference)
+    if pk is None or not Complaint.objects.filter(pk=pk).exists():
+        return None
+    return pk
+
+
+def rollup_keys(values):
+    """(scope, key) of every rollup a feedback row with these field values counts towards."""
+    keys = []
+    for scope, field in SCOPE_FIELDS.items():
+        if values.get(field) not in (None, ''):
+            keys.append((scope, str(values[field])[:100]))
+    return keys
+
+
+def rollup_deltas(old_values, new_values):
+    """
+    {(scope, key): (count, rating_total)} changes for a write that moves a
+    feedback row from ``old_values`` to ``new_values`` (None = absent).
+    """
+    deltas = {}
+    for values, sign in ((old_values, -1), (new_values, 1)):
+        if values is None:
+            continue
+        for key in rollup_keys(values):
+            count, total = deltas.get(key, (0, 0))
+            deltas[key] = (count + sign, total + sign * values['rating'])
+    return {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+
+
+def apply(deltas):
+    """Add ``deltas`` to the rollup rows, in key order, the same way counters.apply does."""
+    now = timezone.now()
+    for (scope, key), (count, total) in sorted(deltas.items()):
+        rollups = FeedbackRollup.objects.filter(scope=scope, key=key)
+        if rollups.update(count=F('count') + count, rating_total=F('rating_total') + total, updated_at=now):
+            continue
+        try:
+            with transaction.atomic():
+                FeedbackRollup.objects.create(scope=scope, key=key, count=count, rating_total=total, updated_at=now)
+        except IntegrityError:
+            rollups.update(count=F('count') + count, rating_total=F('rating_total') + total, updated_at=now)
+
+
+def summary(scope, keys=None, limit=100):
+    """[{key, count, average_rating}] for ``scope``, most-rated first."""
+    rollups = FeedbackRollup.objects.filter(scope=scope, count__gt=0)
+    if keys:
+        rollups = rollups.filter(key__in=keys)
+    return [
+        {'key': key, 'count': count, 'average_rating': round(total / count, 2)}
+        for key, count, total in rollups.order_by('-count', 'key').values_list('key', 'count', 'rating_total')[:limit]
+    ]
+
+
+def rebuild():
+    """Recompute every rollup row from the feedback table; returns the number of rows written."""
+    rows = []
+    with transaction.atomic():
+        for scope, field in SCOPE_FIELDS.items():
+            # Archived feedback still counts towards the rollups
+            totals = {}
+            for model in (Feedback, ArchivedFeedback):
+                for row in model.objects.values(field).annotate(count=Count('id'), rating_total=Sum('rating')).order_by():
+                    if row[field] not in (None, ''):
+                        count, total = totals.get(str(row[field])[:100], (0, 0))
+                        totals[str(row[field])[:100]] = (count + row['count'], total + row['rating_total'])
+            rows.extend(
+                FeedbackRollup(scope=scope, key=key, count=count, rating_total=total)
+                for key, (count, total) in totals.items()
+            )
+        FeedbackRollup.objects.all().delete()
+        FeedbackRollup.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
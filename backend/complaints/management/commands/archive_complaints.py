@@ -0,0 +1,81 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from complaints import archive
+from complaints.models import Complaint
+
+MEASURE_RUNS = 15
+
+
+def hot_queries():
+    """The list, count and filter queries that pay for every row left in the hot table."""
+    train_number = Complaint.objects.order_by('-id').values_list('train_number', flat=True).first()
+    return {
+        'count all': lambda: Complaint.objects.count(),
+        'count per status': lambda: list(Complaint.objects.values('status').order_by().annotate(n=Count('id'))),
+        'first list page': lambda: list(Complaint.objects.order_by('date_of_incident', 'id').values()[:50]),
+        'train filter': lambda: list(Complaint.objects.filter(train_number=train_number).values()),
+        'full list': lambda: list(Complaint.objects.values()),
+    }
+
+
+def measure():
+    timings = {}
+    for name, query in hot_queries().items():
+        runs = []
+        for _ in range(MEASURE_RUNS):
+            start = time.perf_counter()
+            query()
+            runs.append((time.perf_counter() - start) * 1000)
+        timings[name] = statistics.median(runs)
+    return timings
+
+
+class Command(BaseCommand):
+    help = (
+        'Move complaints closed more than --days days ago, with their feedback, to the archive '
+        'tables in batches that commit one by one (rerun to resume). Detail lookups, feedback '
+        'and exports keep finding archived complaints; dashboard counts and rollups keep counting them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=archive.DEFAULT_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE)
+        parser.add_argument('--limit', type=int, default=None, help='Archive at most this many complaints')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived')
+        parser.add_argument('--measure', action='store_true', help='Time the hot-table queries before and after')
+
+    def handle(self, *args, **options):
+        before = archive.cutoff(options['days'])
+        complaints, feedback = archive.plan(before)
+        self.stdout.write(
+            f"{complaints} complaints closed before {before:%Y-%m-%d %H:%M} with {feedback} feedback rows "
+            f"({Complaint.objects.count()} complaints in the hot table)"
+        )
+        baseline = measure() if options['measure'] else None
+        if options['dry_run']:
+            for name, elapsed in (baseline or {}).items():
+                self.stdout.write(f'{name:<18} {elapsed:9.2f}ms')
+            return
+
+        start = time.perf_counter()
+        moved = feedback_moved = 0
+        for ids, feedback_rows in archive.archive(before, options['batch_size'], options['limit']):
+            moved += len(ids)
+            feedback_moved += feedback_rows
+            self.stdout.write(f'  archived {moved} complaints (through id {ids[-1]})', ending='\r')
+            self.stdout.flush()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'Archived {moved} complaints and {feedback_moved} feedback rows in {elapsed:.1f}s '
+            f'({moved / elapsed if elapsed else 0:.0f} complaints/s)'
+        )
+        if baseline:
+            after = measure()
+            for name, elapsed in baseline.items():
+                self.stdout.write(
+                    f'{name:<18} {elapsed:9.2f}ms -> {after[name]:9.2f}ms (x{elapsed / after[name] if after[name] else 0:.1f} faster)'
+                )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from complaints.assignment import assign
+from complaints.models import Complaint
+
+
+class Command(BaseCommand):
+    help = 'Assign open complaints that have no staff member yet (e.g. filed while everybody was full)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        assigned = 0
+        last_id = 0
+        while True:
+            chunk = list(
+                Complaint.objects.filter(assigned_staff__isnull=True, id__gt=last_id)
+                .exclude(status='Closed')
+                .order_by('id')[:options['chunk']]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            assigned += len(assign(chunk))
+        self.stdout.write(f'Assigned {assigned} complaints')
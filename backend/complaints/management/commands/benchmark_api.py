@@ -0,0 +1,388 @@
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Max, Min
+from django.test import Client
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from complaints import triage
+from complaints.models import Complaint, ComplaintChange, DuplicateCluster, Feedback, Staff, StaffAttribute
+from complaints.staff_directory import attribute_rows
+from complaints.urls import urlpatterns
+
+from .benchmark_assignment import LANGUAGES
+from .benchmark_duplicates import DETAILS, ISSUES
+
+TYPES = ['electrical', 'catering', 'water', 'coach-cleanliness', 'security', 'medical', 'punctuality', 'bedroll']
+BENCHMARK_ADMIN = 'benchmark-admin'
+SEED_BATCH_SIZE = 5000
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def complaint_item(rng, index):
+    return {
+        'type': rng.choice(TYPES),
+        'description': f'{rng.choice(ISSUES)} in coach S{rng.randint(1, 12)} {rng.choice(DETAILS)}',
+        'train_number': f'{12000 + rng.randrange(900)}',
+        'pnr_number': f'{4100000000 + index}',
+        'severity': rng.choice(['Low', 'Medium', 'High']),
+        'date_of_incident': '2025-05-01',
+    }
+
+
+def feedback_item(rng, context):
+    return {
+        'complaint_id': str(rng.randint(*context['complaint_ids'])),
+        'category': rng.choice(['Service', 'Cleanliness', 'Staff', 'Food']),
+        'subcategory': rng.choice(['Speed', 'Courtesy', 'Quality']),
+        'feedback_message': 'Benchmark feedback',
+        'rating': rng.randint(1, 5),
+        'name': 'Benchmark',
+        'email': 'benchmark@benchmark.invalid',
+    }
+
+
+# URL name -> function(rng, context) returning (method, path, JSON body or None).
+# Routes of complaints/urls.py missing here are reported as skipped, so new routes show up in the results.
+ROUTES = {
+    'complaint_list': lambda rng, c: ('GET', f'/api/complaints/list/?page_size=50&status={rng.choice(["Open", "Closed"])}', None),
+    'user_complaints': lambda rng, c: ('GET', '/api/complaints/user/?page_size=50', None),
+    'complaint_detail': lambda rng, c: ('GET', f'/api/complaints/{rng.randint(*c["complaint_ids"])}/', None),
+    'dashboard-stats': lambda rng, c: ('GET', '/api/complaints/stats/', None),
+    'complaint-trends': lambda rng, c: ('GET', f'/api/complaints/trends/?by={rng.choice(["status", "type"])}', None),
+    'complaint-search': lambda rng, c: ('GET', f'/api/complaints/search/?q={rng.choice(ISSUES).split()[0]}', None),
+    'complaint-changes': lambda rng, c: ('GET', f'/api/complaints/changes/?since={c["change_since"]}&limit=100', None),
+    'complaint-classify': lambda rng, c: (
+        'POST', '/api/complaints/classify/', {'descriptions': [complaint_item(rng, 0)['description'] for _ in range(20)]},
+    ),
+    'duplicate-clusters': lambda rng, c: ('GET', '/api/complaints/clusters/?limit=50', None),
+    'duplicate-cluster-detail': lambda rng, c: ('GET', f'/api/complaints/clusters/{rng.choice(c["cluster_ids"])}/', None),
+    'triage-queue': lambda rng, c: ('GET', '/api/complaints/triage/?k=50', None),
+    'cache-stats': lambda rng, c: ('GET', '/api/complaints/cache/stats/', None),
+    'complaint-export': lambda rng, c: (
+        'GET', f'/api/complaints/export/?format=ndjson&train_number={12000 + rng.randrange(900)}', None,
+    ),
+    'feedback-export': lambda rng, c: (
+        'GET', f'/api/complaints/feedback/export/?format=csv&complaint_id={rng.randint(*c["complaint_ids"])}', None,
+    ),
+    'admin_profile': lambda rng, c: ('GET', '/api/complaints/admin/profile/', None),
+    'feedback': lambda rng, c: ('GET', f'/api/complaints/feedback/?complaint_id={rng.randint(*c["complaint_ids"])}', None),
+    'feedback-summary': lambda rng, c: ('GET', f'/api/complaints/feedback/summary/?by={rng.choice(["category", "subcategory"])}', None),
+    'staff-list': lambda rng, c: ('GET', f'/api/complaints/staff/?language={rng.choice(LANGUAGES)}', None),
+    'staff-detail': lambda rng, c: ('GET', f'/api/complaints/staff/{rng.randint(*c["staff_ids"])}/', None),
+    # Writes run after every read so the reads see the seeded steady state
+    'file_complaint': lambda rng, c: ('POST', '/api/complaints/file/', complaint_item(rng, rng.randrange(10 ** 8))),
+    'bulk-file-complaints': lambda rng, c: (
+        'POST', '/api/complaints/bulk/', [complaint_item(rng, rng.randrange(10 ** 8)) for _ in range(100)],
+    ),
+    'submit-feedback': lambda rng, c: ('POST', '/api/complaints/submit/', feedback_item(rng, c)),
+    'triage-claim': lambda rng, c: ('POST', '/api/complaints/triage/claim/', {'k': 5}),
+    'triage-release': lambda rng, c: ('POST', '/api/complaints/triage/release/', {}),
+}
+WRITE_ROUTES = {'file_complaint', 'bulk-file-complaints', 'submit-feedback', 'triage-claim', 'triage-release'}
+SKIPPED_ROUTES = {
+    'complaint-events': 'server-sent event stream; needs an ASGI server',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a dedicated benchmark database and drive every complaints API route with '
+        'concurrent clients, recording latency percentiles, throughput, SQL queries per '
+        'request and peak RSS as JSON. Seeded data is kept: point DJANGO_DB_ENGINE/'
+        'SQLITE_PATH (or the MySQL settings) at a scratch database and migrate it first. '
+        'The classify route answers 503 until train_classifier has written a model.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--complaints', type=int, default=10000, help='Complaints to seed (e.g. 10k-5M)')
+        parser.add_argument('--feedback', type=int, default=20000, help='Feedback rows to seed')
+        parser.add_argument('--staff', type=int, default=500, help='Staff members to seed')
+        parser.add_argument('--reuse', action='store_true', help='Benchmark the existing data without seeding')
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent clients per route')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per route')
+        parser.add_argument('--routes', nargs='*', help='Only these URL names')
+        parser.add_argument('--read-only', action='store_true', help='Skip the routes that write')
+        parser.add_argument('--output', default=None, help='JSON result path (default: api-benchmark-<commit>.json)')
+        parser.add_argument('--compare', default=None, help='Earlier JSON result to report regressions against')
+        parser.add_argument('--threshold', type=float, default=1.2, help='p95 ratio reported as a regression')
+        parser.add_argument('--seed', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        seeding = {}
+        if not options['reuse']:
+            if Complaint.objects.exists():
+                raise CommandError(
+                    'The database already has complaints; use an empty benchmark database or pass --reuse'
+                )
+            seeding = self.seed(options, rng)
+        context = self.context()
+        volumes = {
+            'complaints': Complaint.objects.count(),
+            'feedback': Feedback.objects.count(),
+            'staff': Staff.objects.count(),
+        }
+        token = self.admin_token()
+
+        names = [pattern.name for pattern in urlpatterns]
+        if options['routes']:
+            names = [name for name in names if name in options['routes']]
+        skipped = {name: reason for name, reason in SKIPPED_ROUTES.items() if name in names}
+        skipped.update({
+            name: 'no request recipe in benchmark_api.ROUTES' for name in names if name not in ROUTES and name not in skipped
+        })
+        if options['read_only']:
+            skipped.update({name: 'writes (--read-only)' for name in names if name in WRITE_ROUTES})
+        ordered = [name for name in names if name not in skipped and name not in WRITE_ROUTES]
+        ordered += [name for name in names if name not in skipped and name in WRITE_ROUTES]
+
+        results = []
+        # Failed requests are counted per route; keep their tracebacks off the console
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        for name in ordered:
+            result = self.run_route(name, context, token, options, rng)
+            results.append(result)
+            self.stdout.write(
+                f"{name:<26} p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  "
+                f"p99 {result['p99_ms']:8.2f}ms  {result['throughput_rps']:8.1f} req/s  "
+                f"{result['queries_mean']:6.1f} q/req  {result['errors']:4d} errors"
+            )
+        for name, reason in sorted(skipped.items()):
+            self.stdout.write(f'{name:<26} skipped: {reason}')
+
+        commit = git_commit()
+        report = {
+            'meta': {
+                'commit': commit,
+                'timestamp': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'cpus': os.cpu_count(),
+                'clients': options['clients'],
+                'requests_per_route': options['requests'],
+                'volumes': volumes,
+                'seeding': seeding,
+                'peak_rss_mb': peak_rss_mb(),
+            },
+            'routes': results,
+            'skipped': skipped,
+        }
+        output = options['output'] or f"api-benchmark-{(commit or 'local')[:12]}.json"
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f'Wrote {output}')
+        if options['compare']:
+            self.compare(options['compare'], results, options['threshold'])
+
+    def seed(self, options, rng):
+        timings = {}
+        start = time.perf_counter()
+        staff = []
+        for i in range(options['staff']):
+            staff.append(Staff(
+                name=f'Agent {i}', email=f'agent{i}@benchmark.invalid', phone='0000000000',
+                role=rng.choice(['agent', 'supervisor']), department=rng.choice(['Support', 'Technical', 'Catering']),
+                status=rng.choice(['active', 'active', 'inactive']),
+                expertise=json.dumps(rng.sample(['Technical Support', 'Catering', 'Cleanliness', 'Security'], 2)),
+                languages=json.dumps(['English', rng.choice(LANGUAGES[1:])]),
+                communication_preferences=json.dumps([rng.choice(['Email', 'Phone', 'Chat'])]),
+                rating=round(rng.uniform(3, 5), 1),
+            ))
+        Staff.objects.bulk_create(staff, batch_size=SEED_BATCH_SIZE)
+        StaffAttribute.objects.bulk_create([
+            row for member in Staff.objects.values('id', 'expertise', 'languages', 'communication_preferences')
+            for row in attribute_rows(member['id'], member)
+        ], batch_size=SEED_BATCH_SIZE)
+        timings['staff_s'] = round(time.perf_counter() - start, 1)
+
+        start = time.perf_counter()
+        now = timezone.now()
+        seeded = 0
+        while seeded < options['complaints']:
+            batch = []
+            for index in range(seeded, min(seeded + SEED_BATCH_SIZE, options['complaints'])):
+                item = complaint_item(rng, index)
+                item['date_of_incident'] = datetime.date(2025, 1, 1) + datetime.timedelta(days=rng.randrange(120))
+                complaint = Complaint(
+                    **item, status=rng.choice(['Open', 'In Progress', 'Closed']),
+                    created_at=now - datetime.timedelta(seconds=rng.randrange(90 * 86400)),
+                )
+                triage.set_priority(complaint)
+                batch.append(complaint)
+            Complaint.objects.bulk_create(batch)
+            seeded += len(batch)
+            self.stdout.write(f'  seeded {seeded} complaints', ending='\r')
+            self.stdout.flush()
+        timings['complaints_s'] = round(time.perf_counter() - start, 1)
+
+        start = time.perf_counter()
+        # Ids of a freshly seeded table are contiguous
+        bounds = Complaint.objects.aggregate(low=Min('id'), high=Max('id'))
+        context = {'complaint_ids': (bounds['low'], bounds['high'])}
+        seeded = 0
+        while seeded < options['feedback']:
+            batch = []
+            for _ in range(min(SEED_BATCH_SIZE, options['feedback'] - seeded)):
+                item = feedback_item(rng, context)
+                reference = item.pop('complaint_id')
+                batch.append(Feedback(**item, complaint_reference=reference, complaint_id=int(reference)))
+            Feedback.objects.bulk_create(batch)
+            seeded += len(batch)
+        timings['feedback_s'] = round(time.perf_counter() - start, 1)
+
+        # bulk_create skips the write-path bookkeeping; rebuild every derived table
+        for command in (
+            'rebuild_stats', 'rebuild_search_index', 'rebuild_duplicate_index',
+            'rebuild_feedback_rollups', 'backfill_complaint_rollups',
+        ):
+            start = time.perf_counter()
+            call_command(command, stdout=open(os.devnull, 'w'))
+            timings[f'{command}_s'] = round(time.perf_counter() - start, 1)
+        self.stdout.write(f'seeded: {timings}')
+        return timings
+
+    def context(self):
+        complaints = Complaint.objects.aggregate(low=Min('id'), high=Max('id'))
+        staff = Staff.objects.aggregate(low=Min('id'), high=Max('id'))
+        if complaints['low'] is None or staff['low'] is None:
+            raise CommandError('Benchmark data needs at least one complaint and one staff member')
+        last_change = ComplaintChange.objects.aggregate(last=Max('id'))['last'] or 0
+        return {
+            'complaint_ids': (complaints['low'], complaints['high']),
+            'staff_ids': (staff['low'], staff['high']),
+            'cluster_ids': list(DuplicateCluster.objects.order_by('-id').values_list('id', flat=True)[:100]) or [0],
+            'change_since': max(last_change - 1000, 0),
+        }
+
+    def admin_token(self):
+        user, created = User.objects.get_or_create(username=BENCHMARK_ADMIN, defaults={'is_staff': True})
+        if created:
+            user.set_unusable_password()
+            user.save()
+        return Token.objects.get_or_create(user=user)[0].key
+
+    def run_route(self, name, context, token, options, rng):
+        requests = [ROUTES[name](random.Random(rng.random()), context) for _ in range(options['requests'])]
+        latencies = []
+        queries = []
+        statuses = {}
+        failures = []
+        lock = threading.Lock()
+        pending = iter(requests)
+
+        def worker():
+            # Server errors are counted, not raised; SQLite for one answers concurrent writes with "database is locked"
+            client = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f'Token {token}')
+            count = 0
+
+            def count_queries(execute, sql, params, many, context):
+                nonlocal count
+                count += 1
+                return execute(sql, params, many, context)
+
+            try:
+                with connection.execute_wrapper(count_queries):
+                    while True:
+                        with lock:
+                            request = next(pending, None)
+                        if request is None:
+                            return
+                        method, path, body = request
+                        count = 0
+                        start = time.perf_counter()
+                        if method == 'GET':
+                            response = client.get(path)
+                        else:
+                            response = client.post(path, json.dumps(body), content_type='application/json')
+                        if response.streaming:
+                            for _ in response.streaming_content:
+                                pass
+                        elapsed = time.perf_counter() - start
+                        with lock:
+                            latencies.append(elapsed * 1000)
+                            queries.append(count)
+                            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                            if response.exc_info and not failures:
+                                failures.append(repr(response.exc_info[1]))
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['clients']) as pool:
+            for future in [pool.submit(worker) for _ in range(options['clients'])]:
+                future.result()
+        wall = time.perf_counter() - start
+        latencies.sort()
+        return {
+            'name': name,
+            'method': requests[0][0],
+            'path': requests[0][1].split('?')[0],
+            'requests': len(latencies),
+            'errors': sum(count for code, count in statuses.items() if code >= 500),
+            'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+            'first_error': failures[0] if failures else None,
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'throughput_rps': round(len(latencies) / wall, 1),
+            'queries_mean': round(sum(queries) / len(queries), 1),
+            'queries_max': max(queries),
+            # High-water mark of the whole process so far
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+    def compare(self, path, results, threshold):
+        with open(path) as f:
+            baseline = {route['name']: route for route in json.load(f)['routes']}
+        regressions = 0
+        for result in results:
+            before = baseline.get(result['name'])
+            if not before or not before['p95_ms']:
+                continue
+            ratio = result['p95_ms'] / before['p95_ms']
+            queries = result['queries_mean'] - before['queries_mean']
+            if ratio >= threshold or queries >= 1:
+                regressions += 1
+                self.stdout.write(self.style.WARNING(
+                    f"{result['name']:<26} p95 {before['p95_ms']:.2f} -> {result['p95_ms']:.2f}ms "
+                    f"(x{ratio:.2f}), queries/request {before['queries_mean']} -> {result['queries_mean']}"
+                ))
+        self.stdout.write(f'{regressions} regressions against {path}')
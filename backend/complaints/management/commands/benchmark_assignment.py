@@ -0,0 +1,118 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+
+from complaints.assignment import (
+    DEFAULT_EXPERTISE, EXPERTISE_BY_TYPE, AssignmentEngine, assign,
+)
+from complaints.models import Complaint, Staff
+
+LANGUAGES = ['English', 'Hindi', 'Tamil', 'Telugu', 'Bengali', 'Marathi', 'Kannada']
+
+
+def make_staff(count, rng):
+    areas = sorted({area for areas in EXPERTISE_BY_TYPE.values() for area in areas} | set(DEFAULT_EXPERTISE))
+    return [
+        Staff(
+            name=f'Agent {i}',
+            email=f'agent{i}@benchmark.invalid',
+            phone='0000000000',
+            role='agent',
+            department='Support',
+            expertise=json.dumps(rng.sample(areas, 2)),
+            languages=json.dumps(['English'] + rng.sample(LANGUAGES[1:], 1)),
+            rating=round(rng.uniform(3, 5), 1),
+        )
+        for i in range(count)
+    ]
+
+
+def make_complaints(count, rng):
+    types = list(EXPERTISE_BY_TYPE) + ['miscellaneous']
+    return [
+        Complaint(
+            type=rng.choice(types),
+            description=f'Benchmark complaint {i}',
+            date_of_incident='2025-05-01',
+        )
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure assignment throughput for a burst of complaints against a large '
+        'staff roster. Runs inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--staff', type=int, default=10000)
+        parser.add_argument('--complaints', type=int, default=100000)
+        parser.add_argument('--chunk', type=int, default=1000, help='Complaints per assign() call')
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        with transaction.atomic():
+            Staff.objects.bulk_create(make_staff(options['staff'], rng), batch_size=1000)
+            complaints = make_complaints(options['complaints'], rng)
+            Complaint.objects.bulk_create(complaints, batch_size=1000)
+            self.stdout.write(f"{options['staff']} staff, {len(complaints)} complaints")
+
+            start = time.perf_counter()
+            engine = AssignmentEngine.from_database()
+            self.report('load engine', time.perf_counter() - start)
+
+            # Routing cost alone: the heap engine against scanning every matching member
+            probe = complaints[:1000]
+            scratch = AssignmentEngine.from_database()
+            start = time.perf_counter()
+            for complaint in probe:
+                scratch.take(scratch.choose(complaint.type))
+            self.report('heap choose', time.perf_counter() - start, len(probe))
+            start = time.perf_counter()
+            for complaint in probe:
+                self.scan(scratch, complaint.type)
+            self.report('linear scan', time.perf_counter() - start, len(probe))
+
+            queries = 0
+
+            def count_queries(execute, sql, params, many, context):
+                nonlocal queries
+                queries += 1
+                return execute(sql, params, many, context)
+
+            assigned = 0
+            chunk = options['chunk']
+            with connection.execute_wrapper(count_queries):
+                start = time.perf_counter()
+                for offset in range(0, len(complaints), chunk):
+                    assigned += len(assign(complaints[offset:offset + chunk], engine=engine))
+                elapsed = time.perf_counter() - start
+            self.report('assign (db)', elapsed, len(complaints), f'{queries} queries')
+
+            totals = Staff.objects.aggregate(tickets=Sum('active_tickets'), busiest=Max('active_tickets'))
+            self.stdout.write(
+                f"assigned {assigned}, active_tickets total {totals['tickets']}, "
+                f"busiest {totals['busiest']} (capacity {engine.capacity})"
+            )
+            transaction.set_rollback(True)
+
+    def scan(self, engine, complaint_type):
+        wanted = set(EXPERTISE_BY_TYPE.get(complaint_type, DEFAULT_EXPERTISE))
+        best = None
+        for staff_id, keys in engine.memberships.items():
+            if any(key[0] in wanted for key in keys):
+                entry = (engine.load[staff_id], -engine.rating[staff_id], staff_id)
+                if best is None or entry < best:
+                    best = entry
+        return best
+
+    def report(self, label, elapsed, operations=None, extra=''):
+        line = f'{label:<14} {elapsed:8.3f}s'
+        if operations:
+            line += f'  {operations / elapsed:12.0f} ops/s  {elapsed / operations * 1e6:9.1f} us/op'
+        self.stdout.write(f'{line}  {extra}'.rstrip())
@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import django
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from complaints.models import Complaint
+
+from .benchmark_api import ROUTES, Command as ApiBenchmark, git_commit, peak_rss_mb, percentile
+
+# URL names of the routes with async-native views; the write runs last so the reads see the seeded data
+ASYNC_ROUTES = ['complaint_list', 'complaint_detail', 'staff-list', 'file_complaint']
+MODES = {'sync': 'false', 'async': 'true'}
+
+
+async def call(application, method, path, body=b'', headers=()):
+    """One request straight through the ASGI ``application``; returns (status, body bytes)."""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'content-length', str(len(body)).encode()), *headers], 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    received = False
+    status = None
+    chunks = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # The client never disconnects; Django cancels this wait once the response is sent
+        await asyncio.Future()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await application(scope, receive, send)
+    return status, b''.join(chunks)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the sync and async-native complaint views under many concurrent clients. '
+        'Each mode runs in its own process serving backend.asgi with COMPLAINTS_ASYNC_VIEWS '
+        'set accordingly; clients are coroutines calling the ASGI application in-process, so '
+        'the numbers cover Django and the database but no network server. Run it against a '
+        'database seeded by benchmark_api.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000, help='Concurrent clients per route')
+        parser.add_argument('--requests', type=int, default=5000, help='Requests per route')
+        parser.add_argument('--routes', nargs='*', choices=ASYNC_ROUTES, help='Only these URL names')
+        parser.add_argument('--read-only', action='store_true', help='Skip file_complaint')
+        parser.add_argument('--output', default=None, help='JSON result path (default: async-benchmark-<commit>.json)')
+        parser.add_argument('--seed', type=int, default=24)
+        parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if not Complaint.objects.exists():
+            raise CommandError('Seed the database first, e.g. with benchmark_api')
+        routes = [name for name in ASYNC_ROUTES if not options['routes'] or name in options['routes']]
+        if options['read_only']:
+            routes = [name for name in routes if name != 'file_complaint']
+        if options['mode']:
+            # Child process: report one mode on stdout
+            self.stdout.write(json.dumps(asyncio.run(self.run_mode(routes, options))))
+            return
+
+        modes = {}
+        for mode, enabled in MODES.items():
+            arguments = [
+                sys.executable, os.path.abspath(sys.argv[0]), 'benchmark_async', '--mode', mode,
+                '--clients', str(options['clients']), '--requests', str(options['requests']),
+                '--seed', str(options['seed']), '--routes', *routes,
+            ]
+            process = subprocess.run(
+                arguments, env={**os.environ, 'COMPLAINTS_ASYNC_VIEWS': enabled}, capture_output=True, text=True,
+            )
+            if process.returncode:
+                raise CommandError(f'{mode} run failed:\n{process.stderr}')
+            modes[mode] = json.loads(process.stdout.strip().splitlines()[-1])
+            for result in modes[mode]['routes']:
+                self.stdout.write(
+                    f"{mode:<5} {result['name']:<16} p50 {result['p50_ms']:8.1f}ms  p95 {result['p95_ms']:8.1f}ms  "
+                    f"p99 {result['p99_ms']:8.1f}ms  {result['throughput_rps']:7.1f} req/s  "
+                    f"{result['errors']:4d} errors  {result['threads_max']:4d} threads"
+                )
+
+        commit = git_commit()
+        report = {
+            'meta': {
+                'commit': commit,
+                'timestamp': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'cpus': os.cpu_count(),
+                'clients': options['clients'],
+                'requests_per_route': options['requests'],
+                'complaints': Complaint.objects.count(),
+            },
+            'modes': modes,
+        }
+        output = options['output'] or f"async-benchmark-{(commit or 'local')[:12]}.json"
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f'Wrote {output}')
+
+    async def run_mode(self, routes, options):
+        if settings.COMPLAINTS_ASYNC_VIEWS != (options['mode'] == 'async'):
+            raise CommandError('COMPLAINTS_ASYNC_VIEWS does not match --mode')
+        application = get_asgi_application()
+        # Under this load nearly every request is logged as slow
+        for logger in ('django.request', 'complaints.metrics'):
+            logging.getLogger(logger).setLevel(logging.CRITICAL)
+        benchmark = ApiBenchmark()
+        context = await asyncio.to_thread(benchmark.context)
+        rng = random.Random(options['seed'])
+        results = []
+        for name in routes:
+            # Filed complaints need PNRs no earlier run (or the other mode) has used
+            route_rng = random.Random() if name == 'file_complaint' else rng
+            requests = [ROUTES[name](random.Random(route_rng.random()), context) for _ in range(options['requests'])]
+            pending = iter(requests)
+            latencies = []
+            statuses = {}
+            threads_max = 0
+
+            async def client():
+                nonlocal threads_max
+                for method, path, body in pending:
+                    headers = [(b'content-type', b'application/json')] if body is not None else []
+                    start = time.perf_counter()
+                    status, _ = await call(application, method, path, json.dumps(body).encode() if body else b'', headers)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    statuses[status] = statuses.get(status, 0) + 1
+                    threads_max = max(threads_max, threading.active_count())
+
+            start = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(options['clients'])))
+            wall = time.perf_counter() - start
+            latencies.sort()
+            results.append({
+                'name': name,
+                'method': requests[0][0],
+                'requests': len(latencies),
+                'errors': sum(count for code, count in statuses.items() if code >= 500),
+                'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+                'p50_ms': round(percentile(latencies, 0.5), 2),
+                'p95_ms': round(percentile(latencies, 0.95), 2),
+                'p99_ms': round(percentile(latencies, 0.99), 2),
+                'mean_ms': round(sum(latencies) / len(latencies), 2),
+                'throughput_rps': round(len(latencies) / wall, 1),
+                # Django runs each request's sync code in a thread of its own under ASGI
+                'threads_max': threads_max,
+            })
+        return {'routes': results, 'peak_rss_mb': peak_rss_mb()}
@@ -0,0 +1,66 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+
+
+def make_items(count):
+    types = ['electrical', 'catering', 'water', 'coach-cleanliness', 'security']
+    return [
+        {
+            'type': types[i % len(types)],
+            'description': f'Kiosk complaint {i}: fan not working in coach S{i % 12 + 1}',
+            'train_number': f'12{i % 900:03d}',
+            'pnr_number': f'{4100000000 + i}',
+            'severity': ['Low', 'Medium', 'High'][i % 3],
+            'date_of_incident': '2025-05-01',
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare filing N complaints one POST at a time against one bulk POST. '
+        'Runs inside a transaction that is rolled back, so no data is kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=10000)
+
+    def run(self, label, requests):
+        client = Client()
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            start = time.perf_counter()
+            for path, body, content_type in requests:
+                response = client.post(path, body, content_type=content_type)
+                if response.status_code != 201:
+                    raise RuntimeError(f'{path} returned {response.status_code}: {response.content[:200]}')
+            elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{label:<14} {elapsed:8.2f}s  {self.items / elapsed:10.0f} items/s  {queries:7d} queries'
+        )
+
+    def handle(self, *args, **options):
+        self.items = options['items']
+        items = make_items(self.items)
+        with transaction.atomic():
+            self.run('single-item', [
+                ('/api/complaints/file/', json.dumps(item), 'application/json') for item in items
+            ])
+            self.run('bulk (json)', [
+                ('/api/complaints/bulk/', json.dumps(items), 'application/json')
+            ])
+            self.run('bulk (ndjson)', [
+                ('/api/complaints/bulk/', '\n'.join(json.dumps(item) for item in items), 'application/x-ndjson')
+            ])
+            transaction.set_rollback(True)
@@ -0,0 +1,42 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.classifier import ModelNotTrained, get_classifier
+from complaints.models import Complaint
+
+
+class Command(BaseCommand):
+    help = 'Report classifier throughput (complaints/s) for several batch sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=20000)
+        parser.add_argument('--batch-sizes', default='1,100,1000,10000')
+
+    def handle(self, *args, **options):
+        try:
+            start = time.perf_counter()
+            model = get_classifier()
+            self.stdout.write(f'load model     {time.perf_counter() - start:8.3f}s')
+        except ModelNotTrained as e:
+            raise CommandError(str(e))
+
+        descriptions = list(Complaint.objects.values_list('description', flat=True)[:options['items']])
+        if not descriptions:
+            # No complaints filed yet: random sentences over the model's own vocabulary
+            rng = random.Random(0)
+            terms = [term for term in model.vocabulary if ' ' not in term]
+            descriptions = [' '.join(rng.choices(terms, k=rng.randint(8, 30))) for _ in range(1000)]
+        descriptions = (descriptions * (options['items'] // len(descriptions) + 1))[:options['items']]
+
+        for batch_size in (int(size) for size in options['batch_sizes'].split(',')):
+            # Single-item calls are slow; time fewer of them
+            sample = descriptions[:min(len(descriptions), batch_size * 200)]
+            start = time.perf_counter()
+            for offset in range(0, len(sample), batch_size):
+                model.predict(sample[offset:offset + batch_size])
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'batch {batch_size:>6}   {elapsed:8.3f}s  {len(sample) / elapsed:10.0f} complaints/s'
+            )
@@ -0,0 +1,127 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from complaints import duplicates
+from complaints.models import Complaint, MinHashBand
+
+ISSUES = [
+    'AC not working', 'fan not working', 'no water in toilet', 'toilet is dirty', 'food was stale',
+    'berth is broken', 'window glass cracked', 'lights are off', 'charging point dead', 'cockroaches in coach',
+    'bedsheet not provided', 'train running late', 'tte asked for money', 'theft of luggage', 'loud passengers',
+]
+DETAILS = [
+    'since boarding', 'for the last two hours', 'near the door', 'complained to attendant but no action',
+    'kids are suffering', 'please send someone', 'very bad experience', 'at night', 'after the last station',
+    'multiple passengers affected', 'third time this month', 'urgent',
+]
+
+
+def describe(rng):
+    coach = f'{rng.choice("ABS")}{rng.randint(1, 12)}'
+    return f'{rng.choice(ISSUES)} in coach {coach} {rng.choice(DETAILS)}, {rng.choice(DETAILS)}'
+
+
+def near_copy(description, rng):
+    """A second passenger's report of the same incident: re-punctuated, cased and lightly reworded."""
+    words = description.replace(',', '').split()
+    if rng.random() < 0.5:
+        words.insert(0, rng.choice(['Sir', 'Hello,', 'Please note']))
+    if rng.random() < 0.5:
+        words.append(rng.choice(['!!', 'pls help', 'thanks']))
+    return ' '.join(word.upper() if rng.random() < 0.1 else word for word in words)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure duplicate-detection latency per inserted complaint against a large '
+        'MinHash/LSH index. Runs inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--complaints', type=int, default=1000000, help='Index size to preload')
+        parser.add_argument('--inserts', type=int, default=2000, help='Timed inserts')
+        parser.add_argument('--trains', type=int, default=3000)
+        parser.add_argument('--days', type=int, default=60)
+
+    def handle(self, *args, **options):
+        rng = random.Random(11)
+        first_day = datetime.date(2025, 1, 1)
+
+        def partition():
+            return (
+                f'{12000 + rng.randrange(options["trains"])}',
+                first_day + datetime.timedelta(days=rng.randrange(options['days'])),
+            )
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            loaded = 0
+            while loaded < options['complaints']:
+                batch = []
+                for _ in range(min(20000, options['complaints'] - loaded)):
+                    train_number, day = partition()
+                    batch.append(Complaint(
+                        type='electrical', description=describe(rng), train_number=train_number, date_of_incident=day,
+                    ))
+                Complaint.objects.bulk_create(batch, batch_size=2000)
+                MinHashBand.objects.bulk_create([
+                    row for complaint in batch
+                    for row in duplicates.band_rows(complaint, duplicates.shingles(complaint.description))
+                ], batch_size=5000)
+                loaded += len(batch)
+                self.stdout.write(f'  preloaded {loaded}', ending='\r')
+                self.stdout.flush()
+            self.stdout.write(
+                f'preloaded {loaded} complaints / {MinHashBand.objects.count()} band rows '
+                f'in {time.perf_counter() - start:.0f}s'
+            )
+
+            # Half the timed inserts repeat a complaint already filed on the same train and day
+            originals = self.sample_originals(options['inserts'] // 2, rng)
+            probes = [
+                (near_copy(description, rng), train_number, day, True) for description, train_number, day in originals
+            ]
+            while len(probes) < options['inserts']:
+                train_number, day = partition()
+                probes.append((describe(rng), train_number, day, False))
+            rng.shuffle(probes)
+
+            latencies = []
+            found = expected = false_links = 0
+            for description, train_number, day, is_copy in probes:
+                complaint = Complaint(type='electrical', description=description, train_number=train_number,
+                                      date_of_incident=day)
+                Complaint.objects.bulk_create([complaint])
+                start = time.perf_counter()
+                cluster_id = duplicates.index(complaint)
+                latencies.append((time.perf_counter() - start) * 1000)
+                expected += is_copy
+                found += bool(is_copy and cluster_id)
+                false_links += bool(not is_copy and cluster_id)
+
+            latencies.sort()
+            self.stdout.write(
+                f'{len(latencies)} inserts: p50 {percentile(latencies, 0.5):.2f}ms  '
+                f'p95 {percentile(latencies, 0.95):.2f}ms  p99 {percentile(latencies, 0.99):.2f}ms  '
+                f'max {latencies[-1]:.2f}ms'
+            )
+            self.stdout.write(
+                f'near-copies linked {found}/{expected}, other inserts linked {false_links}/{len(probes) - expected} '
+                '(random reports can genuinely repeat an issue on the same train and day)'
+            )
+            transaction.set_rollback(True)
+
+    def sample_originals(self, count, rng):
+        # Sample ids rather than ORDER BY RANDOM() over a million rows
+        last_id = Complaint.objects.order_by('-id').values_list('id', flat=True).first()
+        ids = [rng.randint(1, last_id) for _ in range(count * 2)]
+        rows = Complaint.objects.filter(id__in=ids).values_list('description', 'train_number', 'date_of_incident')
+        return list(rows)[:count]
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from complaints.changes import assign_sequence, compact
+
+
+class Command(BaseCommand):
+    help = 'Drop superseded complaint change-log entries and old deletion tombstones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Only touch entries older than this')
+
+    def handle(self, *args, **options):
+        # Numbers entries a crashed writer committed but never got to number
+        assign_sequence()
+        removed = compact(timedelta(days=options['days']))
+        self.stdout.write(f'Removed {removed} change log entries')
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from complaints.storage import collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed media files that no complaint or staff row references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Keep unreferenced files stored more recently than this')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        removed = collect_garbage(timedelta(hours=options['grace_hours']), options['dry_run'])
+        for name in removed:
+            self.stdout.write(name)
+        action = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(f'{action} {len(removed)} file(s)')
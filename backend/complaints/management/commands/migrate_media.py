@@ -0,0 +1,73 @@
+import os
+import re
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from complaints.models import Complaint, Staff
+from complaints.photos import media_reference, storage_name
+from complaints.storage import media_storage
+
+CONTENT_ADDRESSED_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+class Command(BaseCommand):
+    help = 'Move existing complaint photos and staff avatars into the content-addressed media storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be moved')
+        parser.add_argument(
+            '--delete-originals', action='store_true',
+            help='Remove the old files once every row points at the new names',
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.moved = {}
+        self.missing = 0
+
+        for complaint in Complaint.objects.only('photos', 'photo_thumbnail', 'photo_webp').iterator():
+            changed = []
+            for field in ('photos', 'photo_thumbnail', 'photo_webp'):
+                new_name = self.migrate(storage_name(getattr(complaint, field)))
+                if new_name:
+                    setattr(complaint, field, media_reference(new_name))
+                    changed.append(field)
+            if changed and not self.dry_run:
+                complaint.save(update_fields=changed)
+
+        for staff in Staff.objects.exclude(avatar='').exclude(avatar=None).only('avatar').iterator():
+            new_name = self.migrate(staff.avatar.name)
+            if new_name and not self.dry_run:
+                staff.avatar.name = new_name
+                staff.save(update_fields=['avatar'])
+
+        deleted = 0
+        if options['delete_originals'] and not self.dry_run:
+            for old_name in self.moved:
+                media_storage.delete(old_name)
+                deleted += 1
+
+        action = 'Would move' if self.dry_run else 'Moved'
+        self.stdout.write(
+            f'{action} {len(self.moved)} file(s) into {len(set(self.moved.values()))} content-addressed file(s); '
+            f'{self.missing} missing, {deleted} original(s) deleted'
+        )
+
+    def migrate(self, name):
+        """Store ``name`` by content hash and return the new name, or None if nothing to do."""
+        if not name or CONTENT_ADDRESSED_RE.search(name):
+            return None
+        if name in self.moved:
+            return self.moved[name]
+        path = media_storage.path(name)
+        if not os.path.exists(path):
+            self.missing += 1
+            self.stderr.write(f'Missing file: {name}')
+            return None
+        if self.dry_run:
+            self.moved[name] = name
+            return name
+        with open(path, 'rb') as original:
+            self.moved[name] = media_storage.save(name, File(original))
+        return self.moved[name]
@@ -0,0 +1,26 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from complaints import photos
+
+
+class Command(BaseCommand):
+    help = 'Process spooled complaint photos: strip EXIF and generate resized JPEG and WebP thumbnails'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Size of the process pool (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                handled = photos.drain(pool, options['batch_size'])
+                if handled:
+                    self.stdout.write(f'Processed {handled} photo(s)')
+                if not options['loop']:
+                    return
+                time.sleep(options['interval'])
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from complaints.duplicates import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the MinHash/LSH duplicate index from complaint descriptions (clusters are kept)'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Indexed {rebuild()} complaints')
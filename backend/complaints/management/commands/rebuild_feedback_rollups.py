@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from complaints.feedback import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per complaint, category and subcategory feedback rating rollups from the feedback and archived feedback tables'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Wrote {rebuild()} rollup rows')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from complaints.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the complaint search index from the complaints table'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.rebuild()
+        self.stdout.write(f'Rebuilt search index using {type(backend).__name__}')
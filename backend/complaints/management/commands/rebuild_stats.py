@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from complaints import counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the dashboard statistics counters from the complaint and staff tables'
+
+    def handle(self, *args, **options):
+        counters.rebuild()
+        for key, value in sorted(counters.dashboard_stats().items()):
+            self.stdout.write(f'{key}: {value}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from complaints.models import Complaint
+from complaints.triage import refresh
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored triage priority of every complaint, e.g. after changing COMPLAINT_TRIAGE_WEIGHTS'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Updated {refresh(Complaint.objects.all())} complaints')
@@ -0,0 +1,108 @@
+import csv
+import glob
+import json
+import os
+import random
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.classifier import ComplaintClassifier, model_path, normalize_type, train
+from complaints.models import Complaint
+
+
+def read_examples(path):
+    """(description, category, severity) rows from a CSV file with a header or a JSON lines file."""
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    for row in rows:
+        yield (
+            row.get('description') or row.get('text') or '',
+            row.get('type') or row.get('category'),
+            (row.get('severity') or '').strip().capitalize() or None,
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        'Train the complaint category/severity classifier from datasets/raw (*.csv, *.jsonl '
+        'with description, type or category, and optional severity columns) and write the '
+        'NumPy artifact loaded by the classify endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data', default=os.path.join(settings.BASE_DIR.parent, 'datasets', 'raw'),
+            help='Directory of training files',
+        )
+        parser.add_argument('--include-db', action='store_true', help='Also learn from filed complaints')
+        parser.add_argument('--output', default=None, help='Artifact path (defaults to COMPLAINT_CLASSIFIER_PATH)')
+        parser.add_argument('--holdout', type=float, default=0.1, help='Fraction kept back to report accuracy')
+        parser.add_argument('--min-df', type=int, default=2)
+        parser.add_argument('--max-features', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        examples = []
+        skipped = 0
+        files = sorted(
+            glob.glob(os.path.join(options['data'], '*.csv')) + glob.glob(os.path.join(options['data'], '*.jsonl'))
+        )
+        for path in files:
+            for description, category, severity in read_examples(path):
+                complaint_type = normalize_type(category)
+                if not description.strip() or complaint_type is None:
+                    skipped += 1
+                    continue
+                examples.append((description, complaint_type, severity))
+        if options['include_db']:
+            for description, complaint_type, severity in Complaint.objects.values_list(
+                'description', 'type', 'severity',
+            ).iterator(chunk_size=2000):
+                complaint_type = normalize_type(complaint_type)
+                if description and complaint_type:
+                    examples.append((description, complaint_type, severity))
+        if not examples:
+            raise CommandError(f"No training examples in {options['data']}")
+        self.stdout.write(f'{len(examples)} examples from {len(files)} files ({skipped} skipped)')
+
+        random.Random(0).shuffle(examples)
+        held_out = examples[:int(len(examples) * options['holdout'])]
+        if held_out:
+            arrays = self.fit(examples[len(held_out):], options)
+            predictions = ComplaintClassifier(arrays).predict([example[0] for example in held_out])
+            category_hits = sum(p['type'] == example[1] for p, example in zip(predictions, held_out))
+            rated = [(p, example) for p, example in zip(predictions, held_out) if example[2]]
+            severity_hits = sum(p['severity'] == example[2] for p, example in rated)
+            self.stdout.write(
+                f'held-out accuracy: category {category_hits / len(held_out):.3f}'
+                + (f', severity {severity_hits / len(rated):.3f}' if rated else '')
+            )
+
+        start = time.perf_counter()
+        arrays = self.fit(examples, options)
+        elapsed = time.perf_counter() - start
+        output = options['output'] or model_path()
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        tmp_path = output + '.tmp.npz'
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, output)
+        self.stdout.write(
+            f"Trained on {len(examples)} examples in {elapsed:.2f}s "
+            f"({len(examples) / elapsed:.0f} complaints/s), vocabulary {len(arrays['idf'])}, "
+            f"{os.path.getsize(output) / 1024:.0f} KiB -> {output}"
+        )
+
+    def fit(self, examples, options):
+        return train(
+            [example[0] for example in examples],
+            [example[1] for example in examples],
+            [example[2] for example in examples],
+            min_df=options['min_df'],
+            max_features=options['max_features'],
+        )
@@ -0,0 +1,311 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+from . import cache
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'railmadad'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+UNRESOLVED = '<unresolved>'
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    """Cumulative bucket counts (each counts the values <= its bound), sum and count per label tuple."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            # Bucket counts, then +Inf, sum and count
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-3] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+class Registry:
+    """
+    Per-process request metrics. Every worker keeps its own, like the
+    cache hit counters; Prometheus tells workers apart by instance.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.query_seconds = Counter()
+        self.serializer_seconds = Counter()
+        self.response_bytes = Counter()
+        self.slow_requests = Counter()
+        self.n_plus_one = Counter()
+
+    def record(self, view, method, status, elapsed, state, size):
+        with self.lock:
+            self.requests[view, method, str(status)] += 1
+            self.latency.observe((view, method), elapsed)
+            self.queries.observe((view,), state.queries)
+            self.query_seconds[view,] += state.query_seconds
+            self.serializer_seconds[view,] += state.serializer_seconds
+            if size:
+                self.response_bytes[view,] += size
+
+    def add(self, counter, view, amount=1):
+        with self.lock:
+            getattr(self, counter)[view,] += amount
+
+
+registry = Registry()
+
+
+class RequestState:
+    """What one request spent in the database and its serializers."""
+
+    __slots__ = ('queries', 'query_seconds', 'serializer_seconds', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.statements = Counter()
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_seconds += time.perf_counter() - start
+            self.queries += 1
+            # Parameters are passed separately, so a query repeated per row has identical SQL
+            self.statements[sql] += 1
+
+
+@contextmanager
+def serializer_timer():
+    state = _current.get()
+    if state is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        state.serializer_seconds += time.perf_counter() - start
+
+
+class TimedSerializerMixin:
+    """Adds the time spent building ``serializer.data`` to the current request's metrics."""
+
+    @property
+    def data(self):
+        with serializer_timer():
+            return super().data
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else UNRESOLVED
+
+
+@contextmanager
+def counting_queries(state):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(state.execute))
+        yield
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, SQL queries and their time, serializer time and
+    response bytes per resolved view, logs requests slower than
+    SLOW_REQUEST_MS and flags views that run the same SQL statement
+    N_PLUS_ONE_THRESHOLD or more times in one request. Streaming
+    responses are not flagged: exports read one keyset chunk per query
+    and event streams poll, so they repeat a statement by design.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+        self.slow_seconds = getattr(settings, 'SLOW_REQUEST_MS', 500) / 1000
+        self.n_plus_one_threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 10)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        state = RequestState()
+        token = _current.set(state)
+        start = time.perf_counter()
+        try:
+            with counting_queries(state):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish_response(request, response, state, start)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        state = RequestState()
+        token = _current.set(state)
+        start = time.perf_counter()
+        # The ASGI handler runs all of a request's sync code (ORM calls included) in one
+        # thread with its own connections; the wrappers go on that thread's connections
+        queries = ExitStack()
+        await sync_to_async(queries.enter_context)(counting_queries(state))
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(queries.close)()
+            _current.reset(token)
+        return self.finish_response(request, response, state, start)
+
+    def finish_response(self, request, response, state, start):
+        if response.streaming:
+            # Exports and event streams keep querying while they are read; record them at the end
+            stream = self.stream_async if response.is_async else self.stream
+            response.streaming_content = stream(response.streaming_content, request, response, state, start)
+            return response
+        self.finish(request, response, state, time.perf_counter() - start, len(response.content))
+        return response
+
+    def stream(self, chunks, request, response, state, start):
+        size = 0
+        chunks = iter(chunks)
+        try:
+            while True:
+                # Re-enter for each chunk: an ASGI server may read them from different threads
+                with counting_queries(state):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                size += len(chunk)
+                yield chunk
+        finally:
+            self.finish(request, response, state, time.perf_counter() - start, size)
+
+    async def stream_async(self, chunks, request, response, state, start):
+        size = 0
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            self.finish(request, response, state, time.perf_counter() - start, size)
+
+    def finish(self, request, response, state, elapsed, size):
+        view = view_name(request)
+        registry.record(view, request.method, response.status_code, elapsed, state, size)
+        statement, repeats = max(state.statements.items(), key=lambda item: item[1], default=(None, 0))
+        if repeats >= self.n_plus_one_threshold and not response.streaming:
+            registry.add('n_plus_one', view)
+            logger.warning('n+1 queries %s', json.dumps({
+                'view': view, 'path': request.path, 'repeats': repeats, 'sql': statement[:500],
+            }))
+        if elapsed >= self.slow_seconds:
+            registry.add('slow_requests', view)
+            logger.warning('slow request %s', json.dumps({
+                'view': view,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(elapsed * 1000, 1),
+                'queries': state.queries,
+                'query_ms': round(state.query_seconds * 1000, 1),
+                'serializer_ms': round(state.serializer_seconds * 1000, 1),
+                'bytes': size,
+            }))
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def histogram_lines(name, help_text, names, histogram):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for labels, series in sorted(histogram.series.items()):
+        for bound, count in zip(histogram.buckets + ('+Inf',), series):
+            lines.append(f'{name}_bucket{label_text(names, labels, [("le", bound)])} {count}')
+        lines.append(f'{name}_sum{label_text(names, labels)} {series[-2]}')
+        lines.append(f'{name}_count{label_text(names, labels)} {series[-1]}')
+    return lines
+
+
+def counter_lines(name, help_text, names, counter):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+    lines.extend(f'{name}{label_text(names, labels)} {value}' for labels, value in sorted(counter.items()))
+    return lines
+
+
+def exposition():
+    """The registry in the Prometheus text format (version 0.0.4)."""
+    with registry.lock:
+        lines = (
+            counter_lines(f'{PREFIX}_http_requests_total', 'Requests served.', ('view', 'method', 'status'), registry.requests)
+            + histogram_lines(
+                f'{PREFIX}_http_request_duration_seconds', 'Time from the request to the last response byte.',
+                ('view', 'method'), registry.latency,
+            )
+            + histogram_lines(f'{PREFIX}_db_queries_per_request', 'SQL queries run per request.', ('view',), registry.queries)
+            + counter_lines(f'{PREFIX}_db_query_seconds_total', 'Time spent in SQL queries.', ('view',), registry.query_seconds)
+            + counter_lines(
+                f'{PREFIX}_serializer_seconds_total', 'Time spent building serializer data.', ('view',),
+                registry.serializer_seconds,
+            )
+            + counter_lines(f'{PREFIX}_http_response_bytes_total', 'Response body bytes.', ('view',), registry.response_bytes)
+            + counter_lines(
+                f'{PREFIX}_slow_requests_total', 'Requests slower than SLOW_REQUEST_MS.', ('view',), registry.slow_requests,
+            )
+            + counter_lines(
+                f'{PREFIX}_n_plus_one_requests_total', 'Requests repeating one SQL statement N_PLUS_ONE_THRESHOLD times.',
+                ('view',), registry.n_plus_one,
+            )
+        )
+    lookups = cache.stats()
+    lines += counter_lines(
+        f'{PREFIX}_cache_lookups_total', 'Serialized-read cache lookups.', ('outcome',),
+        {('hit',): lookups['hits'], ('miss',): lookups['misses']},
+    )
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Prometheus scrape target; with METRICS_TOKEN set, scrapers must send it as a bearer token."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0009_staff_communication_preferences'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['date_of_incident', 'id'], name='complaint_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['status', 'date_of_incident', 'id'], name='complaint_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['severity', 'date_of_incident', 'id'], name='complaint_severity_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['type', 'date_of_incident', 'id'], name='complaint_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['train_number', 'date_of_incident', 'id'], name='complaint_train_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['pnr_number', 'date_of_incident', 'id'], name='complaint_pnr_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['user', 'date_of_incident', 'id'], name='complaint_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['complaint_id', 'submitted_at'], name='feedback_complaint_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='staff',
+            index=models.Index(fields=['status', 'department'], name='staff_status_department_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='staff',
+            index=models.Index(fields=['department', 'role'], name='staff_department_role_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:10
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_counters(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    Staff = apps.get_model('complaints', 'Staff')
+    Counter = apps.get_model('complaints', 'Counter')
+    values = {
+        'complaints.total': Complaint.objects.count(),
+        'staff.total': Staff.objects.count(),
+    }
+    for row in Complaint.objects.values('status').annotate(n=Count('id')):
+        values[f"complaints.status.{row['status']}"] = row['n']
+    for row in Staff.objects.values('status').annotate(n=Count('id')):
+        values[f"staff.status.{row['status']}"] = row['n']
+    Counter.objects.bulk_create([Counter(key=key, value=value) for key, value in values.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0010_complaint_feedback_staff_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_fulltext_index(apps, schema_editor):
+    # MySQL keeps its own FULLTEXT index; other databases use the SearchTerm postings
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX complaint_fulltext_idx ON complaints_complaint '
+            '(description, pnr_number, train_number)'
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX complaint_fulltext_idx ON complaints_complaint')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0011_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('frequency', models.PositiveIntegerField(default=1)),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='complaints.complaint')),
+            ],
+            options={
+                'unique_together': {('term', 'complaint')},
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:17
+
+import complaints.models
+import complaints.storage
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0013_photo_pipeline'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='staff',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=complaints.storage.get_media_storage, upload_to=complaints.models.staff_avatar_path),
+        ),
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('size', models.BigIntegerField(default=0)),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_stored_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['refcount', 'last_stored_at'], name='storedfile_gc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def log_existing_complaints(apps, schema_editor):
+    # Clients syncing from 0 must receive the complaints filed before the log existed
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintChange = apps.get_model('complaints', 'ComplaintChange')
+    ids = Complaint.objects.order_by('id').values_list('id', flat=True)
+    batch = []
+    for complaint_id in ids.iterator(chunk_size=2000):
+        batch.append(ComplaintChange(complaint_id=complaint_id, action='upsert'))
+        if len(batch) == 2000:
+            ComplaintChange.objects.bulk_create(batch)
+            batch = []
+    ComplaintChange.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0014_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('complaint_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete')], max_length=10)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['complaint_id', 'id'], name='complaintchange_complaint_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(log_existing_complaints, migrations.RunPython.noop),
+    ]
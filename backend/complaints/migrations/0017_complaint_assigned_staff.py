@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0016_push_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='assigned_staff',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assigned_complaints', to='complaints.staff'),
+        ),
+    ]
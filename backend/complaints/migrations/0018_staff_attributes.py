@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:37
+
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FIELDS = {
+    'expertise': 'expertise',
+    'language': 'languages',
+    'channel': 'communication_preferences',
+}
+
+
+def parse(text):
+    try:
+        items = json.loads(text or '[]')
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(items, list):
+        return []
+    values = []
+    for item in items:
+        if isinstance(item, str) and item.strip() and item.strip()[:100] not in values:
+            values.append(item.strip()[:100])
+    return values
+
+
+def copy_staff_attributes(apps, schema_editor):
+    Staff = apps.get_model('complaints', 'Staff')
+    StaffAttribute = apps.get_model('complaints', 'StaffAttribute')
+    batch = []
+    for row in Staff.objects.values('id', *FIELDS.values()).iterator(chunk_size=2000):
+        for kind, field in FIELDS.items():
+            batch.extend(StaffAttribute(staff_id=row['id'], kind=kind, value=value) for value in parse(row[field]))
+        if len(batch) >= 2000:
+            StaffAttribute.objects.bulk_create(batch)
+            batch = []
+    StaffAttribute.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0017_complaint_assigned_staff'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffAttribute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('expertise', 'Expertise'), ('language', 'Language'), ('channel', 'Communication channel')], max_length=10)),
+                ('value', models.CharField(max_length=100)),
+                ('staff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attributes', to='complaints.staff')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'value', 'staff'], name='staffattribute_lookup_idx')],
+                'unique_together': {('staff', 'kind', 'value')},
+            },
+        ),
+        migrations.RunPython(copy_staff_attributes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:05
+
+import re
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+REFERENCE_RE = re.compile(r'^\s*(?:[A-Za-z]+[-_ ]?)?#?(\d{1,18})\s*$')
+
+
+def link_feedback(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    Feedback = apps.get_model('complaints', 'Feedback')
+    pending = []
+    for row in Feedback.objects.values('id', 'complaint_reference').iterator(chunk_size=2000):
+        match = REFERENCE_RE.match(row['complaint_reference'] or '')
+        if match:
+            pending.append((row['id'], int(match.group(1))))
+        if len(pending) >= 2000:
+            save_links(Complaint, Feedback, pending)
+            pending = []
+    save_links(Complaint, Feedback, pending)
+
+
+def save_links(Complaint, Feedback, pending):
+    existing = set(Complaint.objects.filter(id__in={pk for _, pk in pending}).values_list('id', flat=True))
+    Feedback.objects.bulk_update(
+        [Feedback(id=feedback_id, complaint_id=pk) for feedback_id, pk in pending if pk in existing],
+        ['complaint'],
+    )
+
+
+def build_rollups(apps, schema_editor):
+    Feedback = apps.get_model('complaints', 'Feedback')
+    FeedbackRollup = apps.get_model('complaints', 'FeedbackRollup')
+    rows = []
+    for scope, field in [('complaint', 'complaint_id'), ('category', 'category'), ('subcategory', 'subcategory')]:
+        totals = Feedback.objects.values(field).annotate(
+            count=models.Count('id'), rating_total=models.Sum('rating'),
+        ).order_by()
+        rows.extend(
+            FeedbackRollup(scope=scope, key=str(row[field])[:100], count=row['count'], rating_total=row['rating_total'])
+            for row in totals if row[field] not in (None, '')
+        )
+    FeedbackRollup.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0019_duplicate_clusters'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='feedback',
+            name='feedback_complaint_idx',
+        ),
+        migrations.RenameField(
+            model_name='feedback',
+            old_name='complaint_id',
+            new_name='complaint_reference',
+        ),
+        migrations.AddField(
+            model_name='feedback',
+            name='complaint',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='feedback', to='complaints.complaint'),
+        ),
+        migrations.RunPython(link_feedback, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['complaint', 'submitted_at'], name='feedback_complaint_idx'),
+        ),
+        migrations.CreateModel(
+            name='FeedbackRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('complaint', 'Complaint'), ('category', 'Category'), ('subcategory', 'Subcategory')], max_length=20)),
+                ('key', models.CharField(max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+                ('rating_total', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('scope', 'key')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+SEVERITY = {'Low': 0.0, 'Medium': 10.0, 'High': 30.0}
+AGE = 1.0
+DUPLICATE = 5.0
+MAX_DUPLICATES = 10
+
+
+def set_priorities(apps, schema_editor):
+    # The default weights of triage.py at the time of this migration;
+    # run recompute_triage_priority after configuring other weights
+    Complaint = apps.get_model('complaints', 'Complaint')
+    batch = []
+    rows = Complaint.objects.filter(status__in=['Open', 'In Progress']).values_list(
+        'id', 'severity', 'date_of_incident', 'cluster__size',
+    )
+    for pk, severity, date_of_incident, cluster_size in rows.iterator(chunk_size=2000):
+        duplicates = min(max((cluster_size or 1) - 1, 0), MAX_DUPLICATES)
+        priority = SEVERITY.get(severity, 0.0) + DUPLICATE * duplicates - AGE * date_of_incident.toordinal()
+        batch.append(Complaint(id=pk, triage_priority=priority))
+        if len(batch) >= 2000:
+            Complaint.objects.bulk_update(batch, ['triage_priority'])
+            batch = []
+    Complaint.objects.bulk_update(batch, ['triage_priority'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0020_feedback_complaint_fk'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_complaints', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='triage_priority',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['-triage_priority', 'id'], name='complaint_triage_idx'),
+        ),
+        migrations.RunPython(set_priorities, migrations.RunPython.noop),
+    ]
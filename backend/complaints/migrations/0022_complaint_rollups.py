@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:25
+
+import datetime
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def date_existing_complaints(apps, schema_editor):
+    # Filing times were not kept; the incident date is the closest record
+    Complaint = apps.get_model('complaints', 'Complaint')
+    batch = []
+    for pk, date_of_incident in Complaint.objects.values_list('id', 'date_of_incident').iterator(chunk_size=2000):
+        created_at = datetime.datetime.combine(date_of_incident, datetime.time(), tzinfo=datetime.timezone.utc)
+        batch.append(Complaint(id=pk, created_at=created_at))
+        if len(batch) >= 2000:
+            Complaint.objects.bulk_update(batch, ['created_at'])
+            batch = []
+    Complaint.objects.bulk_update(batch, ['created_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0021_complaint_triage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(date_existing_complaints, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='ComplaintRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('dimension', models.CharField(max_length=20)),
+                ('bucket', models.DateTimeField()),
+                ('value', models.CharField(max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('granularity', 'dimension', 'bucket', 'value')},
+            },
+        ),
+    ]
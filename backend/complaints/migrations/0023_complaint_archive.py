@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:46
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0022_complaint_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedComplaint',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('type', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('location', models.CharField(blank=True, max_length=255, null=True)),
+                ('train_number', models.CharField(blank=True, max_length=20, null=True)),
+                ('pnr_number', models.CharField(blank=True, max_length=20, null=True)),
+                ('severity', models.CharField(max_length=10)),
+                ('date_of_incident', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('staff', models.CharField(blank=True, max_length=255, null=True)),
+                ('photos', models.CharField(blank=True, max_length=255, null=True)),
+                ('photo_thumbnail', models.CharField(blank=True, max_length=255, null=True)),
+                ('photo_webp', models.CharField(blank=True, max_length=255, null=True)),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('assigned_staff_id', models.BigIntegerField(blank=True, null=True)),
+                ('cluster_id', models.BigIntegerField(blank=True, null=True)),
+                ('triage_priority', models.FloatField(blank=True, null=True)),
+                ('claimed_by_id', models.BigIntegerField(blank=True, null=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'date_of_incident'], name='archivedcomplaint_user_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedFeedback',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('complaint_reference', models.CharField(max_length=100)),
+                ('complaint_id', models.BigIntegerField(blank=True, null=True)),
+                ('category', models.CharField(max_length=100)),
+                ('subcategory', models.CharField(max_length=100)),
+                ('feedback_message', models.TextField()),
+                ('rating', models.IntegerField()),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('submitted_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['complaint_id', 'submitted_at'], name='archivedfeedback_complaint_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:25
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_changes(apps, schema_editor):
+    # Entries already in the log keep the ids clients hold as tokens
+    ComplaintChange = apps.get_model('complaints', 'ComplaintChange')
+    Counter = apps.get_model('complaints', 'Counter')
+    ComplaintChange.objects.update(sequence=F('id'))
+    last = ComplaintChange.objects.aggregate(last=Max('id'))['last'] or 0
+    Counter.objects.update_or_create(key='changes.sequence', defaults={'value': last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0023_complaint_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaintchange',
+            name='sequence',
+            field=models.BigIntegerField(null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+    ]
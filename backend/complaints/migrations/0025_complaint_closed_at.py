@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:34
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def stamp_closed_complaints(apps, schema_editor):
+    # The last write is the best record there is of when a closed complaint was closed
+    for model in ('Complaint', 'ArchivedComplaint'):
+        apps.get_model('complaints', model).objects.filter(status='Closed').update(closed_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0024_complaintchange_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomplaint',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(stamp_closed_complaints, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,50 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 import os
 
+from .storage import get_media_storage
+
 def staff_avatar_path(instance, filename):
-    # Generate a unique filename
-    ext = filename.split('.')[-1]
-    new_filename = f"staff_{instance.id}_{timezone.now().strftime('%Y%m%d%H%M%S')}.{ext}"
-    return os.path.join('staff_avatars', new_filename)
+    # The content-addressed storage renames the file after its hash
+    return os.path.join('staff_avatars', os.path.basename(filename))
+
+class TrackedModel(models.Model):
+    """
+    Base for models with bookkeeping in their post_save/post_delete receivers
+    (see signals.py). Saves and deletes run in one transaction with those
+    receivers, and ``_loaded_values`` holds the field values as last read
+    from or written to the database so receivers can compute deltas.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if value is not models.DEFERRED
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            if not hasattr(self, '_loaded_values') and self.pk is not None:
+                # Instance built by hand for an existing row
+                self._loaded_values = type(self)._base_manager.filter(pk=self.pk).values().first() or {}
+            super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+        }
 
-class Complaint(models.Model):
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            return super().delete(*args, **kwargs)
+
+class Complaint(TrackedModel):
     STATUS_CHOICES = [
         ('Open', 'Open'),
         ('In Progress', 'In Progress'),
@@ -32,7 +67,40 @@ class Complaint(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Open')
     staff = models.CharField(max_length=255, blank=True, null=True)
     photos = models.CharField(max_length=255, blank=True, null=True)  # Increased max_length
+    photo_thumbnail = models.CharField(max_length=255, blank=True, null=True)  # Set by the photo worker
+    photo_webp = models.CharField(max_length=255, blank=True, null=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    # Set by the assignment engine; ``staff`` keeps the name shown in the UI
+    assigned_staff = models.ForeignKey(
+        'Staff', on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_complaints'
+    )
+    # Near-duplicates filed on the same train and day (see duplicates.py)
+    cluster = models.ForeignKey(
+        'DuplicateCluster', on_delete=models.SET_NULL, null=True, blank=True, related_name='complaints'
+    )
+    # Triage ranking key, NULL once closed (see triage.py); claims keep two admins off the same complaint
+    triage_priority = models.FloatField(null=True, blank=True)
+    claimed_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='claimed_complaints'
+    )
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Start of the current closure, NULL while not closed (see counters.set_closed_at)
+    closed_at = models.DateTimeField(null=True, blank=True)
+ 
+    class Meta:
+        indexes = [
+            # Keyset pagination order, optionally narrowed by one list filter
+            models.Index(fields=['date_of_incident', 'id'], name='complaint_date_idx'),
+            models.Index(fields=['status', 'date_of_incident', 'id'], name='complaint_status_date_idx'),
+            models.Index(fields=['severity', 'date_of_incident', 'id'], name='complaint_severity_date_idx'),
+            models.Index(fields=['type', 'date_of_incident', 'id'], name='complaint_type_date_idx'),
+            models.Index(fields=['train_number', 'date_of_incident', 'id'], name='complaint_train_date_idx'),
+            models.Index(fields=['pnr_number', 'date_of_incident', 'id'], name='complaint_pnr_date_idx'),
+            models.Index(fields=['user', 'date_of_incident', 'id'], name='complaint_user_date_idx'),
+            models.Index(fields=['-triage_priority', 'id'], name='complaint_triage_idx'),
+        ]
  
     def save(self, *args, **kwargs):
         # Don't modify the photos path as it's now handled in the view
@@ -41,8 +109,12 @@ class Complaint(models.Model):
     def __str__(self):
         return f"{self.type} - {self.status}"
 
-class Feedback(models.Model):
-    complaint_id = models.CharField(max_length=100)
+class Feedback(TrackedModel):
+    # As submitted (the frontend may send a non-numeric reference); ``complaint`` is resolved from it
+    complaint_reference = models.CharField(max_length=100)
+    complaint = models.ForeignKey(
+        Complaint, on_delete=models.SET_NULL, null=True, blank=True, related_name='feedback'
+    )
     category = models.CharField(max_length=100)
     subcategory = models.CharField(max_length=100)
     feedback_message = models.TextField()
@@ -51,17 +123,22 @@ class Feedback(models.Model):
     email = models.EmailField()
     submitted_at = models.DateTimeField(auto_now_add=True)
  
+    class Meta:
+        indexes = [
+            models.Index(fields=['complaint', 'submitted_at'], name='feedback_complaint_idx'),
+        ]
+ 
     def __str__(self):
-        return f"{self.name} - {self.complaint_id}"
+        return f"{self.name} - {self.complaint_reference}"
 
-class Staff(models.Model):
+class Staff(TrackedModel):
     name = models.CharField(max_length=100)
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=15)
     role = models.CharField(max_length=50)
     department = models.CharField(max_length=50)
     location = models.CharField(max_length=100, blank=True, null=True)
-    avatar = models.ImageField(upload_to=staff_avatar_path, blank=True, null=True)
+    avatar = models.ImageField(upload_to=staff_avatar_path, storage=get_media_storage, blank=True, null=True)
     status = models.CharField(
         max_length=20, 
         choices=[('active', 'Active'), ('inactive', 'Inactive'), ('on-leave', 'On Leave')],
@@ -79,4 +156,267 @@ class Staff(models.Model):
         return self.name
     
     class Meta:
-        verbose_name_plural = "Staff"
\ No newline at end of file
+        verbose_name_plural = "Staff"
+        indexes = [
+            models.Index(fields=['status', 'department'], name='staff_status_department_idx'),
+            models.Index(fields=['department', 'role'], name='staff_department_role_idx'),
+        ]
+
+class StaffAttribute(models.Model):
+    """
+    One expertise area, language or communication channel of a staff member,
+    kept in step with the JSON text fields on Staff (see staff_directory.py)
+    so directory filters are index lookups.
+    """
+    EXPERTISE = 'expertise'
+    LANGUAGE = 'language'
+    CHANNEL = 'channel'
+    KIND_CHOICES = [
+        (EXPERTISE, 'Expertise'),
+        (LANGUAGE, 'Language'),
+        (CHANNEL, 'Communication channel'),
+    ]
+
+    staff = models.ForeignKey(Staff, on_delete=models.CASCADE, related_name='attributes')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    value = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ('staff', 'kind', 'value')
+        indexes = [
+            models.Index(fields=['kind', 'value', 'staff'], name='staffattribute_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.staff_id} {self.kind}: {self.value}"
+
+class Counter(models.Model):
+    """Running aggregate maintained by the Complaint/Staff write paths (see counters.py)."""
+    key = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+class FeedbackRollup(models.Model):
+    """Running feedback count and rating total for one complaint, category or subcategory (see feedback.py)."""
+    COMPLAINT = 'complaint'
+    CATEGORY = 'category'
+    SUBCATEGORY = 'subcategory'
+    SCOPE_CHOICES = [
+        (COMPLAINT, 'Complaint'),
+        (CATEGORY, 'Category'),
+        (SUBCATEGORY, 'Subcategory'),
+    ]
+
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES)
+    key = models.CharField(max_length=100)
+    count = models.BigIntegerField(default=0)
+    rating_total = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('scope', 'key')
+
+    def __str__(self):
+        return f"{self.scope} {self.key}: {self.count}"
+
+class ComplaintRollup(models.Model):
+    """Complaints filed per hour or day with one type, severity, status or train number (see rollups.py)."""
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITY_CHOICES = [
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    ]
+
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    dimension = models.CharField(max_length=20)
+    bucket = models.DateTimeField()
+    value = models.CharField(max_length=100)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        # Also the index for range reads: granularity, dimension, then bucket
+        unique_together = ('granularity', 'dimension', 'bucket', 'value')
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket:%Y-%m-%d %H:%M} {self.dimension}={self.value}: {self.count}"
+
+class SearchTerm(models.Model):
+    """Posting of the portable complaint search index (see search.py)."""
+    term = models.CharField(max_length=64)
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='search_terms')
+    frequency = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('term', 'complaint')
+
+
+class PhotoJob(models.Model):
+    """Uploaded complaint photo waiting for the background worker (see photos.py)."""
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='photo_jobs')
+    spool_path = models.CharField(max_length=500)
+    original_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='photojob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.complaint_id} - {self.status}"
+
+
+class StoredFile(models.Model):
+    """File in the content-addressed media storage and the number of rows referencing it."""
+    name = models.CharField(max_length=255, primary_key=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_stored_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['refcount', 'last_stored_at'], name='storedfile_gc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+
+class DuplicateCluster(models.Model):
+    """Complaints that describe the same incident on one train and day."""
+    train_number = models.CharField(max_length=20, blank=True, null=True)
+    date_of_incident = models.DateField()
+    first_complaint = models.ForeignKey(Complaint, on_delete=models.SET_NULL, null=True, related_name='+')
+    size = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['size', 'id'], name='duplicatecluster_size_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.train_number} {self.date_of_incident} ({self.size})"
+
+class MinHashBand(models.Model):
+    """One LSH band bucket of a complaint description's MinHash signature (see duplicates.py)."""
+    partition = models.CharField(max_length=40)
+    bucket = models.BigIntegerField()
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['partition', 'bucket'], name='minhashband_bucket_idx'),
+        ]
+
+class PushEvent(models.Model):
+    """Events shared between worker processes by the database event backend (see events.py)."""
+    payload = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+class ComplaintChange(models.Model):
+    """
+    Change log behind /api/complaints/changes/. Clients sync from sequence,
+    which is assigned after the writing transaction commits (see
+    changes.assign_sequence), so it follows commit order where the id does
+    not. complaint_id is not a foreign key so deletions keep their tombstone.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = [
+        (UPSERT, 'Upsert'),
+        (DELETE, 'Delete'),
+    ]
+
+    complaint_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now)
+    sequence = models.BigIntegerField(null=True, unique=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['complaint_id', 'id'], name='complaintchange_complaint_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id}: {self.action} {self.complaint_id}"
+
+class ArchivedComplaint(models.Model):
+    """
+    Cold copy of a complaint closed long ago (see archive.py), with the
+    Complaint columns under the same names; foreign keys are kept as plain
+    ids so the rows they point to can change without touching the archive.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    type = models.CharField(max_length=100)
+    description = models.TextField()
+    location = models.CharField(max_length=255, blank=True, null=True)
+    train_number = models.CharField(max_length=20, blank=True, null=True)
+    pnr_number = models.CharField(max_length=20, blank=True, null=True)
+    severity = models.CharField(max_length=10)
+    date_of_incident = models.DateField()
+    status = models.CharField(max_length=20)
+    staff = models.CharField(max_length=255, blank=True, null=True)
+    photos = models.CharField(max_length=255, blank=True, null=True)
+    photo_thumbnail = models.CharField(max_length=255, blank=True, null=True)
+    photo_webp = models.CharField(max_length=255, blank=True, null=True)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    assigned_staff_id = models.BigIntegerField(null=True, blank=True)
+    cluster_id = models.BigIntegerField(null=True, blank=True)
+    triage_priority = models.FloatField(null=True, blank=True)
+    claimed_by_id = models.BigIntegerField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    closed_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', 'date_of_incident'], name='archivedcomplaint_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} - {self.status} (archived)"
+
+class ArchivedFeedback(models.Model):
+    """Feedback archived with its complaint, with the Feedback columns under the same names."""
+    id = models.BigIntegerField(primary_key=True)
+    complaint_reference = models.CharField(max_length=100)
+    complaint_id = models.BigIntegerField(null=True, blank=True)
+    category = models.CharField(max_length=100)
+    subcategory = models.CharField(max_length=100)
+    feedback_message = models.TextField()
+    rating = models.IntegerField()
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    submitted_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['complaint_id', 'submitted_at'], name='archivedfeedback_complaint_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.complaint_reference} (archived)"
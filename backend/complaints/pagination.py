@@ -0,0 +1,132 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.db.models import Q
+
+# Query parameters that filter the complaint list endpoints server-side
+COMPLAINT_FILTERS = {
+    'status': 'status',
+    'severity': 'severity',
+    'type': 'type',
+    'train_number': 'train_number',
+    'pnr_number': 'pnr_number',
+    'user': 'user_id',
+}
+# Filters whose values must be integers
+INTEGER_FILTERS = {'user'}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def filter_complaints(queryset, params):
+    """Apply the supported ``?status=&severity=...`` filters to a queryset; raises InvalidFilter for bad values."""
+    lookups = {}
+    for param, field in COMPLAINT_FILTERS.items():
+        value = params.get(param)
+        if value in (None, ''):
+            continue
+        if param in INTEGER_FILTERS:
+            try:
+                value = int(value)
+            except ValueError:
+                raise InvalidFilter(f'{param} must be an integer')
+        lookups[field] = value
+    return queryset.filter(**lookups)
+
+
+def encode_cursor(date_of_incident, pk):
+    payload = json.dumps([date_of_incident.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.date.fromisoformat(date_value), int(pk)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def is_paginated_request(params):
+    return 'cursor' in params or 'page_size' in params
+
+
+def get_page_size(params):
+    try:
+        page_size = int(params.get('page_size', DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        page_size = DEFAULT_PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def order_by_keyset(queryset, cursor=None, descending=False):
+    """
+    Order by (date_of_incident, id) and skip everything up to ``cursor``.
+
+    The redundant ``date_of_incident >= d`` bound lets the database seek
+    straight to the cursor position in the (..., date_of_incident, id)
+    indexes instead of walking the index from its start.
+    """
+    if descending:
+        queryset = queryset.order_by('-date_of_incident', '-id')
+    else:
+        queryset = queryset.order_by('date_of_incident', 'id')
+
+    if cursor:
+        date_of_incident, pk = decode_cursor(cursor)
+        if descending:
+            queryset = queryset.filter(date_of_incident__lte=date_of_incident).filter(
+                Q(date_of_incident__lt=date_of_incident) | Q(id__lt=pk)
+            )
+        else:
+            queryset = queryset.filter(date_of_incident__gte=date_of_incident).filter(
+                Q(date_of_incident__gt=date_of_incident) | Q(id__gt=pk)
+            )
+    return queryset
+
+
+def paginate_complaints(queryset, params, descending=False):
+    """
+    Keyset pagination ordered by (date_of_incident, id).
+
+    Each page is a range scan that starts right after the last row of the
+    previous page, so the cost of a page does not grow with its depth the
+    way OFFSET does. Returns the page as a list plus the cursor of the next
+    page (None on the last page).
+    """
+    page_size = get_page_size(params)
+    queryset = order_by_keyset(queryset, params.get('cursor'), descending)
+
+    # Fetch one extra row to find out whether there is a next page
+    return page_of(list(queryset[:page_size + 1]), page_size)
+
+
+async def apaginate_complaints(queryset, params, descending=False):
+    """paginate_complaints() through the async ORM."""
+    page_size = get_page_size(params)
+    queryset = order_by_keyset(queryset, params.get('cursor'), descending)
+    return page_of([row async for row in queryset[:page_size + 1]], page_size)
+
+
+def page_of(rows, page_size):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor(last['date_of_incident'], last['id'])
+        else:
+            next_cursor = encode_cursor(last.date_of_incident, last.id)
+    return rows, next_cursor
@@ -0,0 +1,176 @@
+import os
+import shutil
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import PhotoJob
+from .storage import media_storage
+
+# Upload paths are stored relative to the repository root, as file_complaint always has
+MEDIA_PREFIX = 'backend/media/'
+
+MAX_IMAGE_SIZE = 2048
+THUMBNAIL_SIZE = 320
+MAX_ATTEMPTS = 3
+# Jobs left in "processing" this long belong to a worker that died
+STALE_JOB_AGE = timedelta(minutes=10)
+
+
+def spool_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'spool')
+
+
+def media_reference(name):
+    """Turn a media storage name into the value stored on Complaint."""
+    return MEDIA_PREFIX + name
+
+
+def storage_name(reference):
+    """Inverse of media_reference(); None for values that are not media paths."""
+    if reference and reference.startswith(MEDIA_PREFIX):
+        return reference[len(MEDIA_PREFIX):]
+    return None
+
+
+def store_rendered(path, name):
+    """Move a rendered file into the content-addressed media storage."""
+    try:
+        with open(path, 'rb') as rendered:
+            return media_storage.save(name, File(rendered))
+    finally:
+        os.remove(path)
+
+
+def spool_upload(upload):
+    """
+    Move an uploaded file into the spool directory and return its path.
+
+    Large uploads already live in a temporary file on disk and are just
+    moved; small in-memory ones are written out in chunks.
+    """
+    os.makedirs(spool_dir(), exist_ok=True)
+    ext = os.path.splitext(upload.name)[1].lower()[:10]
+    path = os.path.join(spool_dir(), f'{uuid.uuid4().hex}{ext}')
+    if hasattr(upload, 'temporary_file_path'):
+        upload.file.close()
+        shutil.move(upload.temporary_file_path(), path)
+    else:
+        with open(path, 'wb') as destination:
+            for chunk in upload.chunks():
+                destination.write(chunk)
+    return path
+
+
+def queue_photo(complaint, upload, spool_path=None):
+    """Queue ``upload`` for processing; pass ``spool_path`` if spool_upload() has already moved it."""
+    if spool_path is None:
+        spool_path = spool_upload(upload)
+    return PhotoJob.objects.create(
+        complaint=complaint,
+        spool_path=spool_path,
+        original_name=os.path.basename(upload.name)[:255],
+    )
+
+
+def render_photo(spool_path, output_dir):
+    """
+    Strip metadata from a spooled photo and write its derived images.
+
+    Runs in a worker process, so it only deals with paths. Returns the
+    paths of the cleaned full-size JPEG, the JPEG thumbnail and the WebP
+    thumbnail, all written to ``output_dir``.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    name = uuid.uuid4().hex
+    with Image.open(spool_path) as source:
+        # Apply the EXIF orientation before the EXIF block is dropped
+        image = ImageOps.exif_transpose(source).convert('RGB')
+
+    # A freshly built image carries no EXIF/GPS data of its own
+    image.thumbnail((MAX_IMAGE_SIZE, MAX_IMAGE_SIZE))
+    full_path = os.path.join(output_dir, f'{name}.jpg')
+    image.save(full_path, 'JPEG', quality=85, optimize=True)
+
+    image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    thumbnail_path = os.path.join(output_dir, f'{name}_thumb.jpg')
+    image.save(thumbnail_path, 'JPEG', quality=80, optimize=True)
+    webp_path = os.path.join(output_dir, f'{name}_thumb.webp')
+    image.save(webp_path, 'WEBP', quality=80, method=4)
+    return full_path, thumbnail_path, webp_path
+
+
+def claim_jobs(limit):
+    """Mark up to ``limit`` pending jobs as processing; conditional updates keep workers from sharing a job."""
+    PhotoJob.objects.filter(
+        status=PhotoJob.PROCESSING, updated_at__lt=timezone.now() - STALE_JOB_AGE
+    ).update(status=PhotoJob.PENDING)
+    claimed = []
+    for job_id in PhotoJob.objects.filter(status=PhotoJob.PENDING).order_by('id').values_list('id', flat=True)[:limit]:
+        if PhotoJob.objects.filter(id=job_id, status=PhotoJob.PENDING).update(
+            status=PhotoJob.PROCESSING, updated_at=timezone.now()
+        ):
+            claimed.append(job_id)
+    return list(PhotoJob.objects.filter(id__in=claimed).select_related('complaint'))
+
+
+def finish_job(job, paths):
+    full_path, thumbnail_path, webp_path = paths
+    # Identical photos render to identical bytes and end up sharing one file
+    photo = store_rendered(full_path, 'complaints/photo.jpg')
+    thumbnail = store_rendered(thumbnail_path, 'complaints/thumbnails/photo.jpg')
+    webp = store_rendered(webp_path, 'complaints/thumbnails/photo.webp')
+    with transaction.atomic():
+        complaint = job.complaint
+        complaint.photos = media_reference(photo)
+        complaint.photo_thumbnail = media_reference(thumbnail)
+        complaint.photo_webp = media_reference(webp)
+        complaint.save(update_fields=['photos', 'photo_thumbnail', 'photo_webp'])
+        job.status = PhotoJob.DONE
+        job.error = ''
+        job.updated_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'updated_at'])
+    if os.path.exists(job.spool_path):
+        os.remove(job.spool_path)
+
+
+def fail_job(job, error):
+    job.attempts += 1
+    job.status = PhotoJob.FAILED if job.attempts >= MAX_ATTEMPTS else PhotoJob.PENDING
+    job.error = str(error)[:1000]
+    job.updated_at = timezone.now()
+    job.save(update_fields=['attempts', 'status', 'error', 'updated_at'])
+
+
+def drain(pool, batch_size=20):
+    """
+    Process pending jobs until the queue is empty; returns the number handled.
+
+    Image work runs in ``pool`` (a ProcessPoolExecutor) while this process
+    claims jobs and records the results in the database.
+    """
+    handled = 0
+    while True:
+        jobs = claim_jobs(batch_size)
+        if not jobs:
+            return handled
+        futures = [(job, pool.submit(render_photo, job.spool_path, spool_dir())) for job in jobs]
+        for job, future in futures:
+            try:
+                finish_job(job, future.result())
+            except Exception as e:
+                fail_job(job, e)
+        handled += len(jobs)
+
+
+def use_thumbnails(rows):
+    """Point the ``photos`` of list rows at the thumbnail once one exists."""
+    for row in rows:
+        if row.get('photo_thumbnail'):
+            row['photos'] = row['photo_thumbnail']
+    return rows
@@ -0,0 +1,219 @@
+import datetime
+from collections import Counter as Deltas, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ArchivedComplaint, Complaint, ComplaintRollup
+
+DIMENSIONS = ('type', 'severity', 'status', 'train_number')
+STORED_GRANULARITIES = {
+    ComplaintRollup.HOUR: TruncHour,
+    ComplaintRollup.DAY: TruncDay,
+}
+# Served by adding up the daily rows
+DERIVED_GRANULARITIES = ('week', 'month')
+MAX_BUCKETS = 5000
+DEFAULT_TOP = 20
+
+
+def bucket_start(moment, granularity):
+    """Start of the hour, day, week (Monday) or month holding ``moment``, in the current time zone."""
+    moment = timezone.localtime(moment)
+    if granularity == ComplaintRollup.HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, granularity):
+    if granularity == ComplaintRollup.HOUR:
+        return start + datetime.timedelta(hours=1)
+    if granularity == 'week':
+        return start + datetime.timedelta(days=7)
+    if granularity == 'month':
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start + datetime.timedelta(days=1)
+
+
+def parse_moment(text):
+    """Aware datetime for an ISO date or datetime (naive ones are in the current time zone)."""
+    moment = parse_datetime(text)
+    if moment is None:
+        day = parse_date(text)
+        if day is None:
+            raise ValueError(f'Invalid date: {text}')
+        moment = datetime.datetime.combine(day, datetime.time())
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def rollup_deltas(old_values, new_values, created_at):
+    """
+    {(granularity, dimension, bucket, value): change} for a write that moves
+    a complaint filed at ``created_at`` from ``old_values`` to
+    ``new_values`` (None = absent).
+    """
+    deltas = Deltas()
+    buckets = [(granularity, bucket_start(created_at, granularity)) for granularity in STORED_GRANULARITIES]
+    for values, sign in ((old_values, -1), (new_values, 1)):
+        if values is None:
+            continue
+        for dimension in DIMENSIONS:
+            if values.get(dimension) in (None, ''):
+                continue
+            for granularity, bucket in buckets:
+                deltas[granularity, dimension, bucket, str(values[dimension])[:100]] += sign
+    return deltas
+
+
+def complaint_values(complaint):
+    return {dimension: getattr(complaint, dimension) for dimension in DIMENSIONS}
+
+
+def apply(deltas):
+    """
+    Add ``deltas`` to the rollup rows: one read of the rows touched, one
+    ``count = count + n`` UPDATE per distinct n and one insert for new rows.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    existing = {}
+    for pk, *key in ComplaintRollup.objects.filter(
+        granularity__in={key[0] for key in deltas},
+        dimension__in={key[1] for key in deltas},
+        bucket__in={key[2] for key in deltas},
+        value__in={key[3] for key in deltas},
+    ).values_list('id', 'granularity', 'dimension', 'bucket', 'value'):
+        existing[tuple(key)] = pk
+    by_delta = defaultdict(list)
+    missing = []
+    for key, delta in deltas.items():
+        if key in existing:
+            by_delta[delta].append(existing[key])
+        else:
+            missing.append(key)
+    for delta, ids in sorted(by_delta.items()):
+        ComplaintRollup.objects.filter(id__in=sorted(ids)).update(count=F('count') + delta)
+    if not missing:
+        return
+    rows = [
+        ComplaintRollup(
+            granularity=granularity, dimension=dimension, bucket=bucket, value=value,
+            count=deltas[granularity, dimension, bucket, value],
+        )
+        for granularity, dimension, bucket, value in missing
+    ]
+    try:
+        with transaction.atomic():
+            ComplaintRollup.objects.bulk_create(rows)
+    except IntegrityError:
+        # Another transaction created some of the rows first
+        for row in rows:
+            add(row)
+
+
+def add(row):
+    rollup = ComplaintRollup.objects.filter(
+        granularity=row.granularity, dimension=row.dimension, bucket=row.bucket, value=row.value,
+    )
+    if rollup.update(count=F('count') + row.count):
+        return
+    try:
+        with transaction.atomic():
+            row.save()
+    except IntegrityError:
+        rollup.update(count=F('count') + row.count)
+
+
+def series(dimension, granularity, start, end, values=None, top=DEFAULT_TOP):
+    """
+    Counts per bucket of ``granularity`` from ``start`` (inclusive) to
+    ``end`` (exclusive): (bucket starts, [{value, total, counts}]) with the
+    ``top`` values by total, or the given ``values``.
+    """
+    stored = granularity if granularity in STORED_GRANULARITIES else ComplaintRollup.DAY
+    start = bucket_start(start, granularity)
+    buckets = []
+    moment = start
+    while moment < end:
+        buckets.append(moment)
+        if len(buckets) > MAX_BUCKETS:
+            raise ValueError(f'At most {MAX_BUCKETS} buckets per request')
+        moment = next_bucket(moment, granularity)
+    position = {bucket: index for index, bucket in enumerate(buckets)}
+
+    rows = ComplaintRollup.objects.filter(
+        granularity=stored, dimension=dimension, bucket__gte=start, bucket__lt=end, count__gt=0,
+    )
+    if not values:
+        # Pick the top values in the database; train numbers alone can run to a row per complaint
+        values = list(rows.values('value').annotate(total=Sum('count')).order_by('-total', 'value').values_list(
+            'value', flat=True,
+        )[:top])
+    rows = rows.filter(value__in=values)
+    counts = defaultdict(lambda: [0] * len(buckets))
+    for bucket, value, count in rows.values_list('bucket', 'value', 'count'):
+        if stored != granularity:
+            bucket = bucket_start(bucket, granularity)
+        counts[value][position[bucket]] += count
+    results = sorted(
+        ({'value': value, 'total': sum(row), 'counts': row} for value, row in counts.items()),
+        key=lambda result: (-result['total'], result['value']),
+    )
+    return buckets, results
+
+
+def grouped_counts(granularity, dimension, start=None, end=None):
+    """(bucket, value, count) rows computed with GROUP BY over the complaint and archive tables."""
+    totals = Deltas()
+    for model in (Complaint, ArchivedComplaint):
+        complaints = model.objects.exclude(**{f'{dimension}__isnull': True}).exclude(**{dimension: ''})
+        if start is not None:
+            complaints = complaints.filter(created_at__gte=start)
+        if end is not None:
+            complaints = complaints.filter(created_at__lt=end)
+        totals.update(dict(
+            ((bucket, value), total)
+            for bucket, value, total in complaints.annotate(
+                rollup_bucket=STORED_GRANULARITIES[granularity]('created_at'),
+            ).values('rollup_bucket', dimension).annotate(total=Count('id')).order_by().values_list(
+                'rollup_bucket', dimension, 'total',
+            )
+        ))
+    return [(bucket, value, total) for (bucket, value), total in totals.items()]
+
+
+def rebuild(start=None, end=None):
+    """
+    Recompute the rollups of complaints filed from ``start`` to ``end``
+    (whole days, both optional) with GROUP BY; returns the rows written.
+    """
+    start = bucket_start(start, ComplaintRollup.DAY) if start else None
+    end = next_bucket(bucket_start(end, ComplaintRollup.DAY), ComplaintRollup.DAY) if end else None
+    written = 0
+    with transaction.atomic():
+        stale = ComplaintRollup.objects.all()
+        if start is not None:
+            stale = stale.filter(bucket__gte=start)
+        if end is not None:
+            stale = stale.filter(bucket__lt=end)
+        stale.delete()
+        for granularity in STORED_GRANULARITIES:
+            for dimension in DIMENSIONS:
+                rows = [
+                    ComplaintRollup(
+                        granularity=granularity, dimension=dimension, bucket=bucket, value=str(value)[:100], count=total,
+                    )
+                    for bucket, value, total in grouped_counts(granularity, dimension, start, end)
+                ]
+                ComplaintRollup.objects.bulk_create(rows, batch_size=2000)
+                written += len(rows)
+    return written
@@ -0,0 +1,182 @@
+import contextvars
+import functools
+import hashlib
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from . import cache
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Replica alias the current request reads from, or None for the primary
+_replica = contextvars.ContextVar('replica_alias', default=None)
+# alias -> (monotonic time of the check, healthy)
+_health = {}
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+
+def check(alias):
+    """Whether ``alias`` accepts connections and, on MySQL, is within REPLICA_MAX_LAG_SECONDS of its source."""
+    connection = connections[alias]
+    try:
+        connection.ensure_connection()
+        max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', None)
+        if max_lag is None or connection.vendor != 'mysql':
+            return True
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW REPLICA STATUS')
+            row = cursor.fetchone()
+            if row is None:
+                # Not replicating: a stand-in or a promoted replica
+                return True
+            status = dict(zip([column[0] for column in cursor.description], row))
+        lag = status.get('Seconds_Behind_Source')
+        return lag is not None and lag <= max_lag
+    except DatabaseError:
+        logger.warning('Replica %s failed its health check', alias, exc_info=True)
+        return False
+
+
+def healthy(alias):
+    """Cached result of check(), refreshed every REPLICA_HEALTH_CHECK_INTERVAL seconds per process."""
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked is None or now - checked[0] >= getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 10):
+        checked = _health[alias] = (now, check(alias))
+    return checked[1]
+
+
+def pick_replica():
+    candidates = [alias for alias in replicas() if healthy(alias)]
+    return random.choice(candidates) if candidates else None
+
+
+def client_key(request):
+    """Cache key for the client behind ``request``: its Authorization header or its session."""
+    identity = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not identity:
+        return None
+    return 'db-pin:' + hashlib.sha256(identity.encode()).hexdigest()
+
+
+def pinned(request):
+    """Whether the client wrote within the last REPLICA_STICKY_SECONDS and must read its writes from the primary."""
+    try:
+        if float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    key = client_key(request)
+    return key is not None and cache.get_cache().get(key, 0) > time.time()
+
+
+def replica_reads(view):
+    """
+    Serve the GET/HEAD requests of ``view`` from a healthy replica, unless
+    the client is pinned to the primary after a write. Every read of the
+    request goes to the same replica.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not replicas():
+                return await view(request, *args, **kwargs)
+            token = _replica.set(await sync_to_async(read_alias)(request))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica.reset(token)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not replicas():
+            return view(request, *args, **kwargs)
+        token = _replica.set(read_alias(request))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica.reset(token)
+    return wrapper
+
+
+def read_alias(request):
+    return None if pinned(request) else pick_replica()
+
+
+class ReplicaPinMiddleware:
+    """Pins a client to the primary for REPLICA_STICKY_SECONDS after each successful write request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method in SAFE_METHODS or response.status_code >= 400 or not replicas():
+            return response
+        return await sync_to_async(self.pin)(request, response)
+
+    def pin(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400 or not replicas():
+            return response
+        until = time.time() + sticky_seconds()
+        # The cookie covers browsers; the cache entry covers token clients that drop cookies
+        response.set_cookie(PIN_COOKIE, f'{until:.3f}', max_age=sticky_seconds(), httponly=True, samesite='Lax')
+        key = client_key(request)
+        if key is not None:
+            cache.get_cache().set(key, until, sticky_seconds())
+        return response
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes, and reads outside replica_reads views, go to the primary
+    (``default``). Reads inside an atomic block on the primary stay there
+    so a transaction sees its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the primary's rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Data migrations (RunPython/RunSQL carry no model name) would write through this
+        # router to the primary; replicas get those rows from the primary instead
+        if db in replicas() and model_name is None:
+            return False
+        return None
@@ -0,0 +1,154 @@
+import math
+import re
+from collections import Counter as TermCounts
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, FloatField, Sum, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Ln
+
+from . import counters
+from .models import Complaint, SearchTerm
+
+# Fields covered by the search index, in the column order of the MySQL FULLTEXT index
+SEARCH_FIELDS = ('description', 'pnr_number', 'train_number')
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'the', 'to', 'was', 'were', 'with',
+}
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [
+        token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def complaint_terms(complaint):
+    terms = TermCounts()
+    for field in SEARCH_FIELDS:
+        terms.update(tokenize(getattr(complaint, field)))
+    return terms
+
+
+class InvertedIndexBackend:
+    """
+    Portable search backed by the SearchTerm postings table.
+
+    Every complaint stores one (term, complaint, frequency) row per distinct
+    term, so a query only reads the postings of its own terms through the
+    (term, complaint) index. Ranking is TF-IDF summed per complaint by the
+    database, which only returns the requested page.
+    """
+
+    def index(self, complaint):
+        SearchTerm.objects.filter(complaint=complaint).delete()
+        SearchTerm.objects.bulk_create([
+            SearchTerm(term=term, complaint=complaint, frequency=frequency)
+            for term, frequency in complaint_terms(complaint).items()
+        ])
+
+    def index_new(self, complaints):
+        """Index complaints that have no postings yet with one bulk insert."""
+        SearchTerm.objects.bulk_create([
+            SearchTerm(term=term, complaint=complaint, frequency=frequency)
+            for complaint in complaints
+            for term, frequency in complaint_terms(complaint).items()
+        ], batch_size=2000)
+
+    def rebuild(self):
+        SearchTerm.objects.all().delete()
+        chunk = []
+        for complaint in Complaint.objects.only(*SEARCH_FIELDS).iterator(chunk_size=2000):
+            chunk.append(complaint)
+            if len(chunk) == 2000:
+                self.index_new(chunk)
+                chunk = []
+        self.index_new(chunk)
+
+    def _document_frequencies(self, query):
+        terms = set(tokenize(query))
+        if not terms:
+            return {}
+        return dict(
+            SearchTerm.objects.filter(term__in=terms).values('term').annotate(documents=Count('pk'))
+            .order_by().values_list('term', 'documents')
+        )
+
+    def search(self, query, offset, limit):
+        frequencies = self._document_frequencies(query)
+        if not frequencies:
+            return 0, []
+        total = max(counters.get_values([counters.COMPLAINTS_TOTAL])[counters.COMPLAINTS_TOTAL], 1)
+        idf = Case(
+            *(When(term=term, then=Value(math.log(1 + total / documents))) for term, documents in frequencies.items()),
+            output_field=FloatField(),
+        )
+        postings = SearchTerm.objects.filter(term__in=frequencies)
+        ranked = (
+            postings.values('complaint_id')
+            .annotate(score=Sum((Value(1.0) + Ln('frequency')) * idf))
+            .order_by('-score', '-complaint_id')
+            .values_list('complaint_id', 'score')[offset:offset + limit]
+        )
+        if len(frequencies) == 1:
+            matches = next(iter(frequencies.values()))
+        else:
+            matches = postings.values('complaint_id').distinct().count()
+        return matches, list(ranked)
+
+    def filter_queryset(self, queryset, query):
+        terms = set(tokenize(query))
+        return queryset.filter(id__in=SearchTerm.objects.filter(term__in=terms).values('complaint_id'))
+
+
+class MySQLFullTextBackend:
+    """Search through the FULLTEXT index created by migration 0012; InnoDB keeps it current."""
+
+    match_sql = 'MATCH (description, pnr_number, train_number) AGAINST (%s IN NATURAL LANGUAGE MODE)'
+
+    def index(self, complaint):
+        pass
+
+    def index_new(self, complaints):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def _matches(self, queryset, query):
+        return queryset.annotate(score=RawSQL(self.match_sql, (query,))).filter(score__gt=0)
+
+    def search(self, query, offset, limit):
+        matches = self._matches(Complaint.objects.all(), query)
+        page = matches.order_by('-score', '-id').values_list('id', 'score')[offset:offset + limit]
+        return matches.count(), list(page)
+
+    def filter_queryset(self, queryset, query):
+        return self._matches(queryset, query)
+
+
+def get_backend():
+    backend = getattr(settings, 'COMPLAINT_SEARCH_BACKEND', None)
+    if backend is None:
+        backend = 'fulltext' if connection.vendor == 'mysql' else 'inverted_index'
+    if backend == 'fulltext':
+        return MySQLFullTextBackend()
+    return InvertedIndexBackend()
+
+
+def search_complaints(query, offset=0, limit=20):
+    """Return (total matches, [(complaint, score), ...]) for one page of ranked results."""
+    total, ranked = get_backend().search(query, offset, limit)
+    complaints = Complaint.objects.in_bulk([complaint_id for complaint_id, _ in ranked])
+    return total, [
+        (complaints[complaint_id], score)
+        for complaint_id, score in ranked if complaint_id in complaints
+    ]
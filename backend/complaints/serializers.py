@@ -1,10 +1,17 @@
 from rest_framework import serializers
+from .feedback import resolve_complaint
+from .metrics import TimedSerializerMixin
 from .models import Complaint, Feedback, Staff
 
-class ComplaintSerializer(serializers.ModelSerializer):
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+class ComplaintSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Complaint
         fields = '__all__'
+        list_serializer_class = TimedListSerializer
+        read_only_fields = ['assigned_staff', 'cluster', 'triage_priority', 'claimed_by', 'claimed_at', 'closed_at']
  
     def validate_photos(self, value):
         # Allow both string (filepath) and None values
@@ -15,13 +22,24 @@ class ComplaintSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         return Complaint.objects.create(**validated_data)
 
-class FeedbackSerializer(serializers.ModelSerializer):
+class FeedbackSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    # Clients send and read the reference as ``complaint_id``; ``complaint`` is the resolved link
+    complaint_id = serializers.CharField(source='complaint_reference', max_length=100)
+
     class Meta:
         model = Feedback
-        fields = '__all__'
+        exclude = ['complaint_reference']
+        read_only_fields = ['complaint']
+        list_serializer_class = TimedListSerializer
+
+    def validate(self, attrs):
+        if 'complaint_reference' in attrs:
+            attrs['complaint_id'] = resolve_complaint(attrs['complaint_reference'])
+        return attrs
 
-class StaffSerializer(serializers.ModelSerializer):
+class StaffSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Staff
         fields = '__all__'
+        list_serializer_class = TimedListSerializer
 
@@ -0,0 +1,156 @@
+from collections import Counter
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from . import archive, assignment, changes, counters, duplicates, events, feedback, rollups, search, staff_directory, storage, triage
+from .models import Complaint, ComplaintChange, Feedback, FeedbackRollup, Staff
+from .photos import storage_name
+
+COMPLAINT_MEDIA_FIELDS = ('photos', 'photo_thumbnail', 'photo_webp')
+
+# Sent with ``instances`` after Complaint.objects.bulk_create(), which skips post_save
+complaints_created = Signal()
+
+
+def loaded_value(instance, field):
+    """Value of ``field`` as last read from the database (fields never loaded count as unchanged)."""
+    loaded = getattr(instance, '_loaded_values', {})
+    if field in loaded:
+        return loaded[field]
+    return getattr(instance, field)
+
+
+def update_media_references(old_names, new_names):
+    """Move stored-file reference counts from ``old_names`` to ``new_names`` (one per field naming a file)."""
+    old_names = Counter(name for name in old_names if name)
+    new_names = Counter(name for name in new_names if name)
+    storage.acquire((new_names - old_names).elements())
+    storage.release((old_names - new_names).elements())
+
+
+def complaint_media(values):
+    return [storage_name(value) for value in values]
+
+
+def ticket_holder(staff_id, status):
+    """Staff member whose active_tickets include a complaint in this state."""
+    return staff_id if staff_id and status != 'Closed' else None
+
+
+def move_ticket(old_holder, new_holder, deltas):
+    if old_holder == new_holder:
+        return
+    if old_holder:
+        Staff.objects.filter(id=old_holder, active_tickets__gt=0).update(active_tickets=F('active_tickets') - 1)
+    if new_holder:
+        Staff.objects.filter(id=new_holder).update(active_tickets=F('active_tickets') + 1)
+    deltas[counters.table_version_key('staff')] += 1
+
+
+@receiver(pre_save, sender=Complaint)
+def complaint_saving(sender, instance, **kwargs):
+    triage.set_priority(instance)
+    counters.set_closed_at(instance, None if instance._state.adding else loaded_value(instance, 'status'))
+
+
+@receiver(post_save, sender=Complaint)
+def complaint_saved(sender, instance, created, **kwargs):
+    old_status = None if created else loaded_value(instance, 'status')
+    old_closed_at = None if created else loaded_value(instance, 'closed_at')
+    deltas = counters.complaint_deltas(old_status, instance.status, old_closed_at)
+    old_holder = None if created else ticket_holder(loaded_value(instance, 'assigned_staff_id'), old_status)
+    move_ticket(old_holder, ticket_holder(instance.assigned_staff_id, instance.status), deltas)
+    counters.apply(deltas)
+    old_values = None if created else {field: loaded_value(instance, field) for field in rollups.DIMENSIONS}
+    rollups.apply(rollups.rollup_deltas(old_values, rollups.complaint_values(instance), instance.created_at))
+    changes.record([instance.id], ComplaintChange.UPSERT)
+    if created or old_status != instance.status:
+        events.publish([events.complaint_event(instance, old_status)])
+    if created or any(
+        loaded_value(instance, field) != getattr(instance, field) for field in search.SEARCH_FIELDS
+    ):
+        search.get_backend().index(instance)
+    if created or any(
+        loaded_value(instance, field) != getattr(instance, field) for field in duplicates.INDEX_FIELDS
+    ):
+        duplicates.index(instance, cluster=created)
+    old_media = [] if created else complaint_media(loaded_value(instance, f) for f in COMPLAINT_MEDIA_FIELDS)
+    update_media_references(old_media, complaint_media(getattr(instance, f) for f in COMPLAINT_MEDIA_FIELDS))
+
+
+@receiver(complaints_created, sender=Complaint)
+def complaints_bulk_created(sender, instances, **kwargs):
+    deltas = counters.Deltas()
+    rollup_deltas = rollups.Deltas()
+    for instance in instances:
+        deltas.update(counters.complaint_deltas(None, instance.status))
+        rollup_deltas.update(rollups.rollup_deltas(None, rollups.complaint_values(instance), instance.created_at))
+    counters.apply(deltas)
+    rollups.apply(rollup_deltas)
+    changes.record([instance.id for instance in instances], ComplaintChange.UPSERT)
+    events.publish([events.complaint_event(instance, None) for instance in instances])
+    search.get_backend().index_new(instances)
+    duplicates.index_new(instances)
+
+
+@receiver(post_delete, sender=Complaint)
+def complaint_deleted(sender, instance, **kwargs):
+    changes.record([instance.id], ComplaintChange.DELETE)
+    if instance.cluster_id:
+        duplicates.leave(instance.cluster_id)
+    if archive.is_archiving():
+        return
+    deltas = counters.complaint_deltas(instance.status, None)
+    move_ticket(ticket_holder(instance.assigned_staff_id, instance.status), None, deltas)
+    counters.apply(deltas)
+    rollups.apply(rollups.rollup_deltas(rollups.complaint_values(instance), None, instance.created_at))
+    # Its feedback is kept (complaint set to NULL by a queryset update, without signals)
+    FeedbackRollup.objects.filter(scope=FeedbackRollup.COMPLAINT, key=str(instance.id)).delete()
+    storage.release(complaint_media(getattr(instance, f) for f in COMPLAINT_MEDIA_FIELDS))
+
+
+def feedback_values(instance, loaded=False):
+    fields = ('complaint_id', 'category', 'subcategory', 'rating')
+    if loaded:
+        return {field: loaded_value(instance, field) for field in fields}
+    return {field: getattr(instance, field) for field in fields}
+
+
+@receiver(post_save, sender=Feedback)
+def feedback_saved(sender, instance, created, **kwargs):
+    old_values = None if created else feedback_values(instance, loaded=True)
+    feedback.apply(feedback.rollup_deltas(old_values, feedback_values(instance)))
+
+
+@receiver(post_delete, sender=Feedback)
+def feedback_deleted(sender, instance, **kwargs):
+    if archive.is_archiving():
+        return
+    feedback.apply(feedback.rollup_deltas(feedback_values(instance, loaded=True), None))
+
+
+@receiver(post_save, sender=Staff)
+def staff_saved(sender, instance, created, **kwargs):
+    old_status = None if created else loaded_value(instance, 'status')
+    counters.apply(counters.staff_deltas(old_status, instance.status))
+    if not created and old_status != instance.status:
+        events.publish([events.staff_event(instance, old_status)])
+    if created or any(
+        loaded_value(instance, field) != getattr(instance, field)
+        for field in staff_directory.ATTRIBUTE_FIELDS.values()
+    ):
+        staff_directory.sync_attributes(instance)
+        assignment.invalidate()
+    elif old_status != instance.status:
+        assignment.invalidate()
+    old_avatar = None if created else loaded_value(instance, 'avatar')
+    update_media_references([getattr(old_avatar, 'name', old_avatar)], [instance.avatar.name])
+
+
+@receiver(post_delete, sender=Staff)
+def staff_deleted(sender, instance, **kwargs):
+    counters.apply(counters.staff_deltas(instance.status, None))
+    assignment.invalidate()
+    storage.release([instance.avatar.name])
@@ -0,0 +1,69 @@
+import json
+
+from django.db import transaction
+
+from .models import StaffAttribute
+
+# Staff text field (a JSON list) behind each attribute kind, and the
+# staff_list query parameter filtering on it
+ATTRIBUTE_FIELDS = {
+    StaffAttribute.EXPERTISE: 'expertise',
+    StaffAttribute.LANGUAGE: 'languages',
+    StaffAttribute.CHANNEL: 'communication_preferences',
+}
+MAX_VALUE_LENGTH = 100
+
+
+def json_list(value):
+    try:
+        parsed = json.loads(value or '[]')
+    except (TypeError, ValueError):
+        return []
+    return [item for item in parsed if isinstance(item, str)] if isinstance(parsed, list) else []
+
+
+def attribute_values(text):
+    values = []
+    for item in json_list(text):
+        item = item.strip()[:MAX_VALUE_LENGTH]
+        if item and item not in values:
+            values.append(item)
+    return values
+
+
+def attribute_rows(staff_id, values_by_field):
+    return [
+        StaffAttribute(staff_id=staff_id, kind=kind, value=value)
+        for kind, field in ATTRIBUTE_FIELDS.items()
+        for value in attribute_values(values_by_field.get(field))
+    ]
+
+
+def sync_attributes(staff):
+    """Rewrite the StaffAttribute rows of ``staff`` from its JSON text fields."""
+    with transaction.atomic():
+        StaffAttribute.objects.filter(staff_id=staff.id).delete()
+        StaffAttribute.objects.bulk_create(attribute_rows(
+            staff.id, {field: getattr(staff, field) for field in ATTRIBUTE_FIELDS.values()},
+        ))
+
+
+def filter_staff(queryset, params):
+    """
+    Narrow a Staff queryset by ``status``, ``department``, ``role`` and the
+    attribute parameters ``expertise``, ``language`` and ``channel``.
+
+    Every given value must match; attribute values are matched through the
+    (kind, value, staff) index instead of decoding the JSON fields.
+    """
+    for field in ('status', 'department', 'role'):
+        if params.get(field):
+            queryset = queryset.filter(**{field: params[field]})
+    for kind in ATTRIBUTE_FIELDS:
+        for value in params.getlist(kind):
+            value = value.strip()
+            if value:
+                queryset = queryset.filter(id__in=StaffAttribute.objects.filter(
+                    kind=kind, value=value,
+                ).values('staff_id'))
+    return queryset
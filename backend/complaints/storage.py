@@ -0,0 +1,145 @@
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def hashed_name(name, digest):
+    """
+    ``complaints/IMG_0001.JPG`` -> ``complaints/ab/cd/abcd...ef.jpg``
+
+    The directory of the requested name is kept as a namespace and two
+    levels of hash prefix keep every directory small.
+    """
+    directory = os.path.dirname(name)
+    ext = os.path.splitext(name)[1].lower()[:10]
+    return '/'.join(part for part in (directory, digest[:2], digest[2:4], digest + ext) if part)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage that names every file after the SHA-256 of its content.
+
+    Saving content that is already stored returns the existing name without
+    writing anything, so identical uploads share one file. Each stored file
+    has a StoredFile row whose refcount the Complaint/Staff signal receivers
+    keep equal to the number of rows pointing at it; ``gc_media`` deletes
+    files nobody references any more.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from the content, so an existing name is the same file
+        return name
+
+    def _save(self, name, content):
+        from .models import StoredFile
+
+        name = hashed_name(name, content_hash(content))
+        # Record the file before writing it; refreshing last_stored_at keeps
+        # gc_media away from a file that just lost its last reference
+        now = timezone.now()
+        created = False
+        if not StoredFile.objects.filter(name=name).update(last_stored_at=now):
+            try:
+                with transaction.atomic():
+                    StoredFile.objects.create(name=name, size=content.size, last_stored_at=now)
+                created = True
+            except IntegrityError:
+                # Another upload of the same content recorded it first
+                StoredFile.objects.filter(name=name).update(last_stored_at=now)
+
+        path = self.path(name)
+        # A new row may replace one collect_garbage() just deleted, so a file
+        # still on disk can be on its way out: write it afresh
+        if created or not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file and rename it into place so readers
+            # and concurrent writers of the same content never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.upload-')
+            try:
+                with os.fdopen(fd, 'wb') as destination:
+                    for chunk in content.chunks():
+                        destination.write(chunk)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp_path, self.file_permissions_mode)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return name
+
+
+def get_media_storage():
+    return media_storage
+
+
+media_storage = ContentAddressedStorage()
+
+
+def acquire(names):
+    from .models import StoredFile
+
+    for name in names:
+        if name:
+            StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+def release(names):
+    from .models import StoredFile
+
+    for name in names:
+        if name:
+            StoredFile.objects.filter(name=name).update(refcount=F('refcount') - 1)
+
+
+def collect_garbage(grace=timedelta(hours=24), dry_run=False):
+    """
+    Delete stored files that have no references.
+
+    Files stored less than ``grace`` ago are kept: they may belong to an
+    upload whose row has not been saved yet. Returns the removed names.
+    """
+    from .models import StoredFile
+
+    candidates = StoredFile.objects.filter(
+        refcount__lte=0, last_stored_at__lt=timezone.now() - grace
+    ).values_list('name', flat=True)
+    removed = []
+    for name in candidates.iterator():
+        if dry_run:
+            removed.append(name)
+            continue
+        with transaction.atomic():
+            # Re-checked under the row lock so a concurrent acquire() or re-upload wins
+            stored = StoredFile.objects.select_for_update().filter(
+                name=name, refcount__lte=0, last_stored_at__lt=timezone.now() - grace
+            ).first()
+            if stored is None:
+                continue
+            # Unlinked before the row goes: an upload of the same content
+            # waits for the lock, then records and writes the file again
+            media_storage.delete(name)
+            stored.delete()
+        removed.append(name)
+    return removed
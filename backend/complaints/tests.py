@@ -1,3 +1,1542 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Sum
+from django.http import QueryDict
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.client import MULTIPART_CONTENT
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .feedback import summary
+from .models import ArchivedComplaint, ArchivedFeedback, Complaint, ComplaintChange, DuplicateCluster, MinHashBand, ComplaintRollup, PhotoJob, PushEvent, SearchTerm, StoredFile, Feedback, FeedbackRollup, Staff
+from .pagination import InvalidCursor, InvalidFilter, decode_cursor, encode_cursor, filter_complaints, order_by_keyset
+from .photos import media_reference, spool_dir, spool_upload, use_thumbnails
+from .serializers import ComplaintSerializer, StaffSerializer
+from .staff_directory import filter_staff
+from . import archive, assignment, bulk, cache, changes, classifier, counters, duplicates, events, export, search, storage, feedback, metrics, rollups, routing, triage, views
+from .bulk import BulkPayloadError, ingest, parse_ndjson
+
+
+def uses_full_table_scan(queryset):
+    """Return True when the database plans a full scan of any table for the query."""
+    if connection.vendor == 'mysql':
+        plan = json.loads(queryset.explain(format='json'))
+        return '"access_type": "ALL"' in json.dumps(plan)
+    # SQLite reports "SCAN <table>" for a full scan and
+    # "SCAN <table> USING [COVERING] INDEX ..." for an index scan
+    plan = queryset.explain()
+    return any(
+        re.search(r'\bSCAN \w+$', line.strip()) for line in plan.splitlines()
+    )
+
+
+class QueryPlanTests(TestCase):
+    """The hot list/filter queries must be answered from an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='passenger', password='secret')
+        types = ['electrical', 'catering', 'water', 'security']
+        Complaint.objects.bulk_create([
+            Complaint(
+                type=types[i % len(types)],
+                description=f'Complaint number {i}',
+                train_number=f'12{i % 50:03d}',
+                pnr_number=f'{4500000000 + i}',
+                severity=['Low', 'Medium', 'High'][i % 3],
+                status=['Open', 'In Progress', 'Closed'][i % 3],
+                date_of_incident=datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 90),
+                user=user if i % 4 == 0 else None,
+            )
+            for i in range(500)
+        ])
+        Feedback.objects.bulk_create([
+            Feedback(
+                complaint_reference=str(i % 100 + 1), complaint_id=i % 100 + 1, category='Service', subcategory='Staff',
+                feedback_message='ok', rating=i % 5 + 1, name='P', email='p@example.com',
+            )
+            for i in range(200)
+        ])
+        Staff.objects.bulk_create([
+            Staff(
+                name=f'Staff {i}', email=f'staff{i}@example.com', phone='9999999999',
+                role='Agent', department=['Support', 'Technical', 'Catering'][i % 3],
+                status=['active', 'inactive', 'on-leave'][i % 3],
+            )
+            for i in range(60)
+        ])
+        cls.user = user
+
+    def assertIndexed(self, queryset):
+        self.assertFalse(
+            uses_full_table_scan(queryset),
+            f'Full table scan for:\n{queryset.query}\n{queryset.explain()}',
+        )
+
+    def test_complaint_keyset_pages(self):
+        cursor = encode_cursor(datetime.date(2025, 2, 1), 100)
+        for descending in (False, True):
+            with self.subTest(descending=descending):
+                queryset = order_by_keyset(Complaint.objects.all(), cursor, descending)
+                self.assertIndexed(queryset[:51])
+                queryset = order_by_keyset(
+                    Complaint.objects.filter(status='Open'), cursor, descending
+                )
+                self.assertIndexed(queryset[:51])
+
+    def test_complaint_filters(self):
+        filters = [
+            {'status': 'Open'},
+            {'severity': 'High'},
+            {'type': 'water'},
+            {'train_number': '12007'},
+            {'pnr_number': '4500000042'},
+            {'user': self.user},
+        ]
+        for lookup in filters:
+            with self.subTest(lookup=lookup):
+                queryset = Complaint.objects.filter(**lookup)
+                self.assertIndexed(queryset.order_by('date_of_incident', 'id')[:51])
+                self.assertIndexed(queryset.order_by('-date_of_incident', '-id')[:51])
+
+    def test_feedback_by_complaint(self):
+        self.assertIndexed(
+            Feedback.objects.filter(complaint_id=42).order_by('-submitted_at')
+        )
+
+    def test_triage_queue(self):
+        queryset = triage.queue(self.user)[:50]
+        self.assertIndexed(queryset)
+        if connection.vendor == 'sqlite':
+            # Read in index order rather than sorted
+            self.assertNotIn('TEMP B-TREE', queryset.explain())
+
+    def test_staff_by_status_and_department(self):
+        self.assertIndexed(Staff.objects.filter(status='active'))
+        self.assertIndexed(Staff.objects.filter(status='active', department='Support'))
+        self.assertIndexed(Staff.objects.filter(department='Support', role='Agent'))
+
+    def test_staff_attribute_filters(self):
+        for query in [
+            'language=Tamil',
+            'language=Tamil&expertise=Technical Support',
+            'language=Tamil&language=Hindi&status=active',
+            'channel=Chat&department=Support',
+        ]:
+            with self.subTest(query=query):
+                self.assertIndexed(filter_staff(Staff.objects.all(), QueryDict(query)))
+
+
+class FeedbackRollupTests(TestCase):
+    """The maintained rollups must match a GROUP BY over the feedback table."""
+
+    def test_rollups_follow_writes(self):
+        complaints = [
+            Complaint.objects.create(type='water', description=f'No water {i}', date_of_incident=datetime.date(2025, 1, 1))
+            for i in range(3)
+        ]
+        client = APIClient()
+        for i in range(12):
+            response = client.post('/api/complaints/feedback/', {
+                'complaint_id': f'#{complaints[i % 3].id}' if i % 4 else 'medical',
+                'category': ['Service', 'Cleanliness'][i % 2], 'subcategory': f'Sub {i % 3}',
+                'feedback_message': 'ok', 'rating': i % 5 + 1, 'name': 'P', 'email': 'p@example.com',
+            }, format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+        moved = Feedback.objects.filter(complaint__isnull=False).first()
+        moved.rating, moved.category = 5, 'Punctuality'
+        moved.save()
+        Feedback.objects.filter(complaint__isnull=True).first().delete()
+        complaints[2].delete()
+
+        for scope, field in [
+            (FeedbackRollup.COMPLAINT, 'complaint_id'),
+            (FeedbackRollup.CATEGORY, 'category'),
+            (FeedbackRollup.SUBCATEGORY, 'subcategory'),
+        ]:
+            with self.subTest(scope=scope):
+                expected = {
+                    str(row[field]): (row['count'], round(row['total'] / row['count'], 2))
+                    for row in Feedback.objects.exclude(**{f'{field}__isnull': True}).values(field).annotate(
+                        count=Count('id'), total=Sum('rating'),
+                    )
+                }
+                actual = {row['key']: (row['count'], row['average_rating']) for row in summary(scope, limit=1000)}
+                self.assertEqual(actual, expected)
+
+        response = client.get('/api/complaints/feedback/', {'complaint_id': complaints[0].id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), Feedback.objects.filter(complaint=complaints[0]).count())
+        self.assertEqual(response.data[0]['complaint_id'], f'#{complaints[0].id}')
+
+
+class TriageTests(TestCase):
+
+    def test_rank_and_claims(self):
+        today = datetime.date.today()
+        complaints = [
+            Complaint.objects.create(
+                type='water', description=f'No water {i}', severity=['Low', 'High'][i % 2],
+                date_of_incident=today - datetime.timedelta(days=i),
+            )
+            for i in range(10)
+        ]
+        closed = complaints[9]
+        closed.status = 'Closed'
+        closed.save()
+        first, second = (User.objects.create_user(username=name, is_staff=True) for name in ('first', 'second'))
+
+        expected = sorted(
+            (
+                triage.DEFAULT_WEIGHTS['severity'][c.severity] + (today - c.date_of_incident).days, -c.id
+            )
+            for c in complaints[:9]
+        )[::-1]
+        ranked = [(triage.score(c.triage_priority), -c.id) for c in triage.queue(first)]
+        self.assertEqual(ranked, expected)
+
+        self.assertEqual(len(triage.claim(first, k=4)), 4)
+        self.assertEqual(len(triage.claim(second, k=4)), 4)
+        claims = dict(Complaint.objects.filter(claimed_by__isnull=False).values_list('id', 'claimed_by'))
+        self.assertEqual(len(claims), 8)
+        self.assertEqual(triage.claim(second, ids=[pk for pk, user in claims.items() if user == first.id]), [])
+        self.assertEqual(len(triage.queue(second)), 5)
+        self.assertEqual(len(triage.release(first)), 4)
+        self.assertEqual(len(triage.queue(second)), 9)
+
+    def test_refresh_invalidates_cached_reads_and_feeds_changes(self):
+        complaints = [
+            Complaint.objects.create(type='water', description=description, severity=severity, date_of_incident=datetime.date(2025, 5, 1))
+            for description, severity in (('Leak', 'Low'), ('Fan broken', 'High'))
+        ]
+        ComplaintChange.objects.all().delete()
+        version = cache.table_version(cache.COMPLAINTS)
+        self.assertEqual(triage.refresh(Complaint.objects.all()), 0)
+        self.assertEqual(cache.table_version(cache.COMPLAINTS), version)
+
+        weights = {**triage.DEFAULT_WEIGHTS, 'severity': {'Low': 0.0, 'Medium': 10.0, 'High': 50.0}}
+        with override_settings(COMPLAINT_TRIAGE_WEIGHTS=weights):
+            self.assertEqual(triage.refresh(Complaint.objects.all()), 1)
+        self.assertGreater(cache.table_version(cache.COMPLAINTS), version)
+        self.assertEqual(list(ComplaintChange.objects.values_list('complaint_id', 'action')), [(complaints[1].id, ComplaintChange.UPSERT)])
+        complaints[1].refresh_from_db()
+        self.assertEqual(complaints[1].triage_priority, 50.0 - datetime.date(2025, 5, 1).toordinal())
+
+
+class RollupTests(TestCase):
+    """The incrementally maintained trend rollups must match a GROUP BY over the complaint table."""
+
+    def assertMatchesGroupBy(self):
+        for granularity in rollups.STORED_GRANULARITIES:
+            for dimension in rollups.DIMENSIONS:
+                with self.subTest(granularity=granularity, dimension=dimension):
+                    expected = {
+                        (bucket, str(value)): total
+                        for bucket, value, total in rollups.grouped_counts(granularity, dimension)
+                    }
+                    actual = dict(
+                        ((bucket, value), count)
+                        for bucket, value, count in ComplaintRollup.objects.filter(
+                            granularity=granularity, dimension=dimension, count__gt=0,
+                        ).values_list('bucket', 'value', 'count')
+                    )
+                    self.assertEqual(actual, expected)
+
+    def test_rollups_follow_writes(self):
+        first = datetime.datetime(2025, 3, 1, 8, 15, tzinfo=datetime.timezone.utc)
+        complaints = []
+        for i in range(40):
+            complaint = Complaint(
+                type=['water', 'electrical', 'catering'][i % 3], description=f'Complaint {i}',
+                severity=['Low', 'Medium', 'High'][i % 3], train_number=f'1200{i % 4}' if i % 5 else None,
+                date_of_incident=datetime.date(2025, 3, 1), created_at=first + datetime.timedelta(minutes=97 * i),
+            )
+            complaint.save()
+            complaints.append(complaint)
+        ingest([
+            {'type': 'water', 'description': f'Bulk {i}', 'date_of_incident': '2025-03-02', 'train_number': '12001'}
+            for i in range(10)
+        ])
+        for complaint in complaints[::4]:
+            complaint.status = 'Closed'
+            complaint.train_number = '12999'
+            complaint.save()
+        complaints[1].delete()
+        self.assertMatchesGroupBy()
+
+        rollups.rebuild(first, first + datetime.timedelta(days=1))
+        self.assertMatchesGroupBy()
+
+        buckets, series = rollups.series('status', 'week', first, first + datetime.timedelta(days=14))
+        self.assertEqual(len(buckets), 3)
+        totals = dict(Complaint.objects.filter(created_at__lt=first + datetime.timedelta(days=14)).values_list(
+            'status',
+        ).annotate(total=Count('id')).values_list('status', 'total'))
+        self.assertEqual({row['value']: row['total'] for row in series}, totals)
+
+
+class BulkIngestTests(TestCase):
+
+    def post_ndjson(self, body, content_type='application/x-ndjson'):
+        return APIClient().post('/api/complaints/bulk/', body, content_type=content_type)
+
+    def test_parse_ndjson_skips_blank_lines_and_keeps_line_separators_in_strings(self):
+        body = '{"description": "a\u2028b"}\n\n  \r\n{"description": "c"}\n'.encode()
+        self.assertEqual(parse_ndjson(body), [{'description': 'a\u2028b'}, {'description': 'c'}])
+
+    def test_bad_lines_are_reported_by_number(self):
+        with self.assertRaisesMessage(BulkPayloadError, 'Invalid JSON on line 3'):
+            parse_ndjson(b'{}\n\n{"type": \n')
+        response = self.post_ndjson(b'{"type": "water"}\n{"description": "caf\xe9"}\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid UTF-8 on line 2'})
+
+    def test_items_are_validated_one_by_one(self):
+        valid = {'type': 'water', 'description': 'No water', 'date_of_incident': '2025-05-01'}
+        body = b'\n'.join(json.dumps(item).encode() for item in [valid, {'type': 'water'}, [], {**valid, 'type': 'catering'}])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_ndjson(body)
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'invalid', 'invalid', 'created'])
+        self.assertIn('description', results[1]['errors'])
+        self.assertEqual(results[2]['errors'], {'non_field_errors': ['Expected an object']})
+        types = dict(Complaint.objects.values_list('id', 'type'))
+        self.assertEqual([types[results[0]['id']], types[results[3]['id']]], ['water', 'catering'])
+        self.assertEqual(counters.get_values([counters.COMPLAINTS_TOTAL])[counters.COMPLAINTS_TOTAL], 2)
+
+    def test_media_type_parameters_are_ignored(self):
+        body = json.dumps({'type': 'water', 'description': 'No water', 'date_of_incident': '2025-05-01'}).encode()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_ndjson(body, content_type='application/x-ndjson; charset=utf-8')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['created'])
+
+    def test_returned_ids_match_the_inserted_rows_across_chunks(self):
+        items = [
+            {'type': 'water', 'description': f'Bulk {i}', 'date_of_incident': '2025-05-01'}
+            for i in range(bulk.INSERT_CHUNK_SIZE + 3)
+        ]
+        results = ingest(items)
+        descriptions = dict(Complaint.objects.values_list('id', 'description'))
+        self.assertEqual([descriptions[result['id']] for result in results], [item['description'] for item in items])
+
+
+class ClassifierTests(TestCase):
+    DESCRIPTIONS = [
+        ('No water in the toilet of coach B2', 'water', 'Medium'),
+        ('Water tank empty, no water in wash basin', 'water', 'High'),
+        ('Toilet has no water since morning', 'water', None),
+        ('Food served was stale and cold', 'catering', 'Low'),
+        ('Vendor charged extra for food and tea', 'catering', 'Medium'),
+        ('Stale food from the pantry car', 'catering', 'Low'),
+        ('Fan and light not working in coach S4', 'electrical', 'High'),
+        ('Charging point not working, fan broken', 'electrical', 'Medium'),
+    ]
+
+    def setUp(self):
+        classifier._model = None
+        self.addCleanup(setattr, classifier, '_model', None)
+
+    def model(self):
+        descriptions, types, severities = zip(*self.DESCRIPTIONS)
+        return classifier.ComplaintClassifier(classifier.train(list(descriptions), list(types), list(severities)))
+
+    def test_vectorize_gives_unit_rows_and_skips_unknown_terms(self):
+        vocabulary = {'no': 0, 'water': 1, 'no water': 2, 'food': 3}
+        idf = classifier.np.array([1.0, 2.0, 3.0, 1.5], dtype=classifier.np.float32)
+        indptr, indices, values = classifier.vectorize(['No water, no WATER', 'unknown words', 'food'], vocabulary, idf)
+        self.assertEqual(indptr.tolist(), [0, 3, 3, 4])
+        self.assertEqual(indices.tolist(), [0, 1, 2, 3])
+        # Term frequency times idf: no and water twice, the bigram "no water" twice
+        expected = classifier.np.array([2.0, 4.0, 6.0])
+        self.assertTrue(classifier.np.allclose(values[:3], expected / classifier.np.linalg.norm(expected)))
+        self.assertAlmostEqual(float(values[3]), 1.0, places=6)
+
+    def test_sparse_dot_matches_the_dense_product(self):
+        np = classifier.np
+        indptr, indices, values = np.array([0, 2, 2, 3]), np.array([0, 2, 1]), np.array([0.6, 0.8, 1.0], dtype=np.float32)
+        weights = np.arange(6, dtype=np.float32).reshape(3, 2)
+        dense = np.zeros((3, 3), dtype=np.float32)
+        dense[0, 0], dense[0, 2], dense[2, 1] = 0.6, 0.8, 1.0
+        self.assertTrue(np.allclose(classifier.sparse_dot(indptr, indices, values, weights), dense @ weights))
+
+    def test_trained_model_predicts_category_and_severity(self):
+        model = self.model()
+        self.assertEqual(sorted(model.type_labels), ['catering', 'electrical', 'water'])
+        results = model.predict(['no water in the toilet', 'stale food and cold tea', 'fan not working'])
+        self.assertEqual([result['type'] for result in results], ['water', 'catering', 'electrical'])
+        self.assertEqual(results[1]['category'], classifier.CATEGORIES['catering'])
+        self.assertEqual(results[1]['severity'], 'Low')
+        for result in results:
+            self.assertGreater(result['confidence'], 1 / 3)
+            self.assertIn(result['severity'], classifier.SEVERITIES)
+        self.assertEqual(model.predict([]), [])
+
+    def test_classify_endpoint_loads_the_saved_model(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'model.npz')
+        with override_settings(COMPLAINT_CLASSIFIER_PATH=path):
+            response = APIClient().post('/api/complaints/classify/', {'descriptions': ['no water']}, format='json')
+            self.assertEqual(response.status_code, 503)
+            descriptions, types, severities = zip(*self.DESCRIPTIONS)
+            classifier.np.savez_compressed(path, **classifier.train(list(descriptions), list(types), list(severities)))
+            response = APIClient().post('/api/complaints/classify/', {'descriptions': ['no water']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['type'], 'water')
+        response = APIClient().post('/api/complaints/classify/', {'descriptions': 'no water'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_urlconf_imports_without_numpy(self):
+        code = "import sys; sys.modules['numpy'] = None; import django; django.setup(); import backend.urls"
+        process = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'backend.settings'},
+        )
+        self.assertEqual(process.returncode, 0, process.stderr)
+
+
+class PhotoFilingTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def file(self, **data):
+        return APIClient().post('/api/complaints/file/', {
+            'type': 'water', 'description': 'No water', 'date_of_incident': '2025-05-01',
+            'photos': SimpleUploadedFile('leak.jpg', b'jpeg bytes', content_type='image/jpeg'), **data,
+        })
+
+    def spooled(self):
+        return os.listdir(spool_dir()) if os.path.isdir(spool_dir()) else []
+
+    def test_photo_is_spooled_before_the_transaction_opens(self):
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        def spool(upload):
+            depths.append(len(connection.atomic_blocks))
+            return spool_upload(upload)
+
+        with mock.patch.object(views, 'spool_upload', side_effect=spool):
+            self.assertEqual(self.file().status_code, 201)
+        self.assertEqual(depths, [depth])
+        job = PhotoJob.objects.get()
+        with open(job.spool_path, 'rb') as f:
+            self.assertEqual(f.read(), b'jpeg bytes')
+
+    def test_spool_file_is_removed_when_nothing_is_queued(self):
+        with mock.patch.object(views, 'queue_photo', side_effect=DatabaseError('deadlock')):
+            with self.assertLogs('complaints.views', 'ERROR'):
+                self.assertEqual(self.file().status_code, 400)
+        self.assertFalse(Complaint.objects.exists())
+        self.assertEqual(self.spooled(), [])
+        self.assertEqual(self.file(date_of_incident='not a date').status_code, 400)
+        self.assertEqual(self.spooled(), [])
+
+    def test_async_filing_removes_the_spool_file_of_an_invalid_complaint(self):
+        async def anonymous():
+            return AnonymousUser()
+
+        request = AsyncRequestFactory().post('/api/complaints/file/', {
+            'type': 'water', 'photos': SimpleUploadedFile('leak.jpg', b'jpeg bytes', content_type='image/jpeg'),
+        })
+        request.auser = anonymous
+        self.assertEqual(async_to_sync(views.afile_complaint)(request).status_code, 400)
+        self.assertEqual(self.spooled(), [])
+
+
+class StorageTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def read(self, name):
+        with storage.media_storage.open(name) as f:
+            return f.read()
+
+    def refcount(self, name):
+        return StoredFile.objects.get(name=name).refcount
+
+    def test_identical_content_is_stored_once(self):
+        first = storage.media_storage.save('complaints/a.JPG', ContentFile(b'same photo'))
+        second = storage.media_storage.save('complaints/b.jpg', ContentFile(b'same photo'))
+        self.assertEqual(first, second)
+        self.assertRegex(first, r'^complaints/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(StoredFile.objects.get().size, len(b'same photo'))
+        self.assertEqual(self.read(first), b'same photo')
+
+    def test_refcount_follows_the_complaints_pointing_at_a_file(self):
+        photo = storage.media_storage.save('complaints/photo.jpg', ContentFile(b'photo'))
+        other = storage.media_storage.save('complaints/photo.jpg', ContentFile(b'other photo'))
+        complaints = [
+            Complaint.objects.create(
+                type='water', description='Leak', date_of_incident=datetime.date(2025, 5, 1),
+                photos=media_reference(photo), photo_thumbnail=media_reference(photo),
+            )
+            for _ in range(2)
+        ]
+        self.assertEqual(self.refcount(photo), 4)
+        complaints[0].photos = media_reference(other)
+        complaints[0].save()
+        self.assertEqual((self.refcount(photo), self.refcount(other)), (3, 1))
+        complaints[1].delete()
+        self.assertEqual((self.refcount(photo), self.refcount(other)), (1, 1))
+
+    def test_collect_garbage_removes_only_old_unreferenced_files(self):
+        names = [storage.media_storage.save('complaints/p.jpg', ContentFile(content)) for content in (b'kept', b'old', b'new')]
+        Complaint.objects.create(
+            type='water', description='Leak', date_of_incident=datetime.date(2025, 5, 1), photos=media_reference(names[0]),
+        )
+        StoredFile.objects.exclude(name=names[2]).update(last_stored_at=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc))
+        self.assertEqual(storage.collect_garbage(dry_run=True), [names[1]])
+        self.assertTrue(storage.media_storage.exists(names[1]))
+        self.assertEqual(storage.collect_garbage(), [names[1]])
+        self.assertFalse(storage.media_storage.exists(names[1]))
+        self.assertEqual(sorted(StoredFile.objects.values_list('name', flat=True)), sorted([names[0], names[2]]))
+
+    def test_reupload_after_collection_rewrites_the_file(self):
+        name = storage.media_storage.save('complaints/p.jpg', ContentFile(b'photo'))
+        # collect_garbage() has deleted the row but not yet unlinked the file
+        StoredFile.objects.filter(name=name).delete()
+        with open(storage.media_storage.path(name), 'wb') as f:
+            f.write(b'truncated')
+        self.assertEqual(storage.media_storage.save('complaints/p.jpg', ContentFile(b'photo')), name)
+        self.assertEqual(self.read(name), b'photo')
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 0)
+
+    def test_reupload_keeps_a_file_from_collection(self):
+        name = storage.media_storage.save('complaints/p.jpg', ContentFile(b'photo'))
+        StoredFile.objects.update(last_stored_at=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc))
+        storage.media_storage.save('complaints/p.jpg', ContentFile(b'photo'))
+        self.assertEqual(storage.collect_garbage(), [])
+        self.assertTrue(storage.media_storage.exists(name))
+
+
+class MetricsTests(TestCase):
+
+    def test_metrics_and_n_plus_one(self):
+        staff = User.objects.create_user(username='metrics-admin', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+        self.assertEqual(client.get('/api/complaints/list/').status_code, 200)
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn('railmadad_http_requests_total{view="complaint_list",method="GET",status="200"}', text)
+        self.assertIn('railmadad_db_queries_per_request_count{view="complaint_list"}', text)
+        self.assertRegex(text, r'railmadad_http_request_duration_seconds_bucket\{view="complaint_list",method="GET",le="\+Inf"\} \d+')
+
+        def per_row(request):
+            for pk in range(12):
+                Complaint.objects.filter(pk=pk).exists()
+            return HttpResponse('ok')
+
+        with override_settings(N_PLUS_ONE_THRESHOLD=10, SLOW_REQUEST_MS=0):
+            middleware = metrics.RequestMetricsMiddleware(per_row)
+        with self.assertLogs('complaints.metrics', 'WARNING') as logs:
+            middleware(RequestFactory().get('/unrouted/'))
+        self.assertIn('"repeats": 12', logs.output[0])
+        self.assertIn('"queries": 12', logs.output[1])
+
+    def test_streamed_chunk_queries_are_not_n_plus_one(self):
+        def chunked(request):
+            def rows():
+                for pk in range(12):
+                    yield str(Complaint.objects.filter(pk__gt=pk).exists())
+            return StreamingHttpResponse(rows())
+
+        with override_settings(N_PLUS_ONE_THRESHOLD=10, SLOW_REQUEST_MS=60000):
+            middleware = metrics.RequestMetricsMiddleware(chunked)
+        before = sum(metrics.registry.n_plus_one.values())
+        with self.assertNoLogs('complaints.metrics', 'WARNING'):
+            response = middleware(RequestFactory().get('/unrouted/'))
+            self.assertEqual(len(list(response.streaming_content)), 12)
+        self.assertEqual(sum(metrics.registry.n_plus_one.values()), before)
+
+
+@skipUnless('replica1' in settings.DATABASE_REPLICAS, 'set SQLITE_REPLICA_PATHS (or MYSQL_REPLICA_HOSTS) to a replica')
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    The replica stands in empty, so a read shows which database served it.
+    Reads inside a transaction stay on the primary, hence TransactionTestCase.
+    """
+
+    databases = {'default', *settings.DATABASE_REPLICAS}
+
+    def setUp(self):
+        cache.get_cache().clear()
+        routing._health.clear()
+
+    def file_complaint(self, client):
+        return client.post('/api/complaints/file/', {
+            'type': 'water', 'description': 'No water in coach B2', 'date_of_incident': '2025-05-01',
+        }, format='json')
+
+    def test_reads_go_to_the_replica_until_the_client_writes(self):
+        Complaint.objects.create(type='water', description='Filed earlier', date_of_incident=datetime.date(2025, 5, 1))
+        browser = APIClient()
+        self.assertEqual(browser.get('/api/complaints/list/').json(), [])
+        self.assertEqual(self.file_complaint(browser).status_code, 201)
+        self.assertIn(routing.PIN_COOKIE, browser.cookies)
+        self.assertEqual(len(browser.get('/api/complaints/list/').json()), 2)
+        # Other clients still read from the replica
+        self.assertEqual(APIClient().get('/api/complaints/list/').json(), [])
+
+        # Token clients that drop cookies are pinned through the cache
+        staff = User.objects.create_user(username='replica-admin', is_staff=True)
+        token_client = APIClient(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=staff).key}')
+        self.assertEqual(self.file_complaint(token_client).status_code, 201)
+        token_client.cookies.clear()
+        self.assertEqual(len(token_client.get('/api/complaints/list/').json()), 3)
+
+    def test_unhealthy_replicas_are_skipped(self):
+        Complaint.objects.create(type='water', description='Filed earlier', date_of_incident=datetime.date(2025, 5, 1))
+        routing._health['replica1'] = (float('inf'), False)
+        self.assertEqual(len(APIClient().get('/api/complaints/list/').json()), 1)
+
+
+class ChangeFeedTests(TransactionTestCase):
+    """Sequence numbers are assigned after commit, hence TransactionTestCase."""
+
+    def complaint(self, description):
+        return Complaint.objects.create(type='water', description=description, date_of_incident=datetime.date(2025, 5, 1))
+
+    def sync(self, since):
+        response = APIClient().get('/api/complaints/changes/', {'since': since})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        return [change['description'] for change in body['changes']], body['deleted'], int(body['next'])
+
+    def test_slow_transaction_committing_a_lower_id_is_not_skipped(self):
+        target = self.complaint('Fan not working')
+        # The slow transaction draws its change id first ...
+        slow_id = ComplaintChange.objects.create(complaint_id=target.id, action=ComplaintChange.UPSERT).id
+        ComplaintChange.objects.filter(id=slow_id).delete()
+        # ... a fast one commits after it and a client syncs past it
+        self.complaint('Leaking tap')
+        upserted, _, token = self.sync(0)
+        self.assertEqual(upserted, ['Fan not working', 'Leaking tap'])
+        self.assertEqual(self.sync(token), ([], [], token))
+
+        # Only then does the slow transaction commit
+        with transaction.atomic():
+            Complaint.objects.filter(id=target.id).update(description='Fan still not working')
+            ComplaintChange.objects.create(id=slow_id, complaint_id=target.id, action=ComplaintChange.UPSERT)
+            transaction.on_commit(changes.assign_sequence)
+        self.assertLess(slow_id, ComplaintChange.objects.order_by('-id').first().id)
+        upserted, _, next_token = self.sync(token)
+        self.assertEqual(upserted, ['Fan still not working'])
+        self.assertGreater(next_token, token)
+
+    def test_uncommitted_changes_are_not_handed_out(self):
+        with transaction.atomic():
+            complaint = self.complaint('Seat broken')
+            self.assertEqual(changes.changes_since(0), ([], [], 0, False))
+        self.assertEqual(changes.changes_since(0)[0], [complaint])
+
+    def test_deletions_are_reported_in_commit_order(self):
+        complaint = self.complaint('Lights flickering')
+        _, _, token = self.sync(0)
+        complaint_id = complaint.id
+        complaint.delete()
+        self.assertEqual(self.sync(token)[:2], ([], [complaint_id]))
+
+
+class AssignmentTests(TestCase):
+
+    def setUp(self):
+        assignment.invalidate()
+
+    def staff(self, name, expertise, active_tickets=0):
+        return Staff.objects.create(
+            name=name, email=f'{name.lower()}@example.com', phone='1', role='agent', department='Water',
+            expertise=json.dumps(expertise), languages='["Hindi"]', active_tickets=active_tickets,
+        )
+
+    def file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post('/api/complaints/file/', {
+                'type': 'water', 'description': 'No water in coach B2', 'date_of_incident': '2025-05-01',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Complaint.objects.get()
+
+    def test_filed_complaint_goes_to_the_least_loaded_matching_staff(self):
+        self.staff('Busy', ['Passenger Assistance'], active_tickets=3)
+        idle = self.staff('Idle', ['Passenger Assistance'])
+        self.staff('Refunds', ['Refunds'])
+        complaint = self.file()
+        self.assertEqual((complaint.assigned_staff_id, complaint.staff), (idle.id, 'Idle'))
+        idle.refresh_from_db()
+        self.assertEqual(idle.active_tickets, 1)
+
+    def test_stale_workloads_never_push_staff_over_capacity(self):
+        member = self.staff('Asha', ['Passenger Assistance'], active_tickets=assignment.MAX_ACTIVE_TICKETS - 1)
+        assignment.get_engine()
+        # Another process gives her the last ticket she can take
+        Staff.objects.filter(id=member.id).update(active_tickets=assignment.MAX_ACTIVE_TICKETS)
+        self.assertIsNone(self.file().assigned_staff_id)
+        member.refresh_from_db()
+        self.assertEqual(member.active_tickets, assignment.MAX_ACTIVE_TICKETS)
+
+    def test_complaints_closed_or_assigned_meanwhile_keep_their_staff(self):
+        member = self.staff('Asha', ['Passenger Assistance'])
+        other = self.staff('Ravi', ['Refunds'])
+        complaints = [
+            Complaint.objects.create(type='water', description=f'No water {i}', date_of_incident=datetime.date(2025, 5, 1))
+            for i in range(3)
+        ]
+        Complaint.objects.filter(id=complaints[0].id).update(status='Closed')
+        Complaint.objects.filter(id=complaints[1].id).update(assigned_staff=other, staff='Ravi')
+        self.assertEqual(assignment.assign(complaints), {complaints[2].id: member.id})
+        self.assertEqual(
+            list(Complaint.objects.order_by('id').values_list('assigned_staff_id', 'staff')),
+            [(None, None), (other.id, 'Ravi'), (member.id, 'Asha')],
+        )
+        self.assertEqual([complaint.assigned_staff_id for complaint in complaints], [None, None, member.id])
+        member.refresh_from_db()
+        self.assertEqual(member.active_tickets, 1)
+        self.assertEqual(assignment.get_engine().load[member.id], 1)
+
+    def test_failed_assignment_still_files_the_complaint(self):
+        self.staff('Asha', ['Passenger Assistance'])
+        with mock.patch.object(assignment, 'assign_with', side_effect=RuntimeError('staff table locked')):
+            with self.assertLogs('complaints.assignment', 'ERROR'):
+                complaint = self.file()
+        self.assertIsNone(complaint.assigned_staff_id)
+
+    def test_engine_lock_is_not_held_during_queries(self):
+        self.staff('Asha', ['Passenger Assistance'])
+        complaint = Complaint.objects.create(type='water', description='Leak', date_of_incident=datetime.date(2025, 5, 1))
+        held = []
+
+        def probe():
+            # RLock.acquire() from this thread would always succeed; ask from another one
+            if assignment._engine_lock.acquire(blocking=False):
+                assignment._engine_lock.release()
+            else:
+                held.append(True)
+
+        def check_lock(execute, sql, params, many, context):
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(check_lock):
+            self.assertEqual(len(assignment.assign([complaint])), 1)
+        self.assertEqual(held, [])
+
+
+class DuplicateTests(TestCase):
+    REPORT = 'The air conditioning in coach B4 stopped working after Nagpur and the compartment is very hot'
+
+    def file(self, description, train_number='12001', date=datetime.date(2025, 5, 1)):
+        return Complaint.objects.create(
+            type='ac', description=description, train_number=train_number, date_of_incident=date,
+        )
+
+    def test_shingles_ignore_case_punctuation_and_spacing(self):
+        self.assertEqual(duplicates.shingles('No  Water!'), {'no wa', 'o wat', ' wate', 'water'})
+        self.assertEqual(duplicates.shingles('no water'), duplicates.shingles('NO, water.'))
+        self.assertEqual(duplicates.shingles('Dirty'), {'dirty'})
+        self.assertEqual(duplicates.shingles(' ?! '), set())
+        self.assertEqual(duplicates.shingles(None), set())
+
+    def test_signature_estimates_similarity(self):
+        a = duplicates.shingles(self.REPORT)
+        b = duplicates.shingles(self.REPORT.replace('very hot', 'extremely hot'))
+        c = duplicates.shingles('Food served in the pantry car was stale and the staff refused a refund')
+        sig_a, sig_b, sig_c = (duplicates.signature(s) for s in (a, b, c))
+        self.assertEqual(len(sig_a), duplicates.NUM_PERMUTATIONS)
+        self.assertTrue((sig_a == duplicates.signature(set(a))).all())
+        # The share of equal MinHash values approximates the Jaccard similarity
+        self.assertAlmostEqual((sig_a == sig_b).mean(), duplicates.jaccard(a, b), delta=0.15)
+        self.assertLess((sig_a == sig_c).mean(), 0.1)
+
+    def test_similar_texts_share_a_band_bucket(self):
+        buckets = [
+            duplicates.band_buckets(duplicates.signature(duplicates.shingles(text)))
+            for text in (self.REPORT, self.REPORT + '.', self.REPORT.replace('very hot', 'extremely hot'), 'Toilet in coach S2 has no water')
+        ]
+        self.assertEqual(len(buckets[0]), duplicates.BANDS)
+        self.assertEqual(len(set(buckets[0])), duplicates.BANDS)
+        self.assertEqual(buckets[0], buckets[1])
+        self.assertTrue(set(buckets[0]) & set(buckets[2]))
+        self.assertFalse(set(buckets[0]) & set(buckets[3]))
+
+    def test_near_duplicates_on_a_train_share_a_cluster(self):
+        first = self.file(self.REPORT)
+        self.assertIsNone(first.cluster_id)
+        self.assertEqual(MinHashBand.objects.filter(complaint_id=first.id).count(), duplicates.BANDS)
+        second = self.file(self.REPORT.replace('very hot', 'extremely hot'))
+        third = self.file(self.REPORT.upper() + '!!')
+        unrelated = self.file('Toilet in coach S2 has no water since morning')
+        other_train = self.file(self.REPORT, train_number='12002')
+        other_day = self.file(self.REPORT, date=datetime.date(2025, 5, 2))
+
+        cluster = DuplicateCluster.objects.get()
+        self.assertEqual(second.cluster_id, cluster.id)
+        self.assertEqual(third.cluster_id, cluster.id)
+        self.assertEqual(
+            set(Complaint.objects.filter(cluster=cluster).values_list('id', flat=True)), {first.id, second.id, third.id},
+        )
+        self.assertEqual((cluster.size, cluster.first_complaint_id), (3, first.id))
+        self.assertEqual((cluster.train_number, cluster.date_of_incident), ('12001', datetime.date(2025, 5, 1)))
+        for complaint in (unrelated, other_train, other_day):
+            complaint.refresh_from_db()
+            self.assertIsNone(complaint.cluster_id)
+
+    def test_editing_a_description_reindexes_without_reclustering(self):
+        first = self.file(self.REPORT)
+        second = self.file('Toilet in coach S2 has no water since morning')
+        second.description = self.REPORT
+        second.save()
+        bands = set(MinHashBand.objects.filter(complaint_id=second.id).values_list('bucket', flat=True))
+        self.assertEqual(bands, set(MinHashBand.objects.filter(complaint_id=first.id).values_list('bucket', flat=True)))
+        self.assertFalse(DuplicateCluster.objects.exists())
+        # It is clustered again explicitly
+        self.assertIsNotNone(duplicates.index(second))
+        self.assertEqual(DuplicateCluster.objects.get().size, 2)
+
+    def test_bulk_inserts_cluster_with_filed_complaints_and_each_other(self):
+        existing = self.file(self.REPORT)
+        complaints = [
+            Complaint(type='ac', description=self.REPORT + suffix, train_number=train_number, date_of_incident=datetime.date(2025, 5, 1))
+            for train_number, suffix in (('12001', ''), ('12001', ' since noon'), ('12009', ''), ('12009', '!'))
+        ]
+        bulk.insert_complaints(complaints)
+        clusters = {cluster.train_number: cluster for cluster in DuplicateCluster.objects.all()}
+        self.assertEqual(sorted(clusters), ['12001', '12009'])
+        self.assertEqual((clusters['12001'].size, clusters['12001'].first_complaint_id), (3, existing.id))
+        self.assertEqual((clusters['12009'].size, clusters['12009'].first_complaint_id), (2, complaints[2].id))
+        existing.refresh_from_db()
+        self.assertEqual(
+            [existing.cluster_id] + [complaint.cluster_id for complaint in complaints],
+            [clusters['12001'].id] * 3 + [clusters['12009'].id] * 2,
+        )
+        self.assertEqual(
+            dict(Complaint.objects.values_list('cluster_id').annotate(total=Count('id'))),
+            {clusters['12001'].id: 3, clusters['12009'].id: 2},
+        )
+
+    def test_cluster_endpoints(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/complaints/clusters/').status_code, 401)
+        client.force_authenticate(User.objects.create_user(username='dup-admin', is_staff=True))
+        first = self.file(self.REPORT)
+        second = self.file(self.REPORT + '.')
+        self.file('Toilet in coach S2 has no water since morning')
+        self.file('Toilet in coach S2 has no water since morning!', train_number='12002')
+        self.file('Toilet in coach S2 has no water since morning.', train_number='12002')
+        clusters = list(DuplicateCluster.objects.order_by('-id'))
+        self.assertEqual(len(clusters), 2)
+
+        page = client.get('/api/complaints/clusters/?limit=1').json()
+        self.assertEqual([row['id'] for row in page['results']], [clusters[0].id])
+        self.assertEqual(page['next_before'], clusters[0].id)
+        page = client.get(f"/api/complaints/clusters/?limit=1&before={page['next_before']}").json()
+        self.assertEqual([row['id'] for row in page['results']], [clusters[1].id])
+        self.assertEqual(client.get('/api/complaints/clusters/?min_size=3').json()['results'], [])
+        self.assertEqual(client.get('/api/complaints/clusters/?limit=x').status_code, 400)
+
+        detail = client.get(f'/api/complaints/clusters/{clusters[1].id}/').json()
+        self.assertEqual((detail['size'], detail['first_complaint']), (2, first.id))
+        self.assertEqual([row['id'] for row in detail['complaints']], [first.id, second.id])
+        self.assertEqual(client.get('/api/complaints/clusters/0/').status_code, 404)
+
+
+class ArchiveTests(TestCase):
+
+    def test_archive_columns_mirror_the_hot_tables(self):
+        for model, archived in ((Complaint, ArchivedComplaint), (Feedback, ArchivedFeedback)):
+            archived_fields = {field.attname: field for field in archived._meta.concrete_fields}
+            for field in model._meta.concrete_fields:
+                with self.subTest(model=model.__name__, field=field.attname):
+                    self.assertIn(field.attname, archived_fields)
+                    self.assertEqual(field.null, archived_fields[field.attname].null)
+
+    def test_archived_complaints_stay_reachable(self):
+        staff = User.objects.create_user(username='archive-admin', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+        complaints = [
+            Complaint.objects.create(
+                type='water', description=f'No water {i}', train_number='12001', date_of_incident=datetime.date(2025, 1, 1),
+                status='Closed' if i % 2 else 'Open',
+            )
+            for i in range(10)
+        ]
+        for complaint in complaints[:4]:
+            client.post('/api/complaints/submit/', {
+                'complaint_id': str(complaint.id), 'category': 'Service', 'subcategory': 'Staff',
+                'feedback_message': 'ok', 'rating': 4, 'name': 'P', 'email': 'p@example.com',
+            }, format='json')
+        Complaint.objects.filter(id__in=[c.id for c in complaints[:6]]).update(
+            updated_at=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc),
+        )
+        old = [c.id for c in complaints[:6] if c.status == 'Closed']
+        details = {pk: client.get(f'/api/complaints/{pk}/').json() for pk in old}
+        feedback_before = {pk: client.get(f'/api/complaints/feedback/?complaint_id={pk}').json() for pk in old}
+        export_before = b''.join(client.get('/api/complaints/export/?format=ndjson').streaming_content)
+        stats_before = counters.dashboard_stats()
+        summary_before = summary(FeedbackRollup.COMPLAINT)
+
+        before = archive.cutoff(30)
+        self.assertEqual(archive.plan(before), (3, 2))
+        self.assertEqual([ids for ids, _ in archive.archive(before, batch_size=2)], [old[:2], old[2:]])
+        self.assertEqual(list(archive.archive(before)), [])
+
+        self.assertFalse(Complaint.objects.filter(id__in=old).exists())
+        self.assertEqual(len(client.get('/api/complaints/list/').json()), 7)
+        for pk in old:
+            self.assertEqual(client.get(f'/api/complaints/{pk}/').json(), details[pk])
+            self.assertEqual(client.get(f'/api/complaints/feedback/?complaint_id={pk}').json(), feedback_before[pk])
+        self.assertEqual(client.put(f'/api/complaints/{old[0]}/', {'status': 'Open'}, format='json').status_code, 409)
+        export_after = b''.join(client.get('/api/complaints/export/?format=ndjson').streaming_content)
+
+        def without_priority(export):
+            return sorted((json.loads(line) | {'triage_priority': None} for line in export.splitlines()), key=lambda row: row['id'])
+        self.assertEqual(without_priority(export_after), without_priority(export_before))
+        # The descriptions are near-duplicates: the cluster lost its archived members and the rest were re-ranked
+        cluster = DuplicateCluster.objects.get()
+        self.assertEqual(cluster.size, 7)
+        for complaint in Complaint.objects.all():
+            self.assertEqual(complaint.triage_priority, triage.priority(
+                complaint.severity, complaint.date_of_incident, complaint.status, cluster.size,
+            ))
+
+        self.assertEqual(counters.dashboard_stats(), stats_before)
+        counters.rebuild()
+        self.assertEqual(counters.dashboard_stats(), stats_before)
+        feedback.rebuild()
+        self.assertEqual(summary(FeedbackRollup.COMPLAINT), summary_before)
+        RollupTests.assertMatchesGroupBy(self)
+
+    def test_archiving_runs_the_delete_receivers_without_undoing_the_bookkeeping(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        photo = storage.media_storage.save('complaints/photo.jpg', ContentFile(b'photo'))
+        report = 'The fan in coach S5 makes a loud rattling noise all night long'
+        complaints = [
+            Complaint.objects.create(
+                type='fan', description=report + suffix, train_number='12001', date_of_incident=datetime.date(2025, 1, 1),
+                status=status, photos=media_reference(photo),
+            )
+            for suffix, status in (('', 'Closed'), ('.', 'Closed'), ('!', 'Open'))
+        ]
+        Feedback.objects.create(complaint=complaints[0], category='Service', subcategory='Staff', rating=2, feedback_message='late')
+        Complaint.objects.filter(status='Closed').update(updated_at=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc))
+        cluster = DuplicateCluster.objects.get()
+        self.assertEqual((cluster.size, StoredFile.objects.get(name=photo).refcount), (3, 3))
+        stats = counters.dashboard_stats()
+        feedback_summary = summary(FeedbackRollup.COMPLAINT)
+
+        self.assertEqual([ids for ids, _ in archive.archive(archive.cutoff(30))], [[complaints[0].id, complaints[1].id]])
+        self.assertFalse(archive.is_archiving())
+        # Archived copies keep their files and keep counting in the aggregates
+        self.assertEqual(StoredFile.objects.get(name=photo).refcount, 3)
+        self.assertEqual(counters.dashboard_stats(), stats)
+        self.assertEqual(summary(FeedbackRollup.COMPLAINT), feedback_summary)
+        cluster.refresh_from_db()
+        self.assertEqual((cluster.size, cluster.first_complaint_id), (1, None))
+        self.assertFalse(SearchTerm.objects.filter(complaint_id__in=[complaints[0].id, complaints[1].id]).exists())
+        self.assertFalse(MinHashBand.objects.filter(complaint_id__in=[complaints[0].id, complaints[1].id]).exists())
+        self.assertEqual(
+            set(ComplaintChange.objects.filter(action=ComplaintChange.DELETE).values_list('complaint_id', flat=True)),
+            {complaints[0].id, complaints[1].id},
+        )
+
+        # An ordinary delete still releases its file and leaves the aggregates
+        complaints[2].delete()
+        self.assertEqual(StoredFile.objects.get(name=photo).refcount, 2)
+        self.assertEqual(counters.dashboard_stats()['total_complaints'], stats['total_complaints'] - 1)
+        cluster.refresh_from_db()
+        self.assertEqual(cluster.size, 0)
+
+
+class CounterTests(TestCase):
+
+    def complaint(self, status='Open'):
+        return Complaint.objects.create(type='water', description='Leak', date_of_incident=datetime.date(2025, 5, 1), status=status)
+
+    def stats(self):
+        response = APIClient().get('/api/complaints/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), counters.dashboard_stats())
+        return response.json()
+
+    def test_counters_follow_status_changes(self):
+        complaints = [self.complaint() for _ in range(3)]
+        complaints[0].status = 'In Progress'
+        complaints[0].save()
+        complaints[1].status = 'Closed'
+        complaints[1].save()
+        complaints[2].delete()
+        Staff.objects.create(name='Asha', email='asha@example.com', phone='1', role='agent', department='Water')
+        self.assertEqual(self.stats(), {
+            'total_complaints': 2, 'open': 0, 'in_progress': 1, 'closed': 1, 'resolved_today': 1,
+            'resolution_rate': 50.0, 'total_staff': 1, 'active_agents': 1,
+        })
+        before = counters.dashboard_stats()
+        counters.rebuild()
+        self.assertEqual(counters.dashboard_stats(), before)
+
+    def test_closing_again_after_a_reopen_counts_once(self):
+        complaint = self.complaint()
+        for status in ('Closed', 'Open', 'Closed', 'In Progress', 'Closed'):
+            complaint.status = status
+            complaint.save()
+        self.assertEqual((self.stats()['resolved_today'], self.stats()['closed']), (1, 1))
+        complaint.status = 'Open'
+        complaint.save()
+        self.assertIsNone(complaint.closed_at)
+        self.assertEqual(self.stats()['resolved_today'], 0)
+
+    def test_reopening_takes_the_closure_off_the_day_it_happened(self):
+        yesterday = timezone.now() - datetime.timedelta(days=1)
+        deltas = counters.complaint_deltas('Closed', 'Open', closed_at=yesterday)
+        self.assertEqual(deltas[counters.complaints_closed_on_key(timezone.localdate(yesterday))], -1)
+        self.assertNotIn(counters.complaints_closed_on_key(timezone.localdate()), deltas)
+
+    def test_closed_at_marks_the_current_closure(self):
+        complaint = self.complaint('Closed')
+        closed_at = complaint.closed_at
+        self.assertIsNotNone(closed_at)
+        complaint.description = 'Leak near the door'
+        complaint.save()
+        self.assertEqual(complaint.closed_at, closed_at)
+        results = ingest([{'type': 'water', 'description': 'Leak', 'date_of_incident': '2025-05-01', 'status': 'Closed'}])
+        self.assertIsNotNone(Complaint.objects.get(id=results[0]['id']).closed_at)
+        self.assertEqual(self.stats()['resolved_today'], 2)
+
+
+class Inbox:
+    """Stands in for the EventHub: collects what a poller delivers."""
+
+    def __init__(self):
+        self.events = []
+
+    def deliver(self, event):
+        self.events.append(event['data']['id'])
+
+
+class DatabaseEventBackendTests(TestCase):
+
+    def push(self, event_id):
+        PushEvent.objects.create(id=event_id, payload=json.dumps({'type': 't', 'topics': ['admin'], 'data': {'id': event_id}}))
+
+    def poll(self, backend, inbox, last_id, gaps):
+        return backend._receive(inbox, backend._fetch(last_id, gaps), last_id, gaps)
+
+    def test_event_committed_after_a_later_id_is_still_delivered(self):
+        backend, inbox, gaps = events.DatabaseEventBackend(), Inbox(), {}
+        self.push(10)
+        last_id = self.poll(backend, inbox, backend._latest_id(), gaps)
+        self.push(11)
+        # 12 commits first; the insert that drew 13 (not yet committed) ...
+        self.push(12)
+        self.push(14)
+        last_id = self.poll(backend, inbox, last_id, gaps)
+        self.assertEqual((inbox.events, last_id, sorted(gaps)), ([11, 12, 14], 14, [13]))
+        # ... commits before the next poll
+        self.push(13)
+        last_id = self.poll(backend, inbox, last_id, gaps)
+        self.assertEqual((inbox.events, last_id, gaps), ([11, 12, 14, 13], 14, {}))
+        self.poll(backend, inbox, last_id, gaps)
+        self.assertEqual(inbox.events, [11, 12, 14, 13])
+
+    def test_gaps_are_given_up_after_the_timeout(self):
+        backend, inbox, gaps = events.DatabaseEventBackend(), Inbox(), {}
+        self.push(1)
+        self.push(3)
+        self.assertEqual(self.poll(backend, inbox, 0, gaps), 3)
+        self.assertEqual(list(gaps), [2])
+        later = time.monotonic() + backend.GAP_TIMEOUT + 1
+        with mock.patch.object(events.time, 'monotonic', return_value=later):
+            self.poll(backend, inbox, 3, gaps)
+        self.assertEqual(gaps, {})
+
+    async def test_poll_failures_are_logged_and_polling_goes_on(self):
+        backend = events.DatabaseEventBackend()
+        backend.POLL_INTERVAL = 0
+        calls = []
+
+        def fetch(after, gaps):
+            calls.append(after)
+            if len(calls) == 1:
+                raise DatabaseError('server has gone away')
+            return []
+
+        with mock.patch.object(backend, '_latest_id', return_value=0), mock.patch.object(backend, '_fetch', fetch):
+            with self.assertLogs('complaints.events', 'WARNING') as logs:
+                task = asyncio.ensure_future(backend._poll(Inbox()))
+                while len(calls) < 2:
+                    await asyncio.sleep(0.01)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+        self.assertIn('server has gone away', logs.output[0])
+
+
+class ConditionalTests(TestCase):
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.complaint = Complaint.objects.create(type='water', description='Leak', date_of_incident=datetime.date(2025, 5, 1))
+
+    def test_unchanged_tables_answer_304_without_running_the_view(self):
+        client = APIClient()
+        response = client.get('/api/complaints/list/')
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/complaints/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.content), (304, b''))
+        self.assertEqual(response['ETag'], etag)
+        # Only the version counters are read
+        self.assertEqual(len(queries), 1)
+        response = client.get('/api/complaints/list/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_after_a_write(self):
+        client = APIClient()
+        etag = client.get('/api/complaints/list/')['ETag']
+        stats_etag = client.get('/api/complaints/stats/')['ETag']
+        self.complaint.status = 'Closed'
+        self.complaint.save()
+        response = client.get('/api/complaints/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['status'], 'Closed')
+        self.assertNotEqual(client.get('/api/complaints/stats/')['ETag'], stats_etag)
+
+        # A staff write leaves complaint-only representations valid
+        etag = response['ETag']
+        Staff.objects.create(name='Asha', email='asha@example.com', phone='1', role='agent', department='Water')
+        self.assertEqual(client.get('/api/complaints/list/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_each_representation_has_its_own_etag(self):
+        client = APIClient()
+        etags = {
+            client.get('/api/complaints/list/')['ETag'],
+            client.get('/api/complaints/list/?status=Open')['ETag'],
+            client.get('/api/complaints/list/', HTTP_ACCEPT='text/html')['ETag'],
+            client.get(f'/api/complaints/{self.complaint.id}/')['ETag'],
+        }
+        self.assertEqual(len(etags), 4)
+        response = client.get('/api/complaints/list/?status=Open', HTTP_IF_NONE_MATCH=client.get('/api/complaints/list/')['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    async def test_async_views_answer_304(self):
+        path = f'/api/complaints/{self.complaint.id}/'
+        response = await views.acomplaint_detail(AsyncRequestFactory().get(path), self.complaint.id)
+        self.assertEqual(response.status_code, 200)
+        # Extra keyword arguments go to the ASGI scope, not the headers
+        request = AsyncRequestFactory().get(path, headers={'If-None-Match': response['ETag']})
+        self.assertEqual((await views.acomplaint_detail(request, self.complaint.id)).status_code, 304)
+
+
+class CacheTests(TestCase):
+
+    def setUp(self):
+        cache.get_cache().clear()
+
+    def test_writes_move_readers_to_fresh_keys(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return Complaint.objects.count()
+
+        self.assertEqual(cache.cached(cache.COMPLAINTS, 'count', build), 0)
+        self.assertEqual(cache.cached(cache.COMPLAINTS, 'count', build), 0)
+        self.assertEqual(len(builds), 1)
+        complaint = Complaint.objects.create(type='water', description='Leak', date_of_incident=datetime.date(2025, 5, 1))
+        self.assertEqual(cache.cached(cache.COMPLAINTS, 'count', build), 1)
+        complaint.status = 'Closed'
+        complaint.save()
+        cache.cached(cache.COMPLAINTS, 'count', build)
+        self.assertEqual(len(builds), 3)
+        # Other tables keep their entries
+        staff_version = cache.table_version(cache.STAFF)
+        Complaint.objects.create(type='water', description='Leak', date_of_incident=datetime.date(2025, 5, 1))
+        self.assertEqual(cache.table_version(cache.STAFF), staff_version)
+
+    def test_list_endpoint_sees_new_complaints(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/complaints/list/').json(), [])
+        Complaint.objects.create(type='water', description='Leak', date_of_incident=datetime.date(2025, 5, 1))
+        self.assertEqual(len(client.get('/api/complaints/list/').json()), 1)
+
+    def test_only_pages_are_cached(self):
+        Complaint.objects.create(type='water', description='Leak', date_of_incident=datetime.date(2025, 5, 1))
+        client = APIClient()
+        before = cache.stats()
+        for path in ('/api/complaints/list/', '/api/complaints/user/', '/api/complaints/list/?status=Open'):
+            client.get(path)
+            client.get(path)
+        after = cache.stats()
+        self.assertEqual((after['hits'], after['misses']), (before['hits'], before['misses']))
+        client.get('/api/complaints/list/?page_size=10')
+        client.get('/api/complaints/list/?page_size=10')
+        self.assertEqual(cache.stats()['hits'], before['hits'] + 1)
+
+    def test_query_keys_are_bounded_and_ignore_parameter_order(self):
+        long_filter = QueryDict(mutable=True)
+        long_filter['train_number'] = '1' * 2000
+        long_filter['status'] = 'Open'
+        key = cache.query_key('list', long_filter)
+        self.assertLess(len(f'{cache.COMPLAINTS}:v{2 ** 63}:{key}'), 250)
+        self.assertEqual(key, cache.query_key('list', {'status': 'Open', 'train_number': '1' * 2000}))
+        self.assertNotEqual(key, cache.query_key('list', {'status': 'Open'}))
+        self.assertNotEqual(key, cache.query_key('user', long_filter))
+
+    def test_stats_count_this_process(self):
+        before = cache.stats()
+        cache.cached(cache.STAFF, 'x', lambda: 1)
+        cache.cached(cache.STAFF, 'x', lambda: 1)
+        after = cache.stats()
+        self.assertEqual((after['hits'] - before['hits'], after['misses'] - before['misses']), (1, 1))
+        self.assertEqual(after['process'], os.getpid())
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        complaints = [
+            Complaint.objects.create(
+                type='water', description=f'No water, coach "B{i}"', date_of_incident=datetime.date(2025, 1, i + 1),
+                status='Closed' if i % 2 else 'Open',
+            )
+            for i in range(6)
+        ]
+        for rating, complaint in zip((5, 3, 5, 1), complaints):
+            Feedback.objects.create(
+                complaint_reference=f'RM{complaint.id}', complaint=complaint, category='Service', subcategory='Staff',
+                feedback_message='ok', rating=rating, name='P', email='p@example.com',
+            )
+        Complaint.objects.filter(id__in=[complaints[1].id, complaints[3].id]).update(
+            updated_at=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc),
+        )
+        list(archive.archive(archive.cutoff(30)))
+        cls.hot = [complaint.id for complaint in complaints if complaint.id not in (complaints[1].id, complaints[3].id)]
+        cls.archived = [complaints[1].id, complaints[3].id]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='export-admin', is_staff=True))
+
+    def get(self, path, **params):
+        response = self.client.get(path, params)
+        if response.status_code != 200:
+            return response.status_code, response.json()
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_streams_the_hot_table_then_the_archive(self):
+        response, content = self.get('/api/complaints/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="complaints.csv"')
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], [field.attname for field in Complaint._meta.concrete_fields])
+        self.assertEqual([int(row[0]) for row in rows[1:]], self.hot + self.archived)
+        self.assertEqual(rows[1][rows[0].index('description')], 'No water, coach "B0"')
+
+    def test_ndjson_export_applies_the_filters_to_both_tables(self):
+        _, content = self.get('/api/complaints/export/', format='ndjson', status='Closed')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.hot[-1]] + self.archived)
+        self.assertEqual(rows[0]['date_of_incident'], '2025-01-06')
+        self.assertEqual(self.get('/api/complaints/export/', format='xml')[0], 400)
+
+    def test_feedback_export_filters_and_validates_rating(self):
+        _, content = self.get('/api/complaints/feedback/export/', format='ndjson', rating='5')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['rating'] for row in rows], [5, 5])
+        self.assertEqual(len(rows), len({row['id'] for row in rows}))
+        _, content = self.get('/api/complaints/feedback/export/', format='ndjson', complaint_id=f'RM{self.archived[0]}')
+        self.assertEqual([json.loads(line)['complaint_id'] for line in content.splitlines()], [self.archived[0]])
+        self.assertEqual(
+            self.get('/api/complaints/feedback/export/', rating='five'), (400, {'error': 'rating must be an integer'}),
+        )
+
+    def test_exports_are_for_admins_only(self):
+        passenger = APIClient()
+        passenger.force_authenticate(User.objects.create_user(username='passenger'))
+        for path in ('/api/complaints/export/', '/api/complaints/feedback/export/'):
+            with self.subTest(path=path):
+                self.assertEqual(APIClient().get(path, {'format': 'csv'}).status_code, 401)
+                self.assertEqual(passenger.get(path, {'format': 'ndjson'}).status_code, 403)
+                token = Token.objects.create(user=User.objects.create_user(username=f'token-admin{len(path)}', is_staff=True))
+                response = APIClient().get(path, {'format': 'csv'}, HTTP_AUTHORIZATION=f'Token {token.key}')
+                self.assertEqual((response.status_code, response['Content-Type']), (200, 'text/csv'))
+
+    def test_rows_are_read_one_chunk_at_a_time(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(export.iterate_in_chunks(Complaint.objects.all(), ['description'], chunk_size=2))
+        self.assertEqual([row[0] for row in rows], self.hot)
+        # Two full chunks and the empty read that ends the loop
+        self.assertEqual(len(queries), 3)
+        self.assertTrue(all('LIMIT 2' in query['sql'] for query in queries.captured_queries))
+
+
+@override_settings(COMPLAINT_SEARCH_BACKEND='inverted_index')
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        descriptions = [
+            'Water leaking from the roof, water everywhere',
+            'No water in the toilet',
+            'Fan not working and the light flickers',
+            'Water cooler not working',
+            'Dirty toilet in coach B2',
+        ]
+        cls.complaints = [
+            Complaint.objects.create(type='water', description=text, date_of_incident=datetime.date(2025, 5, 1))
+            for text in descriptions
+        ]
+
+    def ranked(self, query, offset=0, limit=20):
+        total, ranked = search.get_backend().search(query, offset, limit)
+        ids = [complaint.id for complaint in self.complaints]
+        return total, [ids.index(complaint_id) for complaint_id, _ in ranked]
+
+    def test_tokenize_drops_stop_words_and_single_characters(self):
+        self.assertEqual(search.tokenize('The fan in Coach B2 is NOT working!'), ['fan', 'coach', 'b2', 'not', 'working'])
+        self.assertEqual(search.tokenize(None), [])
+
+    def test_postings_follow_the_complaint(self):
+        complaint = self.complaints[2]
+        self.assertEqual(dict(SearchTerm.objects.filter(complaint=complaint, term='fan').values_list('term', 'frequency')), {'fan': 1})
+        complaint.description = 'Fan fan fan'
+        complaint.save()
+        self.assertEqual(list(SearchTerm.objects.filter(complaint=complaint).values_list('term', 'frequency')), [('fan', 3)])
+        complaint.delete()
+        self.assertFalse(SearchTerm.objects.filter(term='fan').exists())
+
+    def test_ranking_weighs_rare_terms_and_repeated_terms(self):
+        # "toilet" is rarer than "water"; the first complaint mentions water twice
+        self.assertEqual(self.ranked('water toilet'), (4, [1, 0, 4, 3]))
+        self.assertEqual(self.ranked('water'), (3, [0, 3, 1]))
+        self.assertEqual(self.ranked('water', offset=1, limit=1), (3, [3]))
+        self.assertEqual(self.ranked('the of'), (0, []))
+        self.assertEqual(self.ranked('monsoon'), (0, []))
+
+    def test_only_the_page_is_read_from_the_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.ranked('water toilet', limit=2)
+        ranking = [query['sql'] for query in queries.captured_queries if 'SUM(' in query['sql']]
+        self.assertEqual(len(ranking), 1)
+        self.assertIn('GROUP BY', ranking[0])
+        self.assertIn('LIMIT 2', ranking[0])
+
+    def test_search_endpoint_and_queryset_filter(self):
+        response = APIClient().get('/api/complaints/search/', {'q': 'not working', 'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['count'], len(body['results'])), (2, 1))
+        self.assertGreater(body['results'][0]['score'], 0)
+        self.assertEqual(APIClient().get('/api/complaints/search/').status_code, 400)
+        matches = search.get_backend().filter_queryset(Complaint.objects.all(), 'toilet')
+        self.assertEqual(set(matches), {self.complaints[1], self.complaints[4]})
+
+
+class PaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='paging-passenger')
+        # Three complaints per day, so pages break inside a day
+        for i in range(10):
+            Complaint.objects.create(
+                type='water', description=f'Complaint {i}', date_of_incident=datetime.date(2025, 5, 1 + i // 3),
+                user=cls.user if i % 2 else None, status='Closed' if i % 3 == 0 else 'Open',
+            )
+
+    def setUp(self):
+        cache.get_cache().clear()
+
+    def walk(self, path, **params):
+        seen = []
+        cursor = None
+        while True:
+            query = {**params, 'page_size': 4, **({'cursor': cursor} if cursor else {})}
+            body = APIClient().get(path, query).json()
+            self.assertLessEqual(len(body['results']), 4)
+            seen += [row['id'] for row in body['results']]
+            cursor = body['next_cursor']
+            if cursor is None:
+                return seen
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor(datetime.date(2025, 5, 3), 42)
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_cursor(cursor), (datetime.date(2025, 5, 3), 42))
+
+    def test_invalid_cursors(self):
+        not_a_pair = encode_cursor(datetime.date(2025, 5, 3), 42)[:-4]
+        for cursor in ('bad', '!!!!', not_a_pair, 'WyIyMDI1LTEzLTAxIiwxXQ', 'WzFd', 'WyIyMDI1LTA1LTAxIiwieCJd'):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+        response = APIClient().get('/api/complaints/list/', {'cursor': 'bad'})
+        self.assertEqual((response.status_code, response.json()), (400, {'error': 'Invalid cursor'}))
+
+    def test_keyset_pages_cover_every_row_once_in_order(self):
+        ascending = list(Complaint.objects.order_by('date_of_incident', 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/complaints/list/'), ascending)
+        self.assertEqual(self.walk('/api/complaints/user/'), ascending[::-1])
+        closed = list(Complaint.objects.filter(status='Closed').order_by('date_of_incident', 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/complaints/list/', status='Closed'), closed)
+
+    def test_keyset_bound_matches_the_cursor_row(self):
+        rows = list(Complaint.objects.order_by('-date_of_incident', '-id'))
+        cursor = encode_cursor(rows[3].date_of_incident, rows[3].id)
+        self.assertEqual(list(order_by_keyset(Complaint.objects.all(), cursor, descending=True)), rows[4:])
+
+    def test_integer_filters_are_validated(self):
+        self.assertEqual(filter_complaints(Complaint.objects.all(), {'user': str(self.user.id)}).count(), 5)
+        with self.assertRaisesMessage(InvalidFilter, 'user must be an integer'):
+            filter_complaints(Complaint.objects.all(), {'user': 'abc'})
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_user(username='filter-admin', is_staff=True))
+        for path in ('/api/complaints/list/', '/api/complaints/user/', '/api/complaints/export/'):
+            with self.subTest(path=path):
+                response = admin.get(path, {'user': 'abc'})
+                self.assertEqual((response.status_code, response.json()), (400, {'error': 'user must be an integer'}))
+
+
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        Staff.objects.create(name='Asha', email='asha@example.com', phone='1', role='agent', department='Water')
+        for i in range(5):
+            Complaint.objects.create(
+                type='water', description=f'No water {i}', train_number='12001', date_of_incident=datetime.date(2025, 1, i + 1),
+            )
+
+    async def test_async_views_match_the_sync_views(self):
+        complaint = await Complaint.objects.afirst()
+        cases = [
+            ('/api/complaints/list/', views.complaint_list, views.acomplaint_list, ()),
+            ('/api/complaints/list/?page_size=2', views.complaint_list, views.acomplaint_list, ()),
+            ('/api/complaints/list/?cursor=bad', views.complaint_list, views.acomplaint_list, ()),
+            (f'/api/complaints/{complaint.id}/', views.complaint_detail, views.acomplaint_detail, (complaint.id,)),
+            ('/api/complaints/0/', views.complaint_detail, views.acomplaint_detail, (0,)),
+            ('/api/complaints/staff/?department=Water', views.staff_list, views.astaff_list, ()),
+        ]
+        for path, sync_view, async_view, args in cases:
+            with self.subTest(path=path):
+                expected = await sync_to_async(lambda: sync_view(RequestFactory().get(path), *args))()
+                if hasattr(expected, 'render'):
+                    expected.render()
+                response = await async_view(AsyncRequestFactory().get(path), *args)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content, expected.content)
+                self.assertEqual(response['ETag'], expected['ETag'])
+                self.assertEqual(response['Content-Type'], expected['Content-Type'])
+
+    async def test_async_file_complaint(self):
+        async def anonymous():
+            return AnonymousUser()
+
+        for data, content_type, status in (
+            ({'type': 'water', 'description': 'No water', 'train_number': '12002', 'date_of_incident': '2025-02-01'},
+             'application/json', 201),
+            ({'type': 'water'}, MULTIPART_CONTENT, 400),
+        ):
+            request = AsyncRequestFactory().post('/api/complaints/file/', data, content_type=content_type)
+            # Set by AuthenticationMiddleware outside the request factory
+            request.auser = anonymous
+            self.assertEqual((await views.afile_complaint(request)).status_code, status)
+        self.assertTrue(await Complaint.objects.filter(train_number='12002').aexists())
+
+
+class FastPathTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username='fast-path')
+        staff = Staff.objects.create(
+            name='Zo\u00eb\u2028"Q"', email='zoe@example.com', phone='1', role='agent', department='Water',
+            avatar='staff_avatars/zoe.png', rating=4.35,
+        )
+        Staff.objects.create(name='Ravi', email='ravi@example.com', phone='2', role='agent', department='Water')
+        for i in range(6):
+            complaint = Complaint.objects.create(
+                type='water', description=f'Kein Wasser \u2014 {i}\u2029\\ \x01', train_number='12001',
+                date_of_incident=datetime.date(2025, 1, i + 1), user=user if i % 2 else None,
+                photos='media:photos/a.jpg', photo_thumbnail='media:photos/a-thumb.jpg' if i % 3 else None,
+            )
+            if i % 2:
+                Complaint.objects.filter(id=complaint.id).update(
+                    assigned_staff=staff, claimed_at=datetime.datetime(2025, 1, 1, 10, 30, 5, 123456, tzinfo=datetime.timezone.utc),
+                )
+
+    def test_default_fieldset_is_byte_identical(self):
+        client = APIClient()
+        renderer = JSONRenderer()
+        complaints = Complaint.objects.order_by('-date_of_incident')
+        expected = renderer.render(use_thumbnails(ComplaintSerializer(complaints, many=True).data))
+        self.assertEqual(client.get('/api/complaints/user/').content, expected)
+
+        page = ComplaintSerializer(order_by_keyset(Complaint.objects.all(), None, True)[:4], many=True).data
+        response = client.get('/api/complaints/user/?page_size=4').json()
+        self.assertEqual(
+            client.get('/api/complaints/user/?page_size=4').content,
+            renderer.render({'results': use_thumbnails(page), 'next_cursor': response['next_cursor']}),
+        )
+
+        expected = renderer.render(StaffSerializer(Staff.objects.all(), many=True).data)
+        self.assertEqual(client.get('/api/complaints/staff/').content, expected)
+        self.assertIn(b'\\u2028', expected)
+
+    def test_sparse_fieldset_narrows_the_select(self):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as queries:
+            rows = client.get('/api/complaints/user/?fields=id,pnr_number,status,staff').json()
+        self.assertEqual([list(row) for row in rows], [['id', 'pnr_number', 'status', 'staff']] * 6)
+        select = next(query['sql'] for query in queries if 'FROM "complaints_complaint"' in query['sql'])
+        self.assertNotIn('description', select)
+
+        rows = client.get('/api/complaints/list/?page_size=2&fields=id,photos,assigned_staff_id').json()['results']
+        self.assertEqual([list(row) for row in rows], [['id', 'photos', 'assigned_staff_id']] * 2)
+        self.assertEqual(rows[1]['photos'], 'media:photos/a-thumb.jpg')
+        self.assertEqual(client.get('/api/complaints/staff/?fields=name,avatar').json()[1], {'name': 'Ravi', 'avatar': None})
+        for path in ('/api/complaints/user/', '/api/complaints/list/', '/api/complaints/staff/'):
+            self.assertEqual(client.get(path + '?fields=id,secret').status_code, 400)
@@ -0,0 +1,168 @@
+import datetime
+
+from django.conf import settings
+from django.db.models import Case, FloatField, Q, Value, When
+from django.utils import timezone
+
+from . import changes, counters
+from .models import Complaint, ComplaintChange, DuplicateCluster
+
+DEFAULT_WEIGHTS = {
+    'severity': {'Low': 0.0, 'Medium': 10.0, 'High': 30.0},
+    # Score per day since the incident
+    'age': 1.0,
+    # Score per other report of the same incident, up to max_duplicates
+    'duplicate': 5.0,
+    'max_duplicates': 10,
+}
+QUEUE_STATUSES = ('Open', 'In Progress')
+CLAIM_TTL = datetime.timedelta(minutes=30)
+MAX_CLAIM_ATTEMPTS = 5
+MAX_K = 200
+REFRESH_CHUNK_SIZE = 500
+
+
+def weights():
+    configured = getattr(settings, 'COMPLAINT_TRIAGE_WEIGHTS', {})
+    return {**DEFAULT_WEIGHTS, **configured}
+
+
+def priority(severity, date_of_incident, status, cluster_size=None, config=None):
+    """
+    Stored ranking key, or None for complaints outside the queue.
+
+    The score is severity + age * days since the incident + duplicate
+    weight * other reports. Every complaint ages at the same rate, so the
+    column stores the score minus ``age * today`` (the -age * incident
+    date term) and stays valid as days pass; score() adds today back.
+    """
+    if status not in QUEUE_STATUSES or date_of_incident is None:
+        return None
+    config = config or weights()
+    if isinstance(date_of_incident, str):
+        date_of_incident = datetime.date.fromisoformat(date_of_incident)
+    duplicates = min(max((cluster_size or 1) - 1, 0), config['max_duplicates'])
+    return (
+        config['severity'].get(severity, 0.0)
+        + config['duplicate'] * duplicates
+        - config['age'] * date_of_incident.toordinal()
+    )
+
+
+def score(stored_priority, today=None):
+    today = today or timezone.localdate()
+    return round(stored_priority + weights()['age'] * today.toordinal(), 2)
+
+
+def set_priority(complaint, cluster_size=None):
+    if cluster_size is None and complaint.cluster_id:
+        cluster_size = complaint.cluster.size
+    complaint.triage_priority = priority(
+        complaint.severity, complaint.date_of_incident, complaint.status, cluster_size,
+    )
+
+
+def refresh(complaints):
+    """
+    Recompute the stored priority of the ``complaints`` queryset; returns
+    the number of rows whose priority changed. Like the signal receivers,
+    it logs them to the change feed and bumps the complaints version.
+    """
+    config = weights()
+    rows = complaints.values_list('id', 'triage_priority', 'severity', 'date_of_incident', 'status', 'cluster__size')
+    updated = 0
+    last_id = 0
+    while True:
+        chunk = list(rows.filter(id__gt=last_id).order_by('id')[:REFRESH_CHUNK_SIZE])
+        if not chunk:
+            return updated
+        last_id = chunk[-1][0]
+        changed = {}
+        for complaint_id, stored, *values in chunk:
+            value = priority(*values, config=config)
+            if value != stored:
+                changed[complaint_id] = value
+        if not changed:
+            continue
+        Complaint.objects.filter(id__in=changed).update(triage_priority=Case(
+            *(When(id=complaint_id, then=Value(value)) for complaint_id, value in changed.items()),
+            output_field=FloatField(),
+        ))
+        changes.record(list(changed), ComplaintChange.UPSERT)
+        counters.apply({counters.table_version_key('complaints'): 1})
+        updated += len(changed)
+
+
+def refresh_clusters(joined):
+    """Refresh the members of clusters that grew; ``joined`` maps cluster id -> number of complaints added."""
+    cap = weights()['max_duplicates']
+    grown = [
+        cluster_id for cluster_id, size in DuplicateCluster.objects.filter(id__in=joined).values_list('id', 'size')
+        # Clusters already past the cap before they grew rank the same
+        if size - joined[cluster_id] - 1 < cap
+    ]
+    if grown:
+        refresh(Complaint.objects.filter(cluster_id__in=grown))
+
+
+def available(user, now=None):
+    """Complaints ``user`` may take: unclaimed, claimed by them, or claims older than CLAIM_TTL."""
+    now = now or timezone.now()
+    return Q(claimed_by__isnull=True) | Q(claimed_by=user) | Q(claimed_at__lt=now - CLAIM_TTL)
+
+
+def queue(user, now=None):
+    """The queue in rank order, as an index scan over (-triage_priority, id)."""
+    return Complaint.objects.filter(triage_priority__isnull=False).filter(available(user, now)).order_by(
+        '-triage_priority', 'id',
+    )
+
+
+def claim(user, k=None, ids=None):
+    """
+    Claim the top ``k`` available complaints, or the given ``ids``, for
+    ``user`` and return the ids claimed.
+
+    Each attempt is one conditional UPDATE that only matches rows still
+    available, so when two admins race for the same complaint exactly one
+    UPDATE changes it; the loser moves on to the next candidates.
+    """
+    now = timezone.now()
+    claimed = []
+    for _ in range(MAX_CLAIM_ATTEMPTS):
+        if ids is not None:
+            candidates = [pk for pk in ids if pk not in claimed]
+        else:
+            candidates = list(queue(user, now).exclude(id__in=claimed).values_list('id', flat=True)[:k - len(claimed)])
+        if not candidates:
+            break
+        Complaint.objects.filter(id__in=candidates, triage_priority__isnull=False).filter(available(user, now)).update(
+            claimed_by=user, claimed_at=now, updated_at=now,
+        )
+        claimed.extend(
+            Complaint.objects.filter(id__in=candidates, claimed_by=user, claimed_at=now).values_list('id', flat=True)
+        )
+        if ids is not None or len(claimed) >= k:
+            break
+    record(claimed)
+    return claimed
+
+
+def release(user, ids=None):
+    """Drop ``user``'s claims (all of them without ``ids``); returns the ids released."""
+    claims = Complaint.objects.filter(claimed_by=user)
+    if ids is not None:
+        claims = claims.filter(id__in=ids)
+    released = list(claims.values_list('id', flat=True))
+    Complaint.objects.filter(id__in=released, claimed_by=user).update(
+        claimed_by=None, claimed_at=None, updated_at=timezone.now(),
+    )
+    record(released)
+    return released
+
+
+def record(complaint_ids):
+    if complaint_ids:
+        # Queryset updates skip the signal receivers; do their bookkeeping here
+        changes.record(complaint_ids, ComplaintChange.UPSERT)
+        counters.apply({counters.table_version_key('complaints'): 1})
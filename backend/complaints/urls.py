@@ -1,15 +1,37 @@
+from django.conf import settings
 from django.urls import path
 from .views import file_complaint, user_complaints, complaint_detail, complaint_list, admin_profile,submit_feedback,feedback_view
 from . import views
 
+staff_list = views.staff_list
+if settings.COMPLAINTS_ASYNC_VIEWS:
+    file_complaint, complaint_list, complaint_detail = views.afile_complaint, views.acomplaint_list, views.acomplaint_detail
+    staff_list = views.astaff_list
+
 urlpatterns = [
     path('file/', file_complaint, name='file_complaint'),
+    path('bulk/', views.bulk_file_complaints, name='bulk-file-complaints'),
     path('list/', complaint_list, name='complaint_list'),
     path('user/', user_complaints, name='user_complaints'),
     path('<int:complaint_id>/', complaint_detail, name='complaint_detail'),
+    path('stats/', views.dashboard_stats, name='dashboard-stats'),
+    path('trends/', views.complaint_trends, name='complaint-trends'),
+    path('search/', views.complaint_search, name='complaint-search'),
+    path('changes/', views.complaint_changes, name='complaint-changes'),
+    path('events/', views.complaint_events, name='complaint-events'),
+    path('classify/', views.classify_complaints, name='complaint-classify'),
+    path('clusters/', views.duplicate_clusters, name='duplicate-clusters'),
+    path('clusters/<int:pk>/', views.duplicate_cluster_detail, name='duplicate-cluster-detail'),
+    path('triage/', views.triage_queue, name='triage-queue'),
+    path('triage/claim/', views.triage_claim, name='triage-claim'),
+    path('triage/release/', views.triage_release, name='triage-release'),
+    path('cache/stats/', views.cache_stats, name='cache-stats'),
+    path('export/', views.complaint_export, name='complaint-export'),
+    path('feedback/export/', views.feedback_export, name='feedback-export'),
     path('admin/profile/', admin_profile, name='admin_profile'),
     path('submit/', submit_feedback, name='submit-feedback'),
     path('feedback/', feedback_view, name='feedback'),
-    path('staff/', views.staff_list, name='staff-list'),
+    path('feedback/summary/', views.feedback_summary, name='feedback-summary'),
+    path('staff/', staff_list, name='staff-list'),
     path('staff/<int:pk>/', views.staff_detail, name='staff-detail'),
 ]
\ No newline at end of file
@@ -1,69 +1,182 @@
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.authentication import BasicAuthentication, TokenAuthentication, SessionAuthentication
 from rest_framework.response import Response
 from rest_framework import status, viewsets
 from rest_framework.authtoken.models import Token
-from django.http import JsonResponse
-from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from rest_framework.exceptions import APIException
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import json
+import logging
+import os
 from django.contrib.auth.models import User
-from .models import Complaint, Staff
+from .models import Complaint, DuplicateCluster, Staff
 from .serializers import ComplaintSerializer, StaffSerializer
-import os
+from . import archive, assignment, cache, changes, counters, events, fastpath, rollups, triage
+from .conditional import conditional_on
+from .routing import replica_reads
+from .bulk import BulkPayloadError, ingest, parse_ndjson
+from .export import EXPORT_FORMATS, export_complaints, export_feedback, export_view
+from .search import search_complaints
+from .staff_directory import filter_staff
+from .photos import queue_photo, spool_upload, use_thumbnails
+from .pagination import (
+    InvalidCursor, InvalidFilter, apaginate_complaints, filter_complaints, is_paginated_request, paginate_complaints,
+)
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .models import Feedback
+from .feedback import SCOPE_FIELDS, parse_reference, summary as feedback_rollups
+from .models import Feedback, FeedbackRollup
 from .serializers import FeedbackSerializer
+
+logger = logging.getLogger(__name__)
  
 @api_view(["POST"])
 def file_complaint(request):
     try:
         photo = request.FILES.get('photos')
         data = request.data.copy()
- 
-        if photo:
-            filename = os.path.basename(photo.name)
-            save_path = os.path.join('backend', 'media', 'complaints', filename)
-            full_path = os.path.join(settings.BASE_DIR, 'media', 'complaints', filename)
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            with open(full_path, 'wb+') as destination:
-                for chunk in photo.chunks():
-                    destination.write(chunk)
-            data['photos'] = save_path.replace('\\', '/')
+        # The photo is attached by the background worker once it is processed
+        data.pop('photos', None)
  
         if request.user and request.user.is_authenticated:
             data['user'] = request.user.id
  
-        serializer = ComplaintSerializer(data=data)
-        if serializer.is_valid():
-            serializer.save()
+        errors = save_complaint(data, photo)
+        if errors is None:
             return JsonResponse({"message": "Complaint filed successfully"}, status=201)
-        return JsonResponse(serializer.errors, status=400)
+        return JsonResponse(errors, status=400)
  
     except Exception as e:
+        logger.exception('Error filing complaint')
         return JsonResponse({"error": str(e)}, status=400)
  
  
+def save_complaint(data, photo=None, spool_path=None):
+    """
+    Validate and save a complaint, queue its photo and have it assigned
+    after commit; returns the validation errors, if any.
+
+    The photo is spooled before the transaction opens (pass ``spool_path``
+    if spool_upload() already has) and the spool file is removed when
+    nothing gets queued for it.
+    """
+    serializer = ComplaintSerializer(data=data)
+    try:
+        if not serializer.is_valid():
+            discard_spool(spool_path)
+            return serializer.errors
+        if photo and spool_path is None:
+            spool_path = spool_upload(photo)
+        with transaction.atomic():
+            complaint = serializer.save()
+            if photo:
+                queue_photo(complaint, photo, spool_path)
+            if assignment.auto_assign_enabled():
+                assignment.assign_after_commit([complaint], language=data.get('language'))
+    except BaseException:
+        discard_spool(spool_path)
+        raise
+    return None
+ 
+ 
+def discard_spool(spool_path):
+    if spool_path and os.path.exists(spool_path):
+        os.remove(spool_path)
+ 
+ 
+@api_view(['POST'])
+def bulk_file_complaints(request):
+    try:
+        # Parameters such as charset=utf-8 do not change the format; NDJSON is always UTF-8
+        if request.content_type.split(';')[0].strip().lower() == 'application/x-ndjson':
+            items = parse_ndjson(request.body)
+        else:
+            items = request.data
+            if isinstance(items, dict):
+                items = items.get('complaints')
+            if not isinstance(items, list):
+                raise BulkPayloadError('Expected a JSON array or NDJSON body of complaints')
+        user = request.user if request.user and request.user.is_authenticated else None
+        results = ingest(items, user)
+    except BulkPayloadError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+ 
+    created = sum(1 for result in results if result['status'] == 'created')
+    return Response(
+        {'created': created, 'failed': len(results) - created, 'results': results},
+        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+    )
+ 
+ 
+def complaint_columns(fieldset, keys):
+    """values() columns for ``keys``, plus the keyset cursor's and use_thumbnails()'s."""
+    return fieldset.select(keys, 'id', 'date_of_incident', *(('photo_thumbnail',) if 'photos' in keys else ()))
+ 
+ 
+def complaint_page(queryset, params, fieldset, keys, descending=False):
+    page, next_cursor = paginate_complaints(queryset.values(*complaint_columns(fieldset, keys)), params, descending)
+    return {'results': fieldset.rows(use_thumbnails(page), keys), 'next_cursor': next_cursor}
+ 
+ 
+@replica_reads
+@conditional_on('complaints')
 @api_view(['GET'])
 def user_complaints(request):
-    complaints = Complaint.objects.all().order_by('-date_of_incident')
-    serializer = ComplaintSerializer(complaints, many=True)
-    return Response(serializer.data)
+    fieldset = fastpath.complaint_fieldset()
+    try:
+        keys = fieldset.parse(request.GET)
+        complaints = filter_complaints(Complaint.objects.all(), request.GET)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if is_paginated_request(request.GET):
+        try:
+            data = cache.cached(
+                cache.COMPLAINTS, cache.query_key('user', request.GET),
+                lambda: complaint_page(complaints, request.GET, fieldset, keys, descending=True),
+            )
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return fastpath.respond(request, data)
+ 
+    # Whole-table reads are not cached: each write would leave a full copy behind
+    complaints = complaints.order_by('-date_of_incident').values(*complaint_columns(fieldset, keys))
+    return fastpath.respond(request, fieldset.rows(use_thumbnails(list(complaints)), keys))
+ 
+ 
+def serialized_complaint(complaint_id):
+    complaint = Complaint.objects.filter(id=complaint_id).first() or archive.find_complaint(complaint_id)
+    return ComplaintSerializer(complaint).data if complaint else None
  
  
+@replica_reads
+@conditional_on('complaints')
 @api_view(['GET', 'PUT'])
 def complaint_detail(request, complaint_id):
+    if request.method == 'GET':
+        data = cache.cached(
+            cache.COMPLAINTS, f'detail:{complaint_id}', lambda: serialized_complaint(complaint_id)
+        )
+        if data is None:
+            return Response({'error': 'Complaint not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+ 
     try:
         complaint = Complaint.objects.get(id=complaint_id)
     except Complaint.DoesNotExist:
+        if archive.is_archived(complaint_id):
+            return Response({'error': 'Archived complaints are read-only'}, status=status.HTTP_409_CONFLICT)
         return Response({'error': 'Complaint not found'}, status=status.HTTP_404_NOT_FOUND)
  
-    if request.method == 'GET':
-        serializer = ComplaintSerializer(complaint)
-        return Response(serializer.data)
- 
-    elif request.method == 'PUT':
+    if request.method == 'PUT':
         serializer = ComplaintSerializer(complaint, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -71,10 +184,298 @@ def complaint_detail(request, complaint_id):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
  
  
+@replica_reads
+@conditional_on('complaints')
 @api_view(['GET'])
 def complaint_list(request):
-    complaints = list(Complaint.objects.values())
-    return JsonResponse(complaints, safe=False)
+    fieldset = fastpath.complaint_values_fieldset()
+    try:
+        keys = fieldset.parse(request.GET)
+        complaints = filter_complaints(Complaint.objects.all(), request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if is_paginated_request(request.GET):
+        try:
+            data = cache.cached(
+                cache.COMPLAINTS, cache.query_key('list', request.GET),
+                lambda: complaint_page(complaints, request.GET, fieldset, keys),
+            )
+        except InvalidCursor as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse(data)
+ 
+    # Not cached, like user_complaints()
+    complaints = complaints.values(*complaint_columns(fieldset, keys))
+    return JsonResponse(fieldset.rows(use_thumbnails(list(complaints)), keys), safe=False)
+ 
+ 
+@api_view(['GET'])
+def complaint_changes(request):
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = min(max(int(request.GET.get('limit', changes.DEFAULT_LIMIT)), 1), changes.MAX_LIMIT)
+    except ValueError:
+        return Response({'error': 'since and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        upserted, deleted, token, has_more = changes.changes_since(since, limit)
+    except changes.ExpiredToken as e:
+        return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+    return Response({
+        'changes': ComplaintSerializer(upserted, many=True).data,
+        'deleted': deleted,
+        'next': str(token),
+        'has_more': has_more,
+    })
+ 
+ 
+async def stream_user(request):
+    """The caller of an event stream; EventSource cannot send headers, so the token may come as ``?token=``."""
+    header = request.headers.get('Authorization', '')
+    key = request.GET.get('token') or (header[6:] if header.startswith('Token ') else None)
+    if key:
+        token = await Token.objects.select_related('user').filter(key=key).afirst()
+        return token.user if token else None
+    user = await request.auser()
+    return user if user.is_authenticated else None
+ 
+ 
+@require_GET
+async def complaint_events(request):
+    """
+    Server-sent events for complaint creation and status changes and staff
+    status changes. ``topics`` is a comma-separated list of ``user`` (the
+    caller's complaints), ``train:<number>`` and ``admin`` (everything,
+    staff users only).
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Event streams are only served by the ASGI application (backend.asgi)'}, status=400)
+    user = await stream_user(request)
+    topics = []
+    for name in filter(None, request.GET.get('topics', 'user').split(',')):
+        if name == 'user':
+            if user is None:
+                return JsonResponse({'error': 'Authentication required'}, status=401)
+            topics.append(events.user_topic(user.id))
+        elif name == 'admin':
+            if user is None or not user.is_staff:
+                return JsonResponse({'error': 'Admin access required'}, status=403)
+            topics.append(events.ADMIN_TOPIC)
+        elif name.startswith('train:') and len(name) > 6:
+            topics.append(events.train_topic(name[6:]))
+        else:
+            return JsonResponse({'error': f'Unknown topic: {name}'}, status=400)
+    if not topics or len(topics) > 20:
+        return JsonResponse({'error': 'Subscribe to between 1 and 20 topics'}, status=400)
+ 
+    response = StreamingHttpResponse(events.stream(topics), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+ 
+ 
+@api_view(['POST'])
+def classify_complaints(request):
+    # numpy-backed; imported here so the rest of the API does not need numpy
+    from . import classifier
+
+    descriptions = request.data.get('descriptions') if isinstance(request.data, dict) else None
+    if not isinstance(descriptions, list) or not all(isinstance(text, str) for text in descriptions):
+        return Response({'error': 'descriptions must be a list of strings'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(descriptions) > classifier.MAX_BATCH_SIZE:
+        return Response(
+            {'error': f'At most {classifier.MAX_BATCH_SIZE} descriptions per request'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        results = classifier.classify(descriptions)
+    except classifier.ModelNotTrained as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response({'results': results})
+ 
+ 
+def cluster_summary(cluster):
+    return {
+        'id': cluster.id,
+        'train_number': cluster.train_number,
+        'date_of_incident': cluster.date_of_incident,
+        'size': cluster.size,
+        'first_complaint': cluster.first_complaint_id,
+        'created_at': cluster.created_at,
+    }
+ 
+ 
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication, SessionAuthentication])
+@permission_classes([IsAdminUser])
+def duplicate_clusters(request):
+    """Clusters of near-duplicate complaints, newest first; ``before`` is the last id of the previous page."""
+    try:
+        limit = min(max(int(request.GET.get('limit', 50)), 1), 200)
+        before = int(request.GET['before']) if 'before' in request.GET else None
+        min_size = int(request.GET.get('min_size', 2))
+    except ValueError:
+        return Response({'error': 'limit, before and min_size must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    clusters = DuplicateCluster.objects.filter(size__gte=min_size)
+    if before is not None:
+        clusters = clusters.filter(id__lt=before)
+    page = list(clusters.order_by('-id')[:limit])
+    return Response({
+        'results': [cluster_summary(cluster) for cluster in page],
+        'next_before': page[-1].id if len(page) == limit else None,
+    })
+ 
+ 
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication, SessionAuthentication])
+@permission_classes([IsAdminUser])
+def duplicate_cluster_detail(request, pk):
+    cluster = DuplicateCluster.objects.filter(pk=pk).first()
+    if cluster is None:
+        return Response({'error': 'Cluster not found'}, status=status.HTTP_404_NOT_FOUND)
+    complaints = cluster.complaints.order_by('id')
+    return Response({**cluster_summary(cluster), 'complaints': ComplaintSerializer(complaints, many=True).data})
+ 
+ 
+def id_list(value):
+    if not isinstance(value, list):
+        raise TypeError('Expected a list')
+    return [int(pk) for pk in value][:triage.MAX_K]
+ 
+ 
+def triage_rows(complaints):
+    rows = []
+    for complaint in complaints:
+        row = ComplaintSerializer(complaint).data
+        row['score'] = triage.score(complaint.triage_priority)
+        rows.append(row)
+    return rows
+ 
+ 
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication, SessionAuthentication])
+@permission_classes([IsAdminUser])
+def triage_queue(request):
+    """Top ``k`` open or in-progress complaints by triage score, leaving out those other admins have claimed."""
+    try:
+        k = min(max(int(request.GET.get('k', 50)), 1), triage.MAX_K)
+    except ValueError:
+        return Response({'error': 'k must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'results': triage_rows(triage.queue(request.user)[:k])})
+ 
+ 
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication, SessionAuthentication])
+@permission_classes([IsAdminUser])
+def triage_claim(request):
+    """Claim the next ``k`` complaints of the queue, or the listed ``ids``; returns those actually claimed."""
+    try:
+        ids = id_list(request.data['ids']) if 'ids' in request.data else None
+        k = min(max(int(request.data.get('k', 1)), 1), triage.MAX_K)
+    except (TypeError, ValueError):
+        return Response({'error': 'k must be an integer and ids a list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+    claimed = triage.claim(request.user, k=k, ids=ids)
+    complaints = Complaint.objects.filter(id__in=claimed).order_by('-triage_priority', 'id')
+    return Response({'results': triage_rows(complaints)})
+ 
+ 
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication, SessionAuthentication])
+@permission_classes([IsAdminUser])
+def triage_release(request):
+    try:
+        ids = id_list(request.data['ids']) if 'ids' in request.data else None
+    except (TypeError, ValueError):
+        return Response({'error': 'ids must be a list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'released': triage.release(request.user, ids)})
+ 
+ 
+@api_view(['GET'])
+def cache_stats(request):
+    return Response(cache.stats())
+ 
+ 
+@conditional_on('complaints')
+@api_view(['GET'])
+def complaint_search(request):
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        page_size = min(max(int(request.GET.get('page_size', 20)), 1), 100)
+    except ValueError:
+        return Response({'error': 'page and page_size must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+ 
+    total, matches = search_complaints(query, offset=(page - 1) * page_size, limit=page_size)
+    results = []
+    for complaint, score in matches:
+        row = ComplaintSerializer(complaint).data
+        row['score'] = round(float(score), 4)
+        results.append(row)
+    return Response({'count': total, 'page': page, 'page_size': page_size, 'results': results})
+ 
+ 
+@export_view
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication, SessionAuthentication])
+@permission_classes([IsAdminUser])
+def complaint_export(request):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': 'format must be csv or ndjson'}, status=400)
+    try:
+        return export_complaints(request.GET, export_format)
+    except InvalidFilter as e:
+        return JsonResponse({'error': str(e)}, status=400)
+ 
+ 
+@export_view
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication, SessionAuthentication])
+@permission_classes([IsAdminUser])
+def feedback_export(request):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': 'format must be csv or ndjson'}, status=400)
+    try:
+        return export_feedback(request.GET, export_format)
+    except InvalidFilter as e:
+        return JsonResponse({'error': str(e)}, status=400)
+ 
+ 
+@conditional_on('complaints', 'staff')
+@api_view(['GET'])
+def dashboard_stats(request):
+    return Response(counters.dashboard_stats())
+ 
+ 
+@conditional_on('complaints')
+@api_view(['GET'])
+def complaint_trends(request):
+    """
+    Complaints filed per ``granularity`` (hour, day, week or month) from
+    ``start`` up to ``end`` (default: the last 30 days), one series per
+    value of ``by`` (type, severity, status or train_number).
+    """
+    granularity = request.GET.get('granularity', 'day')
+    by = request.GET.get('by', 'status')
+    if granularity not in (*rollups.STORED_GRANULARITIES, *rollups.DERIVED_GRANULARITIES):
+        return Response({'error': 'granularity must be hour, day, week or month'}, status=status.HTTP_400_BAD_REQUEST)
+    if by not in rollups.DIMENSIONS:
+        return Response({'error': f"by must be one of {', '.join(rollups.DIMENSIONS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        end = rollups.parse_moment(request.GET['end']) if request.GET.get('end') else timezone.now()
+        start = rollups.parse_moment(request.GET['start']) if request.GET.get('start') else end - timedelta(days=30)
+        top = min(max(int(request.GET.get('top', rollups.DEFAULT_TOP)), 1), 1000)
+        buckets, series = rollups.series(by, granularity, start, end, request.GET.getlist('value'), top)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'granularity': granularity,
+        'by': by,
+        'buckets': [bucket.isoformat() for bucket in buckets],
+        'series': series,
+    })
  
  
 @api_view(['GET'])
@@ -98,6 +499,7 @@ def admin_profile(request):
         }
         return Response(data)
     except Exception as e:
+        logger.exception('Error in admin_profile')
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 @api_view(['POST'])
 def submit_feedback(request):
@@ -119,19 +521,44 @@ def feedback_view(request):
         complaint_id = request.GET.get('complaint_id')
         if not complaint_id:
             return Response({'error': 'complaint_id parameter is required'}, status=400)
-        feedbacks = Feedback.objects.filter(complaint=complaint_id).order_by('-created_at')
+        pk = parse_reference(complaint_id)
+        if pk is None:
+            return Response({'error': 'complaint_id must be a complaint number'}, status=400)
+        feedbacks = list(Feedback.objects.filter(complaint_id=pk).order_by('-submitted_at')) + archive.find_feedback(pk)
         serializer = FeedbackSerializer(feedbacks, many=True)
         return Response(serializer.data, status=200)
+ 
+@api_view(['GET'])
+def feedback_summary(request):
+    """Feedback count and average rating per ``by`` (category, subcategory or complaint), most-rated first."""
+    by = request.GET.get('by', FeedbackRollup.CATEGORY)
+    if by not in SCOPE_FIELDS:
+        return Response({'error': f"by must be one of {', '.join(SCOPE_FIELDS)}"}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=400)
+    keys = request.GET.getlist('key')
+    return Response({'by': by, 'results': feedback_rollups(by, keys, limit)})
 
+@replica_reads
+@conditional_on('staff')
 @api_view(['GET', 'POST'])
 def staff_list(request):
     if request.method == 'GET':
-        staffs = Staff.objects.all()
-        serializer = StaffSerializer(staffs, many=True)
-        return Response(serializer.data)
+        fieldset = fastpath.staff_fieldset()
+        try:
+            keys = fieldset.parse(request.GET)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        staff = filter_staff(Staff.objects.all(), request.GET).values(*fieldset.select(keys))
+        data = cache.cached(
+            cache.STAFF, cache.query_key('list', {key: '|'.join(values) for key, values in request.GET.lists()}),
+            lambda: fieldset.rows(staff, keys),
+        )
+        return fastpath.respond(request, data)
     
     elif request.method == 'POST':
-        print("Received staff data:", request.data)
         serializer = StaffSerializer(data=request.data)
         if serializer.is_valid():
             staff = serializer.save()
@@ -140,21 +567,29 @@ def staff_list(request):
             if staff.avatar and hasattr(staff.avatar, 'url'):
                 serializer_data['avatar'] = request.build_absolute_uri(staff.avatar.url)
             return Response(serializer_data, status=status.HTTP_201_CREATED)
-        print("Serializer errors:", serializer.errors)
+        logger.info('Rejected staff data: %s', serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def serialized_staff(pk):
+    staff = Staff.objects.filter(pk=pk).first()
+    return StaffSerializer(staff).data if staff else None
+
+@replica_reads
+@conditional_on('staff')
 @api_view(['GET', 'PUT', 'DELETE'])
 def staff_detail(request, pk):
+    if request.method == 'GET':
+        data = cache.cached(cache.STAFF, f'detail:{pk}', lambda: serialized_staff(pk))
+        if data is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+
     try:
         staff = Staff.objects.get(pk=pk)
     except Staff.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
-    if request.method == 'GET':
-        serializer = StaffSerializer(staff)
-        return Response(serializer.data)
-
-    elif request.method == 'PUT':
+    if request.method == 'PUT':
         serializer = StaffSerializer(staff, data=request.data)
         if serializer.is_valid():
             updated_staff = serializer.save()
@@ -169,3 +604,141 @@ def staff_detail(request, pk):
         staff.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+
+# Async-native versions of the busiest routes, bound in urls.py when
+# COMPLAINTS_ASYNC_VIEWS is on (backend.asgi). Reads go through the async ORM
+# and the cache's async API; writes that need DRF's validation and a
+# transaction run in one sync_to_async call.
+
+def render_json(data, status=200):
+    """The body and content type DRF's JSONRenderer gives the sync views."""
+    return HttpResponse(fastpath.dumps(data), status=status, content_type='application/json')
+
+
+async def request_user(request):
+    """
+    The caller as DRF's default authenticators (Basic, then the session
+    with its CSRF check) see it, or None. Raises their APIExceptions.
+    """
+    authenticated = await sync_to_async(BasicAuthentication().authenticate)(request)
+    if authenticated:
+        return authenticated[0]
+    user = await request.auser()
+    if not user.is_active:
+        return None
+    SessionAuthentication().enforce_csrf(request)
+    return user
+
+
+async def request_data(request):
+    """(data, files) of a JSON, form or multipart body, like DRF's request.data."""
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}'), {}
+    # Parsing a multipart body writes large uploads to temporary files
+    return await sync_to_async(lambda: (request.POST.copy(), request.FILES), thread_sensitive=False)()
+
+
+@csrf_exempt
+@require_POST
+async def afile_complaint(request):
+    try:
+        user = await request_user(request)
+    except APIException as e:
+        return JsonResponse({'detail': str(e.detail)}, status=e.status_code)
+    try:
+        data, files = await request_data(request)
+        photo = files.get('photos')
+        data.pop('photos', None)
+        if user is not None:
+            data['user'] = user.id
+        spool_path = None
+        if photo:
+            # Written out by a pool thread; save_complaint() removes it if nothing is queued
+            spool_path = await sync_to_async(spool_upload, thread_sensitive=False)(photo)
+        errors = await sync_to_async(save_complaint)(data, photo, spool_path)
+        if errors is None:
+            return JsonResponse({"message": "Complaint filed successfully"}, status=201)
+    except Exception as e:
+        logger.exception('Error filing complaint')
+        errors = {"error": str(e)}
+    return JsonResponse(errors, status=400)
+
+
+async def acomplaint_page(queryset, params, fieldset, keys, descending=False):
+    page, next_cursor = await apaginate_complaints(
+        queryset.values(*complaint_columns(fieldset, keys)), params, descending,
+    )
+    return {'results': fieldset.rows(use_thumbnails(page), keys), 'next_cursor': next_cursor}
+
+
+@replica_reads
+@conditional_on('complaints')
+@require_GET
+async def acomplaint_list(request):
+    fieldset = fastpath.complaint_values_fieldset()
+    try:
+        keys = fieldset.parse(request.GET)
+        complaints = filter_complaints(Complaint.objects.all(), request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if is_paginated_request(request.GET):
+        try:
+            data = await cache.acached(
+                cache.COMPLAINTS, cache.query_key('list', request.GET),
+                lambda: acomplaint_page(complaints, request.GET, fieldset, keys),
+            )
+        except InvalidCursor as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse(data)
+
+    values = complaints.values(*complaint_columns(fieldset, keys))
+    return JsonResponse(fieldset.rows(use_thumbnails([row async for row in values]), keys), safe=False)
+
+
+async def aserialized_complaint(complaint_id):
+    complaint = await Complaint.objects.filter(id=complaint_id).afirst() or await archive.afind_complaint(complaint_id)
+    return ComplaintSerializer(complaint).data if complaint else None
+
+
+@replica_reads
+@conditional_on('complaints')
+async def aget_complaint(request, complaint_id):
+    data = await cache.acached(
+        cache.COMPLAINTS, f'detail:{complaint_id}', lambda: aserialized_complaint(complaint_id)
+    )
+    if data is None:
+        return render_json({'error': 'Complaint not found'}, status=404)
+    return render_json(data)
+
+
+# DRF enforces CSRF on the session-authenticated writes handed to the sync view
+@csrf_exempt
+async def acomplaint_detail(request, complaint_id):
+    if request.method in ('GET', 'HEAD'):
+        return await aget_complaint(request, complaint_id)
+    return await sync_to_async(complaint_detail)(request, complaint_id)
+
+
+@replica_reads
+@conditional_on('staff')
+async def aget_staff_list(request):
+    fieldset = fastpath.staff_fieldset()
+    try:
+        keys = fieldset.parse(request.GET)
+    except ValueError as e:
+        return render_json({'error': str(e)}, status=400)
+
+    async def rows():
+        staff = filter_staff(Staff.objects.all(), request.GET).values(*fieldset.select(keys))
+        return fieldset.rows([member async for member in staff], keys)
+    data = await cache.acached(
+        cache.STAFF, cache.query_key('list', {key: '|'.join(values) for key, values in request.GET.lists()}), rows,
+    )
+    return render_json(data)
+
+
+@csrf_exempt
+async def astaff_list(request):
+    if request.method in ('GET', 'HEAD'):
+        return await aget_staff_list(request)
+    return await sync_to_async(staff_list)(request)
@@ -1,4 +1,5 @@
 @echo off
 start cmd /k "cd backend && python manage.py runserver"
+start cmd /k "cd backend && python manage.py process_photos --loop"
 timeout /t 5
 start cmd /k "cd frontend && npm run dev"